@@ -313,6 +313,9 @@ class AlertSource:
         within a specific time interval after failover to prevent false positives.
 
     :cvar run_on_backup_node: set this to `false` to prevent running this alert on HA `BACKUP` node.
+
+    :cvar timeout: number of seconds the check is allowed to run. The source is considered unavailable if it takes
+        longer (its last run keeps going and its result is used once it finishes).
     """
 
     schedule = IntervalSchedule(timedelta())
@@ -320,6 +323,7 @@ class AlertSource:
     products = (ProductType.COMMUNITY_EDITION, ProductType.ENTERPRISE)
     failover_related = False
     run_on_backup_node = True
+    timeout = 30
 
     def __init__(self, middleware):
         self.middleware = middleware
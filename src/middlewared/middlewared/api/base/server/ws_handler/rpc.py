@@ -36,6 +36,10 @@ class RpcWebSocketAppEvent(enum.Enum):
 
 
 class RpcWebSocketApp(App):
+    # Apps with the same event format produce identical messages for the same event, so the event only has to be
+    # serialized once for all of them.
+    event_format = "jsonrpc"
+
     def __init__(self, middleware: "Middleware", origin: ConnectionOrigin, ws: WebSocketResponse):
         super().__init__(origin)
 
@@ -138,26 +142,29 @@ class RpcWebSocketApp(App):
             await self.middleware.event_source_manager.subscribe_app(self, self.__esm_ident(ident), shortname, arg)
         else:
             self.subscriptions[ident] = name
+            self.middleware.subscribe_wsclient_event(self, name)
 
     async def unsubscribe(self, ident: str):
         if ident in self.subscriptions:
-            self.subscriptions.pop(ident)
+            name = self.subscriptions.pop(ident)
+            if name not in self.subscriptions.values():
+                self.middleware.unsubscribe_wsclient_event(self, name)
         elif self.__esm_ident(ident) in self.middleware.event_source_manager.idents:
             await self.middleware.event_source_manager.unsubscribe(self.__esm_ident(ident))
 
     def __esm_ident(self, ident):
         return self.session_id + ident
 
-    def send_event(self, name: str, event_type: str, **kwargs):
-        if (
-            not any(i in [name, "*"] for i in self.subscriptions.values()) and
+    def is_subscribed_to_event(self, name: str) -> bool:
+        return (
+            any(i in [name, "*"] for i in self.subscriptions.values()) or
             (
-                self.middleware.event_source_manager.short_name_arg(name)[0] not in
+                self.middleware.event_source_manager.short_name_arg(name)[0] in
                 self.middleware.event_source_manager.event_sources
             )
-        ):
-            return
+        )
 
+    def event_message(self, name: str, event_type: str, kwargs: dict) -> dict:
         event = {
             "msg": event_type.lower(),
             "collection": name,
@@ -171,7 +178,17 @@ class RpcWebSocketApp(App):
         if kwargs:
             event["extra"] = kwargs
 
-        self.send_notification("collection_update", event)
+        return {
+            "jsonrpc": "2.0",
+            "method": "collection_update",
+            "params": event,
+        }
+
+    def send_event(self, name: str, event_type: str, **kwargs):
+        if not self.is_subscribed_to_event(name):
+            return
+
+        self.send(self.event_message(name, event_type, kwargs))
 
     def notify_unsubscribed(self, collection: str, error: Exception | None):
         params = {"collection": collection, "error": None}
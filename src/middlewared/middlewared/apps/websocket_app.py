@@ -37,6 +37,8 @@ ExcInfoType = (
 
 
 class WebSocketApplication(RpcWebSocketApp):
+    event_format = "legacy"
+
     def __init__(
         self,
         middleware,
@@ -223,6 +225,7 @@ class WebSocketApplication(RpcWebSocketApp):
             )
         else:
             self.__subscribed[ident] = name
+            self.middleware.subscribe_wsclient_event(self, name)
 
         self._send(
             {
@@ -233,7 +236,9 @@ class WebSocketApplication(RpcWebSocketApp):
 
     async def unsubscribe(self, ident):
         if ident in self.__subscribed:
-            self.__subscribed.pop(ident)
+            name = self.__subscribed.pop(ident)
+            if name not in self.__subscribed.values():
+                self.middleware.unsubscribe_wsclient_event(self, name)
         elif self.__esm_ident(ident) in self.middleware.event_source_manager.idents:
             await self.middleware.event_source_manager.unsubscribe(
                 self.__esm_ident(ident)
@@ -242,14 +247,14 @@ class WebSocketApplication(RpcWebSocketApp):
     def __esm_ident(self, ident):
         return self.session_id + ident
 
-    def send_event(self, name, event_type, **kwargs):
-        if (
-            not any(i == name or i == "*" for i in self.__subscribed.values())
-            and self.middleware.event_source_manager.short_name_arg(name)[0]
-            not in self.middleware.event_source_manager.event_sources
-        ):
-            return
+    def is_subscribed_to_event(self, name):
+        return (
+            any(i == name or i == "*" for i in self.__subscribed.values())
+            or self.middleware.event_source_manager.short_name_arg(name)[0]
+            in self.middleware.event_source_manager.event_sources
+        )
 
+    def event_message(self, name, event_type, kwargs):
         event = {
             "msg": event_type.lower(),
             "collection": name,
@@ -262,7 +267,13 @@ class WebSocketApplication(RpcWebSocketApp):
                 event["fields"] = kwargs.pop("fields")
         if kwargs:
             event["extra"] = kwargs
-        self._send(event)
+        return event
+
+    def send_event(self, name, event_type, **kwargs):
+        if not self.is_subscribed_to_event(name):
+            return
+
+        self._send(self.event_message(name, event_type, kwargs))
 
     def notify_unsubscribed(self, collection, error):
         error_dict = {}
@@ -1,6 +1,6 @@
 import asyncio
 import contextlib
-from collections import OrderedDict
+from collections import deque, OrderedDict
 import copy
 import enum
 import errno
@@ -50,6 +50,9 @@ class JobSharedLock:
     Each job method can specify a lock which will be shared
     among all calls for that job and only one job can run at a time
     for this lock.
+
+    Jobs waiting for the lock are parked here (in FIFO order) rather than
+    in the main queue, so the scheduler only ever looks at the first one.
     """
 
     def __init__(self, queue, name):
@@ -57,6 +60,10 @@ class JobSharedLock:
         self.name = name
         self.jobs = set()
         self.lock = asyncio.Lock()
+        # Jobs that have been queued but have not started yet
+        self.waiting = deque()
+        # Whether first of the `waiting` jobs was handed over to the scheduler
+        self.scheduled = False
 
     def add_job(self, job):
         self.jobs.add(job)
@@ -67,6 +74,12 @@ class JobSharedLock:
     def remove_job(self, job):
         self.jobs.discard(job)
 
+    def queued_count(self):
+        return len(self.waiting)
+
+    def running_count(self):
+        return int(self.locked())
+
     def locked(self):
         return self.lock.locked()
 
@@ -86,7 +99,9 @@ class JobsQueue:
     def __init__(self, middleware):
         self.middleware = middleware
         self.deque = JobsDeque()
-        self.queue = []
+        # Jobs that can be started right away: jobs without a lock and the first
+        # waiting job of every lock that is not held.
+        self.runnable = deque()
 
         # Event responsible for the job queue schedule loop.
         # This event is set and a new job is potentially ready to run
@@ -119,34 +134,48 @@ class JobsQueue:
 
         return out
 
+    def lock_stats(self):
+        """
+        Number of queued and running jobs for every job lock.
+        """
+        return {
+            name: {'queued': lock.queued_count(), 'running': lock.running_count()}
+            for name, lock in self.job_locks.items()
+        }
+
     def add(self, job):
         self.handle_lock(job)
-        if job.options["lock_queue_size"] is not None:
+        if job.lock is not None and job.options["lock_queue_size"] is not None:
             if job.options["lock_queue_size"] == 0:
-                for another_job in self.all().values():
-                    if another_job.state == State.RUNNING and another_job.lock is job.lock:
-                        raise CallError("This job is already being performed", errno.EBUSY)
-            else:
-                queued_jobs = [another_job for another_job in self.queue if another_job.lock is job.lock]
-                if len(queued_jobs) >= job.options["lock_queue_size"]:
-                    for queued_job in reversed(queued_jobs):
-                        if not credential_is_limited_to_own_jobs(job.credentials):
-                            return queued_job
-                        if (
-                            job.credentials.is_user_session and
-                            queued_job.credentials.is_user_session and
-                            job.credentials.user['username'] == queued_job.credentials.user['username']
-                        ):
-                            return queued_job
-
-                    raise CallError('This job is already being performed by another user', errno.EBUSY)
+                if job.lock.running_count():
+                    self.discard_lock(job)
+                    raise CallError("This job is already being performed", errno.EBUSY)
+            elif job.lock.queued_count() >= job.options["lock_queue_size"]:
+                self.discard_lock(job)
+                for queued_job in reversed(job.lock.waiting):
+                    if not credential_is_limited_to_own_jobs(job.credentials):
+                        return queued_job
+                    if (
+                        job.credentials.is_user_session and
+                        queued_job.credentials.is_user_session and
+                        job.credentials.user['username'] == queued_job.credentials.user['username']
+                    ):
+                        return queued_job
+
+                raise CallError('This job is already being performed by another user', errno.EBUSY)
 
         self.deque.add(job)
-        self.queue.append(job)
+        if job.lock is None:
+            self.runnable.append(job)
+        else:
+            job.lock.waiting.append(job)
+            self.schedule(job.lock)
+
         send_job_event(self.middleware, 'ADDED', job, job.__encode__())
 
         # A job has been added to the queue, let the queue scheduler run
-        self.queue_event.set()
+        if self.runnable:
+            self.queue_event.set()
 
         return job
 
@@ -166,6 +195,23 @@ class JobsQueue:
         lock.add_job(job)
         job.lock = lock
 
+    def discard_lock(self, job):
+        """
+        Forget about the lock of a job that was not queued after all.
+        """
+        lock = job.lock
+        lock.remove_job(job)
+        if len(lock.get_jobs()) == 0:
+            self.job_locks.pop(lock.name)
+
+    def schedule(self, lock):
+        """
+        Hand over the first job waiting for `lock` to the scheduler if the lock is free.
+        """
+        if lock.waiting and not lock.scheduled and not lock.locked():
+            lock.scheduled = True
+            self.runnable.append(lock.waiting[0])
+
     def release_lock(self, job):
         lock = job.lock
         if job.lock is None:
@@ -180,7 +226,13 @@ class JobsQueue:
 
         # Once a lock is released there could be another job in the queue
         # waiting for the same lock
-        self.queue_event.set()
+        self.schedule(lock)
+        if self.runnable:
+            self.queue_event.set()
+
+    def finish(self, job):
+        self.release_lock(job)
+        self.deque.finish(job)
 
     async def next(self):
         """
@@ -189,21 +241,18 @@ class JobsQueue:
         while True:
             # Awaits a new event to look for a job
             await self.queue_event.wait()
-            found = None
-            for job in self.queue:
-                # Get job in the queue if it has no lock or its not locked
-                if job.lock is None or not job.lock.locked():
-                    found = job
-                    if job.lock:
-                        await job.lock.acquire()
-                    break
-            if found:
-                # Unlocked job found to run
-                self.queue.remove(found)
-                # If there are no more jobs in the queue, clear the event
-                if len(self.queue) == 0:
+            if self.runnable:
+                job = self.runnable.popleft()
+                if job.lock:
+                    job.lock.waiting.popleft()
+                    job.lock.scheduled = False
+                    await job.lock.acquire()
+
+                # If there are no more jobs ready to run, clear the event
+                if not self.runnable:
                     self.queue_event.clear()
-                return found
+
+                return job
             else:
                 # No jobs available to run, clear the event
                 self.queue_event.clear()
@@ -227,6 +276,8 @@ class JobsDeque:
         self.maxlen = maxlen
         self.count = 0
         self.__dict = OrderedDict()
+        # Ids of finished jobs in the order they finished, oldest ones are evicted first
+        self.__finished = OrderedDict()
         with contextlib.suppress(FileNotFoundError):
             shutil.rmtree(LOGS_DIR)
 
@@ -246,23 +297,29 @@ class JobsDeque:
     def add(self, job):
         job.set_id(self._get_next_id())
         if len(self.__dict) > self.maxlen:
-            for old_job_id, old_job in self.__dict.items():
-                if old_job.state in (State.SUCCESS, State.FAILED, State.ABORTED):
-                    self.remove(old_job_id)
-                    break
+            if self.__finished:
+                old_job_id, _ = self.__finished.popitem(last=False)
+                self.remove(old_job_id)
             else:
                 logger.warning("There are %d jobs waiting or running", len(self.__dict))
         self.__dict[job.id] = job
 
+    def finish(self, job):
+        if job.id in self.__dict:
+            self.__finished[job.id] = None
+
     def remove(self, job_id):
         if job_id in self.__dict:
             self.__dict[job_id].cleanup()
             del self.__dict[job_id]
+            self.__finished.pop(job_id, None)
 
     async def receive(self, middleware, job_dict, logs):
         job_dict['id'] = self._get_next_id()
         job = await Job.receive(middleware, job_dict, logs)
         self.__dict[job.id] = job
+        if job.state in (State.SUCCESS, State.FAILED, State.ABORTED):
+            self.__finished[job.id] = None
 
 
 class Job:
@@ -489,10 +546,23 @@ class Job:
 
     def abort(self):
         if self.loop is not None and self.future is not None:
-            self.loop.call_soon_threadsafe(self.future.cancel)
+            self.aborted = True
+            if not self.__aborts_cooperatively():
+                self.loop.call_soon_threadsafe(self.future.cancel)
         elif self.state == State.WAITING:
             self.aborted = True
 
+    def __aborts_cooperatively(self):
+        """
+        Abortable jobs that run in a thread can't be cancelled. They have to check `aborted` themselves and return,
+        the job is finished (and its lock is released) only then.
+        """
+        return (
+            self.options['abortable'] and
+            not self.options.get('process') and
+            not asyncio.iscoroutinefunction(self.method)
+        )
+
     async def run(self, queue):
         """
         Run a Job and set state/result accordingly.
@@ -532,7 +602,7 @@ class Job:
             await self.__close_logs()
             await self.__close_pipes()
 
-            queue.release_lock(self)
+            queue.finish(self)
             self._finished.set()
             await self.call_on_finish_cb()
             send_job_event(self.middleware, 'CHANGED', self, self.__encode__())
@@ -560,6 +630,8 @@ class Job:
                 rv = await self.method(*args)
             else:
                 rv = await self.middleware.run_in_thread(self.method, *args)
+                if self.aborted and self.__aborts_cooperatively():
+                    raise asyncio.CancelledError()
         self.set_result(rv)
         self.set_state('SUCCESS')
         if self.progress['percent'] != 100:
@@ -70,6 +70,7 @@ from truenas_api_client import json
 from .logger import Logger, setup_audit_logging, setup_logging
 
 SYSTEMD_EXTEND_USECS = 240000000  # 4mins in microseconds
+PROCESS_POOL_WORKERS = 5
 
 
 @dataclass
@@ -111,6 +112,8 @@ class Middleware(LoadPluginsMixin, ServiceCallMixin):
         multiprocessing.set_start_method('spawn')  # Spawn new processes for ProcessPool instead of forking
         self.__init_procpool()
         self.__wsclients = {}
+        # Collection name => session id => websocket client subscribed to that collection
+        self.__event_wsclients = defaultdict(dict)
         self.role_manager = RoleManager(ROLES)
         self.events = Events(self.role_manager)
         self.event_source_manager = EventSourceManager(self)
@@ -489,6 +492,14 @@ class Middleware(LoadPluginsMixin, ServiceCallMixin):
 
     def unregister_wsclient(self, client):
         self.__wsclients.pop(client.session_id)
+        for wsclients in self.__event_wsclients.values():
+            wsclients.pop(client.session_id, None)
+
+    def subscribe_wsclient_event(self, client, name):
+        self.__event_wsclients[name][client.session_id] = client
+
+    def unsubscribe_wsclient_event(self, client, name):
+        self.__event_wsclients[name].pop(client.session_id, None)
 
     def register_hook(self, name, method, *, blockable=False, inline=False, order=0, raise_error=False, sync=True):
         """
@@ -623,7 +634,7 @@ class Middleware(LoadPluginsMixin, ServiceCallMixin):
 
     def __init_procpool(self):
         self.__procpool = concurrent.futures.ProcessPoolExecutor(
-            max_workers=5,
+            max_workers=PROCESS_POOL_WORKERS,
             max_tasks_per_child=20,
             initializer=functools.partial(worker_init, self.debug_level, self.log_handler)
         )
@@ -1108,13 +1119,30 @@ class Middleware(LoadPluginsMixin, ServiceCallMixin):
 
         self.logger.trace(f'Sending event {name!r}:{event_type!r}:{kwargs!r}')
 
-        for session_id, wsclient in list(self.__wsclients.items()):
+        if self.event_source_manager.short_name_arg(name)[0] in self.event_source_manager.event_sources:
+            wsclients = self.__wsclients
+        else:
+            wsclients = {**self.__event_wsclients.get('*', {}), **self.__event_wsclients.get(name, {})}
+
+        # Serialize the event only once for every event format and send it to all the clients with a single
+        # round-trip to the event loop.
+        messages = {}
+        targets = []
+        for session_id, wsclient in list(wsclients.items()):
             try:
                 if should_send_event is None or should_send_event(wsclient):
-                    wsclient.send_event(name, event_type, **kwargs)
+                    if (message := messages.get(wsclient.event_format)) is None:
+                        message = messages[wsclient.event_format] = json.dumps(
+                            wsclient.event_message(name, event_type, kwargs)
+                        )
+
+                    targets.append((wsclient, message))
             except Exception:
                 self.logger.warn('Failed to send event {} to {}'.format(name, session_id), exc_info=True)
 
+        if targets:
+            asyncio.run_coroutine_threadsafe(self.__send_event_messages(targets), loop=self.loop)
+
         async def wrap(handler):
             try:
                 await handler(self, event_type, kwargs)
@@ -1125,6 +1153,11 @@ class Middleware(LoadPluginsMixin, ServiceCallMixin):
         for handler in self.__event_subs.get(name, []):
             asyncio.run_coroutine_threadsafe(wrap(handler), loop=self.loop)
 
+    async def __send_event_messages(self, targets):
+        # Exceptions are expected here (e.g. a client has disconnected in the meantime) and are ignored the same
+        # way they are for any other message sent to the client.
+        await asyncio.gather(*[wsclient.ws.send_str(message) for wsclient, message in targets], return_exceptions=True)
+
     def pdb(self):
         import pdb
         pdb.set_trace()
@@ -184,6 +184,28 @@ def filters_include_ds_accounts(filters):
     return True
 
 
+def ds_cache_query_options(filters, options):
+    """
+    query-options for directoryservices.cache.query. Directory services accounts
+    follow local ones in unordered results and so only first `offset` + `limit`
+    of them may be needed.
+
+    This only holds if `filters` are empty: the accounts are filtered once more
+    after the cache query (after some of their fields are updated), and any
+    account dropped then would leave the page short.
+    """
+    if filters or options.get('order_by') or options.get('count'):
+        return {}
+
+    if options.get('get'):
+        return {'limit': 1}
+
+    if options.get('limit'):
+        return {'limit': (options.get('offset') or 0) + options['limit']}
+
+    return {}
+
+
 class GroupMembershipModel(sa.Model):
     __tablename__ = 'account_bsdgroupmembership'
 
@@ -400,7 +422,7 @@ class UserService(CRUDService):
             ds = await self.middleware.call('directoryservices.status')
             if ds['type'] is not None and ds['status'] == DSStatus.HEALTHY.name:
                 ds_users = await self.middleware.call(
-                    'directoryservices.cache.query', 'USER', filters, options.copy()
+                    'directoryservices.cache.query', 'USER', filters, ds_cache_query_options(filters, options)
                 )
 
                 match DSType(ds['type']):
@@ -1936,7 +1958,9 @@ class GroupService(CRUDService):
         if filters_include_ds_accounts(filters):
             ds = await self.middleware.call('directoryservices.status')
             if ds['type'] is not None and ds['status'] == DSStatus.HEALTHY.name:
-                ds_groups = await self.middleware.call('directoryservices.cache.query', 'GROUP', filters, options)
+                ds_groups = await self.middleware.call(
+                    'directoryservices.cache.query', 'GROUP', filters, ds_cache_query_options(filters, options)
+                )
 
         result = await self.middleware.call(
             'datastore.query', self._config.datastore, [], datastore_options
@@ -1,9 +1,11 @@
+import asyncio
 from dataclasses import dataclass
-from collections import defaultdict, namedtuple
+from collections import defaultdict, deque, namedtuple
 import copy
 from datetime import datetime, timezone
 import errno
 from itertools import zip_longest
+import math
 import os
 import textwrap
 import time
@@ -56,6 +58,10 @@ from middlewared.plugins.failover_.remote import NETWORK_ERRORS
 POLICIES = ["IMMEDIATELY", "HOURLY", "DAILY", "NEVER"]
 DEFAULT_POLICY = "IMMEDIATELY"
 ALERT_SOURCES = {}
+# Maximum number of alert sources that are ran at the same time
+ALERT_SOURCES_CONCURRENCY = 8
+# Number of last alert source runs that latency percentiles are calculated for
+ALERT_SOURCE_STATS_SAMPLES = 100
 ALERT_SERVICES_FACTORIES = {}
 SEND_ALERTS_ON_READY = False
 
@@ -155,6 +161,97 @@ class AlertPolicy:
         self.last_key_value_alerts.pop(alert.uuid, None)
 
 
+def alert_key(alert):
+    return alert.node, alert.source, alert.klass, alert.key
+
+
+def alert_row(alert):
+    """
+    `system.alert` row for `alert`.
+    """
+    d = copy.deepcopy(alert.__dict__)
+    d["klass"] = d["klass"].name
+    del d["mail"]
+    return d
+
+
+class AlertStore:
+    """
+    Alerts in insertion order indexed by (node, source, klass, key), by uuid and by source.
+
+    There can only be one alert for an (node, source, klass, key) tuple and for an uuid, adding an alert replaces the
+    existing ones.
+    """
+
+    def __init__(self, alerts=()):
+        self.alerts = {}
+        self.by_uuid = {}
+        self.by_source = defaultdict(dict)
+        for alert in alerts:
+            self.add(alert)
+
+    def __iter__(self):
+        return iter(list(self.alerts.values()))
+
+    def __len__(self):
+        return len(self.alerts)
+
+    def get(self, node, source, klass, key):
+        return self.alerts.get((node, source, klass, key))
+
+    def get_by_uuid(self, uuid):
+        return self.by_uuid.get(uuid)
+
+    def get_by_source(self, source):
+        return list(self.by_source.get(source, {}).values())
+
+    def add(self, alert):
+        if (existing := self.by_uuid.get(alert.uuid)) is not None:
+            self.__remove(existing)
+        if (existing := self.alerts.get(alert_key(alert))) is not None:
+            self.__remove(existing)
+
+        key = alert_key(alert)
+        self.alerts[key] = alert
+        self.by_uuid[alert.uuid] = alert
+        self.by_source[alert.source][key] = alert
+
+    def remove(self, alert):
+        """
+        Returns False if `alert` is not present.
+        """
+        if (existing := self.alerts.get(alert_key(alert))) is None or existing != alert:
+            return False
+
+        self.__remove(existing)
+        return True
+
+    def replace_source(self, source, alerts):
+        """
+        Replace all alerts of `source` with `alerts`.
+        """
+        for alert in self.get_by_source(source):
+            self.__remove(alert)
+
+        for alert in alerts:
+            self.add(alert)
+
+    def remove_if(self, predicate):
+        for alert in [alert for alert in self.alerts.values() if predicate(alert)]:
+            self.__remove(alert)
+
+    def __remove(self, alert):
+        key = alert_key(alert)
+        del self.alerts[key]
+        if self.by_uuid.get(alert.uuid) is alert:
+            del self.by_uuid[alert.uuid]
+
+        source_alerts = self.by_source[alert.source]
+        del source_alerts[key]
+        if not source_alerts:
+            del self.by_source[alert.source]
+
+
 def get_alert_level(alert, classes):
     return AlertLevel[classes.get(alert.klass.name, {}).get("level", alert.klass.level.name)]
 
@@ -258,7 +355,13 @@ class AlertService(Service):
             "max": 0,
             "total_count": 0,
             "total_time": 0,
+            "timeouts": 0,
+            "samples": deque(maxlen=ALERT_SOURCE_STATS_SAMPLES),
         })
+        self.sources_tasks = {}
+        # `system.alert` rows by uuid as they were last written to the database (`None` if the table contents are
+        # unknown and have to be rewritten)
+        self.flushed_alerts = None
 
     @private
     def load_impl(self):
@@ -288,11 +391,18 @@ class AlertService(Service):
             if await self.middleware.call("failover.node") == "B":
                 self.node = "B"
 
-        self.alerts = []
+        self.alerts = AlertStore()
+        self.flushed_alerts = None
         if load:
             alerts_uuids = set()
             alerts_by_classes = defaultdict(list)
-            for alert in await self.middleware.call("datastore.query", "system.alert"):
+            rows = await self.middleware.call("datastore.query", "system.alert")
+            if len({row["uuid"] for row in rows}) == len(rows):
+                self.flushed_alerts = {
+                    row["uuid"]: copy.deepcopy({k: v for k, v in row.items() if k != "id"}) for row in rows
+                }
+
+            for alert in rows:
                 del alert["id"]
 
                 if alert["source"] and alert["source"] not in ALERT_SOURCES:
@@ -320,7 +430,8 @@ class AlertService(Service):
                 if isinstance(alerts[0].klass, OneShotAlertClass):
                     alerts = await alerts[0].klass.load(alerts)
 
-                self.alerts.extend(alerts)
+                for alert in alerts:
+                    self.alerts.add(alert)
         else:
             await self.flush_alerts()
 
@@ -426,19 +537,13 @@ class AlertService(Service):
 
         return nodes
 
-    def __alert_by_uuid(self, uuid):
-        try:
-            return [a for a in self.alerts if a.uuid == uuid][0]
-        except IndexError:
-            return None
-
     @api_method(AlertDismissArgs, AlertDismissResult, roles=['ALERT_LIST_WRITE'])
     async def dismiss(self, uuid):
         """
         Dismiss `id` alert.
         """
 
-        alert = self.__alert_by_uuid(uuid)
+        alert = self.alerts.get_by_uuid(uuid)
         if alert is None:
             return
 
@@ -456,11 +561,7 @@ class AlertService(Service):
             await self._send_alert_changed_event(alert)
 
     def _delete_on_dismiss(self, alert):
-        try:
-            self.alerts.remove(alert)
-            removed = True
-        except ValueError:
-            removed = False
+        removed = self.alerts.remove(alert)
 
         for policy in self.policies.values():
             policy.delete_alert(alert)
@@ -474,7 +575,7 @@ class AlertService(Service):
         Restore `id` alert which had been dismissed.
         """
 
-        alert = self.__alert_by_uuid(uuid)
+        alert = self.alerts.get_by_uuid(uuid)
         if alert is None:
             return
 
@@ -706,7 +807,7 @@ class AlertService(Service):
         locked = self.blocked_sources[name]
         if locked:
             self.logger.debug("Not running alert source %r because it is blocked", name)
-            for i in filter(lambda x: x.source == name, self.alerts):
+            for i in self.alerts.get_by_source(name):
                 if i.node == this_node:
                     this_node_alerts.append(i)
                 elif i.node == other_node:
@@ -714,11 +815,18 @@ class AlertService(Service):
         return this_node_alerts, other_node_alerts, locked
 
     async def __run_other_node_alert_source(self, name):
+        """
+        Returns None if the source did not finish in its timeout on the other node.
+        """
         keys = ("args", "datetime", "last_occurrence", "dismissed", "mail",)
         other_node_alerts = []
         try:
             try:
-                for alert in await self.middleware.call("failover.call_remote", "alert.run_source", [name]):
+                # Other node enforces the source timeout itself, leave some room for the network round-trip
+                remote_alerts = await self.middleware.call(
+                    "failover.call_remote", "alert.run_source", [name], {"timeout": ALERT_SOURCES[name].timeout + 10},
+                )
+                for alert in remote_alerts:
                     other_node_alerts.append(
                         Alert(**dict(
                             {k: v for k, v in alert.items() if k in keys},
@@ -728,6 +836,9 @@ class AlertService(Service):
                         ))
                     )
             except CallError as e:
+                if e.errno == errno.EINPROGRESS:
+                    return None
+
                 if e.errno not in NETWORK_ERRORS + (CallError.EALERTCHECKERUNAVAILABLE,):
                     raise
         except ReserveFDException:
@@ -748,6 +859,7 @@ class AlertService(Service):
             if source_lock.expires_at <= time.monotonic():
                 await self.unblock_source(k)
 
+        due_sources = []
         for alert_source in ALERT_SOURCES.values():
             if product_type not in alert_source.products:
                 continue
@@ -759,40 +871,51 @@ class AlertService(Service):
                 continue
 
             self.alert_source_last_run[alert_source.name] = utc_now()
+            due_sources.append(alert_source)
+
+        # Sources are ran concurrently but their results are handled in the same order as they were ran in sequence
+        semaphore = asyncio.Semaphore(ALERT_SOURCES_CONCURRENCY)
+        results = await asyncio.gather(*[
+            self.__run_due_alert_source(alert_source, fi, semaphore) for alert_source in due_sources
+        ])
+        for alert_source, (this_node_alerts, other_node_alerts) in zip(due_sources, results):
+            for talert, oalert in zip_longest(this_node_alerts, other_node_alerts, fillvalue=None):
+                if talert is not None:
+                    talert.node = fi.this_node
+                    self.__handle_alert(talert)
+                if oalert is not None:
+                    oalert.node = fi.other_node
+                    self.__handle_alert(oalert)
+
+            self.alerts.replace_source(alert_source.name, this_node_alerts + other_node_alerts)
 
+    async def __run_due_alert_source(self, alert_source, fi, semaphore):
+        async with semaphore:
             this_node_alerts, other_node_alerts, locked = await self.__handle_locked_alert_source(
                 alert_source.name, fi.this_node, fi.other_node
             )
             if not locked:
                 self.logger.trace("Running alert source: %r", alert_source.name)
                 try:
-                    this_node_alerts = await self.__run_source(alert_source.name)
+                    this_node_alerts = await self.__run_source_with_timeout(alert_source.name)
                 except UnavailableException:
                     pass
+                except asyncio.TimeoutError:
+                    # Keep the alerts of the previous run until the source finishes
+                    this_node_alerts = self.__node_alerts(alert_source.name, fi.this_node)
 
                 if fi.run_on_backup_node and alert_source.run_on_backup_node:
                     other_node_alerts = await self.__run_other_node_alert_source(alert_source.name)
+                    if other_node_alerts is None:
+                        other_node_alerts = self.__node_alerts(alert_source.name, fi.other_node)
 
-            for talert, oalert in zip_longest(this_node_alerts, other_node_alerts, fillvalue=None):
-                if talert is not None:
-                    talert.node = fi.this_node
-                    self.__handle_alert(talert)
-                if oalert is not None:
-                    oalert.node = fi.other_node
-                    self.__handle_alert(oalert)
+        return this_node_alerts, other_node_alerts
 
-            self.alerts = (
-                [a for a in self.alerts if a.source != alert_source.name] + this_node_alerts + other_node_alerts
-            )
+    def __node_alerts(self, source_name, node):
+        return [alert for alert in self.alerts.get_by_source(source_name) if alert.node == node]
 
     def __handle_alert(self, alert):
-        try:
-            existing_alert = [
-                a for a in self.alerts
-                if (a.node, a.source, a.klass, a.key) == (alert.node, alert.source, alert.klass, alert.key)
-            ][0]
-        except IndexError:
-            existing_alert = None
+        existing_alert = self.alerts.get(alert.node, alert.source, alert.klass, alert.key)
 
         if existing_alert is None:
             alert.uuid = self.__uuid()
@@ -811,7 +934,7 @@ class AlertService(Service):
             alert.dismissed = existing_alert.dismissed
 
     def __expire_alerts(self):
-        self.alerts = list(filter(lambda alert: not self.__should_expire_alert(alert), self.alerts))
+        self.alerts.remove_if(self.__should_expire_alert)
 
     def __should_expire_alert(self, alert):
         if issubclass(alert.klass, OneShotAlertClass):
@@ -822,18 +945,32 @@ class AlertService(Service):
 
     @private
     async def sources_stats(self):
-        return {
-            k: {"avg": v["total_time"] / v["total_count"] if v["total_count"] != 0 else 0, **v}
-            for k, v in sorted(self.sources_run_times.items(), key=lambda t: t[0])
-        }
+        """
+        Alert sources run times. `p50` and `p95` are calculated for the last `ALERT_SOURCE_STATS_SAMPLES` runs.
+        """
+        stats = {}
+        for k, v in sorted(self.sources_run_times.items(), key=lambda t: t[0]):
+            v = v.copy()
+            samples = sorted(v.pop("samples"))
+            stats[k] = {
+                "avg": v["total_time"] / v["total_count"] if v["total_count"] != 0 else 0,
+                "p50": samples[(len(samples) - 1) // 2] if samples else 0,
+                "p95": samples[max(0, math.ceil(len(samples) * 0.95) - 1)] if samples else 0,
+                **v,
+            }
+
+        return stats
 
     @private
     async def run_source(self, source_name):
         try:
             return [dict(alert.__dict__, klass=alert.klass.name)
-                    for alert in await self.__run_source(source_name)]
+                    for alert in await self.__run_source_with_timeout(source_name)]
         except UnavailableException:
             raise CallError("This alert checker is unavailable", CallError.EALERTCHECKERUNAVAILABLE)
+        except asyncio.TimeoutError:
+            # The run continues and its result is returned the next time the source is ran
+            raise CallError("This alert checker did not finish in time", errno.EINPROGRESS)
 
     @private
     async def block_source(self, source_name, timeout=3600):
@@ -856,6 +993,25 @@ class AlertService(Service):
         # This values come from observation from support of how long a M-series boot can take.
         self.blocked_failover_alerts_until = time.monotonic() + 900
 
+    async def __run_source_with_timeout(self, source_name):
+        """
+        Raises `asyncio.TimeoutError` if the source does not finish in its `timeout`. The run is not cancelled (threads
+        can't be) and its result is awaited (instead of starting another run) the next time the source is due.
+        """
+        if (task := self.sources_tasks.get(source_name)) is None:
+            task = self.sources_tasks[source_name] = asyncio.create_task(self.__run_source(source_name))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), ALERT_SOURCES[source_name].timeout)
+        except asyncio.TimeoutError:
+            self.sources_run_times[source_name]["timeouts"] += 1
+            self.logger.warning("Alert source %r did not finish in %s seconds", source_name,
+                                ALERT_SOURCES[source_name].timeout)
+            raise
+        finally:
+            if task.done():
+                self.sources_tasks.pop(source_name, None)
+
     async def __run_source(self, source_name):
         alert_source = ALERT_SOURCES[source_name]
 
@@ -887,6 +1043,7 @@ class AlertService(Service):
             source_stat["max"] = max(source_stat["max"], run_time)
             source_stat["total_count"] += 1
             source_stat["total_time"] += run_time
+            source_stat["samples"].append(run_time)
 
         keys = set()
         unique_alerts = []
@@ -910,13 +1067,27 @@ class AlertService(Service):
             if await self.middleware.call('failover.status') == 'BACKUP':
                 return
 
-        await self.middleware.call("datastore.delete", "system.alert", [])
+        rows = {alert.uuid: alert_row(alert) for alert in self.alerts}
+        if self.flushed_alerts is None:
+            await self.middleware.call("datastore.delete", "system.alert", [])
+            self.flushed_alerts = {}
+
+        # Only rows that have changed since the last flush are written (each write is also replicated to the
+        # standby controller)
+        if removed := [alert_uuid for alert_uuid in self.flushed_alerts if alert_uuid not in rows]:
+            await self.middleware.call("datastore.delete", "system.alert", [["uuid", "in", removed]])
+            for alert_uuid in removed:
+                self.flushed_alerts.pop(alert_uuid)
+
+        for alert_uuid, row in rows.items():
+            if (flushed := self.flushed_alerts.get(alert_uuid)) is None:
+                await self.middleware.call("datastore.insert", "system.alert", row)
+            elif flushed != row:
+                await self.middleware.call("datastore.update", "system.alert", [["uuid", "=", alert_uuid]], row)
+            else:
+                continue
 
-        for alert in self.alerts:
-            d = alert.__dict__.copy()
-            d["klass"] = d["klass"].name
-            del d["mail"]
-            await self.middleware.call("datastore.insert", "system.alert", d)
+            self.flushed_alerts[alert_uuid] = row
 
     @api_method(AlertOneshotCreateArgs, AlertOneshotCreateResult, private=True)
     @job(
@@ -954,7 +1125,7 @@ class AlertService(Service):
 
         self.__handle_alert(alert)
 
-        self.alerts = [a for a in self.alerts if a.uuid != alert.uuid] + [alert]
+        self.alerts.add(alert)
 
         await self.middleware.call("alert.send_alerts")
 
@@ -5,6 +5,7 @@ import typing
 from middlewared.service_exception import CallError
 
 from .ix_apps.lifecycle import get_rendered_templates_of_app
+from .ix_apps.state import APP_RESOURCES
 from .utils import PROJECT_PREFIX, run
 
 
@@ -51,7 +52,13 @@ def compose_action(
         raise CallError(f'Invalid action {action!r} for app {app_name!r}')
 
     # TODO: We will likely have a configurable timeout on this end
-    cp = run(['docker', '--config', '/etc/docker', 'compose'] + compose_files + args, timeout=1200)
+    try:
+        cp = run(['docker', '--config', '/etc/docker', 'compose'] + compose_files + args, timeout=1200)
+    finally:
+        if action != 'pull':
+            # Callers expect `app.query` to reflect the change right away and not once docker events are processed
+            APP_RESOURCES.invalidate(f'{PROJECT_PREFIX}{app_name}')
+
     if cp.returncode != 0:
         logger.error('Failed %r action for %r app: %s', action, app_name, cp.stderr)
         err_msg = f'Failed {action!r} action for {app_name!r} app.'
@@ -1,10 +1,13 @@
 from middlewared.service import Service
 
+from .ix_apps.state import APP_RESOURCES
 from .ix_apps.utils import get_app_name_from_project_name
 from .utils import get_app_stop_cache_key
 
 
 PROCESSING_APP_EVENT = set()
+# Apps that received events while their previous events were being processed
+PENDING_APP_EVENT = set()
 
 
 class AppEvents(Service):
@@ -24,18 +27,28 @@ class AppEvents(Service):
 
 
 async def app_event(middleware, event_type, args):
+    # Only docker resources of this app will be re-read on the next `app.query`
+    APP_RESOURCES.invalidate(args['id'])
+
     app_name = get_app_name_from_project_name(args['id'])
     if app_name in PROCESSING_APP_EVENT:
+        # Events that arrive while the app is being processed are coalesced into a single re-run
+        PENDING_APP_EVENT.add(app_name)
         return
 
     PROCESSING_APP_EVENT.add(app_name)
 
     try:
-        await middleware.call('app.events.process', app_name, args['fields'])
+        while True:
+            PENDING_APP_EVENT.discard(app_name)
+            await middleware.call('app.events.process', app_name, args['fields'])
+            if app_name not in PENDING_APP_EVENT:
+                break
     except Exception as e:
         middleware.logger.warning('Unhandled exception: %s', e)
     finally:
         PROCESSING_APP_EVENT.remove(app_name)
+        PENDING_APP_EVENT.discard(app_name)
 
 
 async def setup(middleware):
@@ -1,10 +1,17 @@
+import concurrent.futures
 from collections import defaultdict
 
 import requests
 
+from middlewared.plugins.reporting.realtime_reporting.cgroup import get_pid_cgroup_path, read_cgroup_usage
+
 from .utils import get_docker_client, PROJECT_KEY
 
 
+NETWORK_MODES_WITHOUT_STATS = ('host', 'none')
+STATS_CONCURRENCY = 8
+
+
 def get_default_stats():
     return defaultdict(lambda: {
         'cpu_usage': 0,
@@ -29,24 +36,62 @@ def list_resources_stats_by_project(project_name: str | None = None) -> dict:
                 raise
 
 
+def get_container_stats(container) -> dict | None:
+    """
+    CPU, memory and I/O counters are read from the container's cgroup, docker API is only queried for network
+    counters (and for everything if cgroup v2 files are not available). Returns None for containers that are not
+    running.
+    """
+    if not (pid := container.attrs.get('State', {}).get('Pid')):
+        return None
+
+    network_mode = container.attrs.get('HostConfig', {}).get('NetworkMode') or ''
+    if (cgroup_path := get_pid_cgroup_path(pid)) and (usage := read_cgroup_usage(cgroup_path)):
+        if network_mode in NETWORK_MODES_WITHOUT_STATS or network_mode.startswith('container:'):
+            # Docker does not report network stats for containers that do not have their own network namespace
+            return usage | {'networks': {}}
+
+        stats = container.stats(stream=False, decode=None, one_shot=True)
+        return usage | {'networks': stats.get('networks', {})}
+
+    stats = container.stats(stream=False, decode=None, one_shot=True)
+    return {
+        'cpu_usage': stats.get('cpu_stats', {}).get('cpu_usage', {}).get('total_usage', 0),
+        'memory': stats.get('memory_stats', {}).get('usage', 0),
+        'blkio': {
+            op: sum(
+                entry['value']
+                for entry in stats.get('blkio_stats', {}).get('io_service_bytes_recursive') or []
+                if entry['op'] == op
+            )
+            for op in ('read', 'write')
+        },
+        'networks': stats.get('networks', {}),
+    }
+
+
 def list_resources_stats_by_project_internal(project_name: str | None = None) -> dict:
     projects = get_default_stats()
     with get_docker_client() as client:
         label_filter = {'label': f'{PROJECT_KEY}={project_name}' if project_name else PROJECT_KEY}
-        for container in client.containers.list(all=True, filters=label_filter, sparse=False):
-            stats = container.stats(stream=False, decode=None, one_shot=True)
-            project = container.labels.get(PROJECT_KEY)
-            if not project:
-                continue
-
-            blkio_container_stats = stats.get('blkio_stats', {}).get('io_service_bytes_recursive') or {}
-            project_stats = projects[project]
-            project_stats['cpu_usage'] += stats.get('cpu_stats', {}).get('cpu_usage', {}).get('total_usage', 0)
-            project_stats['memory'] += stats.get('memory_stats', {}).get('usage', 0)
-            for entry in filter(lambda x: x['op'] in ('read', 'write'), blkio_container_stats):
-                project_stats['blkio'][entry['op']] += entry['value']
-            for net_name, net_values in stats.get('networks', {}).items():
-                project_stats['networks'][net_name]['rx_bytes'] += net_values.get('rx_bytes', 0)
-                project_stats['networks'][net_name]['tx_bytes'] += net_values.get('tx_bytes', 0)
+        containers = [
+            container for container in client.containers.list(all=True, filters=label_filter, sparse=False)
+            if container.labels.get(PROJECT_KEY)
+        ]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=STATS_CONCURRENCY) as executor:
+            containers_stats = list(executor.map(get_container_stats, containers))
+
+    for container, stats in zip(containers, containers_stats):
+        project_stats = projects[container.labels[PROJECT_KEY]]
+        if stats is None:
+            continue
+
+        project_stats['cpu_usage'] += stats['cpu_usage']
+        project_stats['memory'] += stats['memory']
+        for op in ('read', 'write'):
+            project_stats['blkio'][op] += stats['blkio'][op]
+        for net_name, net_values in stats['networks'].items():
+            project_stats['networks'][net_name]['rx_bytes'] += net_values.get('rx_bytes', 0)
+            project_stats['networks'][net_name]['tx_bytes'] += net_values.get('tx_bytes', 0)
 
     return projects
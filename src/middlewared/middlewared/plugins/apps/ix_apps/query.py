@@ -1,12 +1,12 @@
+import copy
 import os
 from collections import defaultdict
 from dataclasses import dataclass
 from pkg_resources import parse_version
 
-from .docker.query import list_resources_by_project
-from .metadata import get_collective_config, get_collective_metadata
 from .lifecycle import get_current_app_config
 from .path import get_app_parent_config_path
+from .state import app_resources_by_project, collective_config, collective_metadata
 from .utils import AppState, ContainerState, get_app_name_from_project_name, normalize_reference, PROJECT_PREFIX
 
 
@@ -33,10 +33,10 @@ def upgrade_available_for_app(
     if app_metadata['custom_app'] is False and version_mapping.get(
         catalog_app_metadata['train'], {}
     ).get(catalog_app_metadata['name']):
-        latest_version = version_mapping[catalog_app_metadata['train']][catalog_app_metadata['name']]['version']
-        return parse_version(catalog_app_metadata['version']) < parse_version(
-            latest_version
-        ), latest_version
+        latest = version_mapping[catalog_app_metadata['train']][catalog_app_metadata['name']]
+        # Catalog index has latest versions already parsed
+        latest_parsed = latest.get('parsed_version') or parse_version(latest['version'])
+        return parse_version(catalog_app_metadata['version']) < latest_parsed, latest['version']
     elif app_metadata['custom_app'] and image_updates_available:
         return True, None
     else:
@@ -77,10 +77,10 @@ def list_apps(
     apps = []
     image_update_cache = image_update_cache or {}
     app_names = set()
-    metadata = get_collective_metadata()
-    collective_config = get_collective_config() if retrieve_config else {}
+    metadata = collective_metadata()
+    apps_config = collective_config() if retrieve_config else {}
     # This will only give us apps which are running or in deploying state
-    for app_name, app_resources in list_resources_by_project(
+    for app_name, app_resources in app_resources_by_project(
         project_name=f'{PROJECT_PREFIX}{specific_app}' if specific_app else None,
     ).items():
         app_name = get_app_name_from_project_name(app_name)
@@ -131,7 +131,7 @@ def list_apps(
             # against the same docker tag
             app_data['upgrade_available'] = True
 
-        apps.append(app_data | get_config_of_app(app_data, collective_config, retrieve_config))
+        apps.append(app_data | get_config_of_app(app_data, apps_config, retrieve_config))
 
     if specific_app and specific_app in app_names:
         return apps
@@ -158,7 +158,7 @@ def list_apps(
                 'image_updates_available': False,
                 **app_metadata | {'portals': normalize_portal_uris(app_metadata['portals'], host_ip)}
             }
-            apps.append(app_data | get_config_of_app(app_data, collective_config, retrieve_config))
+            apps.append(app_data | get_config_of_app(app_data, apps_config, retrieve_config))
 
     return apps
 
@@ -246,6 +246,6 @@ def translate_resources_to_desired_workflow(app_resources: dict) -> dict:
     workloads.update({
         'images': list(images),
         'volumes': [v.__dict__ for v in volumes],
-        'networks': app_resources['networks'],
+        'networks': copy.deepcopy(app_resources['networks']),
     })
     return workloads
@@ -0,0 +1,116 @@
+import copy
+import os
+import threading
+import time
+
+from .docker.query import list_resources_by_project
+from .metadata import get_collective_config, get_collective_metadata
+from .path import get_collective_config_path, get_collective_metadata_path
+
+
+# Docker resources of all apps are re-read from scratch at least this often to correct any drift
+# (i.e. docker events that were missed while the events stream was being re-established)
+RECONCILE_INTERVAL = 120
+
+
+class AppResourcesCache:
+    """
+    Docker resources (containers, networks and volumes) of apps by project name.
+
+    Projects are marked dirty by `docker.events` and only dirty projects are re-read from docker when
+    resources are requested.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dirty_lock = threading.Lock()
+        self.projects = {}
+        self.dirty = set()
+        self.loaded_at = None
+
+    def invalidate(self, project: str | None = None):
+        """
+        Mark `project` (or all projects if not specified) as dirty. This never blocks on docker queries and so it is
+        safe to call from the event loop.
+        """
+        with self.dirty_lock:
+            if project is None:
+                self.loaded_at = None
+            else:
+                self.dirty.add(project)
+
+    def get(self, project_name: str | None = None) -> dict[str, dict]:
+        with self.lock:
+            with self.dirty_lock:
+                reconcile = self.loaded_at is None or time.monotonic() - self.loaded_at > RECONCILE_INTERVAL
+                if reconcile:
+                    self.dirty.clear()
+                    self.loaded_at = time.monotonic()
+                    dirty = set()
+                elif project_name:
+                    dirty = self.dirty & {project_name}
+                    self.dirty -= dirty
+                else:
+                    dirty, self.dirty = self.dirty, set()
+
+            try:
+                if reconcile:
+                    self.projects = dict(list_resources_by_project())
+
+                for project in dirty:
+                    if resources := list_resources_by_project(project_name=project).get(project):
+                        self.projects[project] = resources
+                    else:
+                        self.projects.pop(project, None)
+            except Exception:
+                self.invalidate()
+                raise
+
+            if project_name:
+                return {project_name: self.projects[project_name]} if project_name in self.projects else {}
+
+            return dict(self.projects)
+
+
+class YamlFileCache:
+    """
+    Contents of a YAML file that are only re-read when the file is replaced or modified.
+    """
+
+    def __init__(self, get_path, load):
+        self.get_path = get_path
+        self.load = load
+        self.lock = threading.Lock()
+        self.key = None
+        self.data = None
+
+    def get(self) -> dict:
+        try:
+            st = os.stat(self.get_path())
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            key = None
+
+        with self.lock:
+            if self.data is None or key is None or key != self.key:
+                self.data = self.load()
+                self.key = key
+
+            return copy.deepcopy(self.data)
+
+
+APP_RESOURCES = AppResourcesCache()
+COLLECTIVE_CONFIG = YamlFileCache(get_collective_config_path, get_collective_config)
+COLLECTIVE_METADATA = YamlFileCache(get_collective_metadata_path, get_collective_metadata)
+
+
+def app_resources_by_project(project_name: str | None = None) -> dict[str, dict]:
+    return APP_RESOURCES.get(project_name)
+
+
+def collective_config() -> dict[str, dict]:
+    return COLLECTIVE_CONFIG.get()
+
+
+def collective_metadata() -> dict[str, dict]:
+    return COLLECTIVE_METADATA.get()
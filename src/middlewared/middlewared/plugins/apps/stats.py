@@ -1,3 +1,4 @@
+import threading
 import time
 
 from middlewared.event import EventSource
@@ -10,6 +11,92 @@ from .ix_apps.docker.stats import list_resources_stats_by_project
 from .stats_util import normalize_projects_stats
 
 
+class AppStatsSampler:
+    """
+    Samples stats of all apps every `interval` seconds in a single thread and shares the results with all
+    `app.stats` subscribers that requested this interval. The thread exits when the last subscriber is gone.
+    """
+
+    samplers = {}
+    samplers_lock = threading.Lock()
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.cond = threading.Condition()
+        self.subscribers = 0
+        self.seq = 0
+        self.result = None
+        self.error = None
+        self.thread = None
+
+    @classmethod
+    def subscribe(cls, interval):
+        with cls.samplers_lock:
+            sampler = cls.samplers.setdefault(interval, cls(interval))
+            with sampler.cond:
+                sampler.subscribers += 1
+                if sampler.thread is None:
+                    sampler.error = None
+                    sampler.thread = threading.Thread(
+                        target=sampler.run, name=f'app_stats_sampler_{interval}', daemon=True,
+                    )
+                    sampler.thread.start()
+
+            return sampler
+
+    def unsubscribe(self):
+        with self.cond:
+            self.subscribers -= 1
+            self.cond.notify_all()
+
+    def next(self, seq, timeout):
+        """
+        Wait for a sample newer than `seq`. Returns a tuple of (<seq>, <stats>) or (`seq`, None) if `timeout` expires.
+        Raises the exception that the sampler failed with.
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq > seq or self.error is not None, timeout)
+            if self.seq > seq:
+                return self.seq, self.result
+
+            if self.error is not None:
+                raise self.error
+
+            return seq, None
+
+    def run(self):
+        try:
+            old_projects_stats = list_resources_stats_by_project()
+            old_time = time.monotonic()
+            while True:
+                with self.cond:
+                    self.cond.wait_for(lambda: self.subscribers <= 0, self.interval)
+
+                with self.samplers_lock, self.cond:
+                    if self.subscribers <= 0:
+                        self.thread = None
+                        self.samplers.pop(self.interval, None)
+                        return
+
+                project_stats = list_resources_stats_by_project()
+                now = time.monotonic()
+                result = normalize_projects_stats(project_stats, old_projects_stats, now - old_time)
+                old_projects_stats, old_time = project_stats, now
+
+                with self.cond:
+                    self.seq += 1
+                    self.result = result
+                    self.cond.notify_all()
+        except Exception as e:
+            with self.samplers_lock, self.cond:
+                self.error = e
+                self.thread = None
+                if self.subscribers <= 0:
+                    self.samplers.pop(self.interval, None)
+
+                self.cond.notify_all()
+
+
 class AppStatsEventSource(EventSource):
 
     """
@@ -51,23 +138,22 @@ class AppStatsEventSource(EventSource):
         if not self.middleware.call_sync('docker.state.validate', False):
             raise CallError('Apps are not available')
 
-        old_projects_stats = list_resources_stats_by_project()
-        interval = self.arg['interval']
-        time.sleep(interval)
+        sampler = AppStatsSampler.subscribe(self.arg['interval'])
+        try:
+            seq = sampler.seq
+            while not self._cancel_sync.is_set():
+                try:
+                    seq, stats = sampler.next(seq, 1)
+                except Exception:
+                    if self.middleware.call_sync('docker.status')['status'] != Status.RUNNING.value:
+                        return
 
-        while not self._cancel_sync.is_set():
-            try:
-                project_stats = list_resources_stats_by_project()
-                self.send_event(
-                    'ADDED', fields=normalize_projects_stats(project_stats, old_projects_stats, interval)
-                )
-                old_projects_stats = project_stats
-                time.sleep(interval)
-            except Exception:
-                if self.middleware.call_sync('docker.status')['status'] != Status.RUNNING.value:
-                    return
+                    raise
 
-                raise
+                if stats is not None:
+                    self.send_event('ADDED', fields=stats)
+        finally:
+            sampler.unsubscribe()
 
 
 def setup(middleware):
@@ -1,6 +1,6 @@
 from middlewared.utils.cpu import cpu_info
 
-from .ix_apps.metadata import get_collective_metadata
+from .ix_apps.state import collective_metadata
 from .ix_apps.utils import get_app_name_from_project_name
 
 NANO_SECOND = 1000000000
@@ -8,7 +8,7 @@ NANO_SECOND = 1000000000
 
 def normalize_projects_stats(all_projects_stats: dict, old_stats: dict, interval: int) -> list[dict]:
     normalized_projects_stats = []
-    all_configured_apps = get_collective_metadata()
+    all_configured_apps = collective_metadata()
     for project, data in all_projects_stats.items():
         app_name = get_app_name_from_project_name(project)
         if app_name not in all_configured_apps:
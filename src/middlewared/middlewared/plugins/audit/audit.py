@@ -1,17 +1,16 @@
 import asyncio
-import csv
 import errno
+import itertools
 import middlewared.sqlalchemy as sa
 import os
 import shutil
 import time
 import uuid
-import yaml
-
-from truenas_api_client import json as ejson
 
+from .export import export_entries
 from .utils import (
     AUDIT_DATASET_PATH,
+    AUDIT_EXPORT_BATCH_SIZE,
     AUDIT_LIFETIME,
     AUDIT_LOG_PATH_NAME,
     AUDIT_DEFAULT_RESERVATION,
@@ -197,9 +196,6 @@ class AuditService(ConfigService):
         `success` - boolean value indicating whether the action generating the
         event message succeeded.
         """
-
-        verrors = ValidationErrors()
-
         # If HA, handle the possibility of remote controller requests
         if await self.middleware.call('failover.licensed') and data['remote_controller']:
             data.pop('remote_controller')
@@ -226,6 +222,32 @@ class AuditService(ConfigService):
                 self.logger.exception('Unexpected failure querying remote node for audit entries')
                 raise
 
+        services_to_check, filters, options, sql_filters = self.__query_plan(data)
+
+        if options.get('count'):
+            results = 0
+        else:
+            results = []
+
+        for op in await asyncio.gather(*[
+            self.middleware.call('auditbackend.query', svc, filters, options)
+            for svc in services_to_check
+        ]):
+            results += op
+
+        if sql_filters:
+            return results
+
+        return filter_list(results, data['query-filters'], data['query-options'])
+
+    def __query_plan(self, data):
+        """
+        Validate `audit.query` payload and determine how it is going to be executed.
+
+        Returns a tuple of (<databases to query>, <auditbackend filters>, <auditbackend options>,
+        <whether results need no further filtering in python>).
+        """
+        verrors = ValidationErrors()
         sql_filters = data['query-options']['force_sql_filters']
 
         if (select := data['query-options'].get('select')):
@@ -263,24 +285,10 @@ class AuditService(ConfigService):
                 # set sql_filters so that we don't pass through filter_list
                 sql_filters = True
 
-        if options.get('count'):
-            results = 0
-        else:
-            results = []
-
         # `services_to_check` is a set and so ordering isn't guaranteed;
         # however, strict ordering when multiple databases are queried is
         # a requirement for pagination and consistent results.
-        for op in await asyncio.gather(*[
-            self.middleware.call('auditbackend.query', svc, filters, options)
-            for svc in ALL_AUDITED if svc in services_to_check
-        ]):
-            results += op
-
-        if sql_filters:
-            return results
-
-        return filter_list(results, data['query-filters'], data['query-options'])
+        return [svc for svc in ALL_AUDITED if svc in services_to_check], filters, options, sql_filters
 
     @accepts(
         Patch(
@@ -311,40 +319,72 @@ class AuditService(ConfigService):
 
         export_format = data.pop('export_format')
         job.set_progress(0, f'Quering data for {export_format} audit report')
-        if not (res := self.middleware.call_sync('audit.query', data)):
-            raise CallError('No entries were returned by query.', errno.ENOENT)
+        batches, total = self.__export_batches(data)
+        try:
+            if (first := next(batches, None)) is None:
+                raise CallError('No entries were returned by query.', errno.ENOENT)
 
-        if job.credentials:
-            username = job.credentials.user['username']
-        else:
-            username = 'root'
+            if job.credentials:
+                username = job.credentials.user['username']
+            else:
+                username = 'root'
+
+            target_dir = os.path.join(AUDIT_REPORTS_DIR, username)
+            os.makedirs(target_dir, mode=0o700, exist_ok=True)
 
-        target_dir = os.path.join(AUDIT_REPORTS_DIR, username)
-        os.makedirs(target_dir, mode=0o700, exist_ok=True)
-
-        filename = f'{uuid.uuid4()}.{export_format.lower()}'
-        destination = os.path.join(target_dir, filename)
-        with open(destination, 'w') as f:
-            job.set_progress(50, f'Writing audit report to {destination}.')
-            match export_format:
-                case 'CSV':
-                    fieldnames = res[0].keys()
-                    writer = csv.DictWriter(f, fieldnames=fieldnames)
-                    writer.writeheader()
-                    for entry in res:
-                        if entry.get('service_data'):
-                            entry['service_data'] = ejson.dumps(entry['service_data'])
-                        if entry.get('event_data'):
-                            entry['event_data'] = ejson.dumps(entry['event_data'])
-                        writer.writerow(entry)
-                case 'JSON':
-                    ejson.dump(res, f, indent=4)
-                case 'YAML':
-                    yaml.dump(res, f)
+            filename = f'{uuid.uuid4()}.{export_format.lower()}'
+            destination = os.path.join(target_dir, filename)
+
+            def progress(written):
+                job.set_progress(
+                    min(written * 99 // total, 99) if total else 50,
+                    f'Writing audit report to {destination}: {written} of approximately {total} entries written.',
+                )
+
+            with open(destination, 'w') as f:
+                export_entries(f, export_format, itertools.chain([first], batches), progress)
+        finally:
+            batches.close()
 
         job.set_progress(100, f'Audit report completed and available at {destination}')
         return os.path.join(target_dir, destination)
 
+    def __export_batches(self, data):
+        """
+        Returns a tuple of (<generator yielding non-empty lists of entries matching `audit.query` payload>,
+        <estimated number of entries>).
+
+        Entries are streamed from audit databases unless filtering or pagination has to be done on the
+        whole result set in python (or the query is for the remote controller).
+        """
+        if data['remote_controller'] and self.middleware.call_sync('failover.licensed'):
+            res = self.middleware.call_sync('audit.query', data)
+            return (batch for batch in [res] if batch), len(res)
+
+        services, filters, options, sql_filters = self.__query_plan(data)
+        if not sql_filters and any(data['query-options'].get(k) for k in ('order_by', 'offset', 'limit')):
+            res = self.middleware.call_sync('audit.query', data)
+            return (batch for batch in [res] if batch), len(res)
+
+        total = 0
+        for svc in services:
+            total += self.middleware.call_sync('auditbackend.query', svc, filters, {**options, 'count': True})
+        if sql_filters and options.get('limit'):
+            total = min(total, options['limit'] * len(services))
+
+        def batches():
+            for svc in services:
+                for batch in self.middleware.call_sync(
+                    'auditbackend.query_batches', svc, filters, options, AUDIT_EXPORT_BATCH_SIZE,
+                ):
+                    if not sql_filters:
+                        batch = filter_list(batch, data['query-filters'], {'select': data['query-options']['select']})
+
+                    if batch:
+                        yield batch
+
+        return batches(), total
+
     @accepts(
         Dict(
             'audit_download',
@@ -60,20 +60,23 @@ class SQLConn:
             self.connection.execute('PRAGMA journal_mode=WAL')
             self.dbfd = os.open(self.path, os.O_PATH)
 
-    def fetchall(self, query, params=None):
-        with self.lock:
-            if (st := os.fstat(self.dbfd)).st_nlink == 0:
+    def check_database(self):
+        if (st := os.fstat(self.dbfd)).st_nlink == 0:
+            raise RuntimeError(
+                f'{self.path}: audit database was unexpectedly deleted.'
+            )
+
+        try:
+            if os.lstat(self.path).st_ino != st.st_ino:
                 raise RuntimeError(
-                    f'{self.path}: audit database was unexpectedly deleted.'
+                    f'{self.path}: audit database was unexpectedly replaced.'
                 )
+        except FileNotFoundError:
+            raise RuntimeError(f'{self.path}: audit database was renamed.')
 
-            try:
-                if os.lstat(self.path).st_ino != st.st_ino:
-                    raise RuntimeError(
-                        f'{self.path}: audit database was unexpectedly replaced.'
-                    )
-            except FileNotFoundError:
-                raise RuntimeError(f'{self.path}: audit database was renamed.')
+    def fetchall(self, query, params=None):
+        with self.lock:
+            self.check_database()
 
             try:
                 cursor = self.connection.execute(query, params or [])
@@ -90,6 +93,33 @@ class SQLConn:
             finally:
                 cursor.close()
 
+    def fetch_batches(self, query, batch_size):
+        """
+        Generator yielding results of `query` in lists of up to `batch_size` rows.
+
+        A separate connection is used so that other queries of this database are not
+        blocked while the results are being consumed.
+        """
+        with self.lock:
+            self.check_database()
+            engine = self.engine
+
+        with engine.connect() as connection:
+            try:
+                cursor = connection.execute(query)
+            except DBAPIError as e:
+                # See note in `fetchall`
+                if not str(e.orig).startswith('no such table'):
+                    raise
+
+                return
+
+            try:
+                while rows := cursor.fetchmany(batch_size):
+                    yield rows
+            finally:
+                cursor.close()
+
     def enforce_retention(self, days):
         if not days or days < 0:
             raise ValueError("Days must be positive value greater than zero.")
@@ -176,29 +206,55 @@ class AuditBackendService(Service, FilterMixin, SchemaMixin):
         consumers except in special circumstances.
         """
         conn = self.connections[db_name]
-        order_by = options.get('order_by', []).copy()
-        from_ = conn.table
-
         if conn.connection is None:
             raise CallError(
                 f'{db_name}: connection to audit database is not initialized.'
             )
 
         if options['count']:
-            qs = select([func.count('ROW_ID')]).select_from(from_)
-        else:
-            columns = list(conn.table.c)
-            qs = select(columns).select_from(from_)
-
-        if filters:
-            qs = qs.where(and_(*self._filters_to_queryset(filters, conn.table, None, {})))
+            qs = select([func.count('ROW_ID')]).select_from(conn.table)
+            if filters:
+                qs = qs.where(and_(*self._filters_to_queryset(filters, conn.table, None, {})))
 
-        if options['count']:
             if not (results := self.__fetchall(conn, qs)):
                 return 0
 
             return results[0][0]
 
+        result = self.__fetchall(conn, self.__select(conn, filters, options))
+
+        if options['get']:
+            try:
+                return result[0]
+            except IndexError:
+                raise MatchNotFound() from None
+
+        return self.serialize_results(result, conn.table, options.get('select'))
+
+    @private
+    def query_batches(self, db_name, filters, options, batch_size):
+        """
+        Same as `query` (except for `count` and `get` query-options) but returns a
+        generator yielding serialized results in lists of up to `batch_size` entries so
+        that large result sets can be processed without holding them in memory.
+        """
+        conn = self.connections[db_name]
+        if conn.connection is None:
+            raise CallError(
+                f'{db_name}: connection to audit database is not initialized.'
+            )
+
+        qs = self.__select(conn, filters, options)
+        for rows in conn.fetch_batches(qs, batch_size):
+            yield self.serialize_results(rows, conn.table, options.get('select'))
+
+    def __select(self, conn, filters, options):
+        order_by = options.get('order_by', []).copy()
+        qs = select(list(conn.table.c)).select_from(conn.table)
+
+        if filters:
+            qs = qs.where(and_(*self._filters_to_queryset(filters, conn.table, None, {})))
+
         if order_by:
             for i, order in enumerate(order_by):
                 wrapper = None
@@ -219,21 +275,13 @@ class AuditBackendService(Service, FilterMixin, SchemaMixin):
 
             qs = qs.order_by(*order_by)
 
-        if options['offset']:
+        if options.get('offset'):
             qs = qs.offset(options['offset'])
 
-        if options['limit']:
+        if options.get('limit'):
             qs = qs.limit(options['limit'])
 
-        result = self.__fetchall(conn, qs)
-
-        if options['get']:
-            try:
-                return result[0]
-            except IndexError:
-                raise MatchNotFound() from None
-
-        return self.serialize_results(result, conn.table, options.get('select'))
+        return qs
 
     @private
     @periodic(interval=86400, run_on_start=False)
@@ -0,0 +1,86 @@
+import csv
+import textwrap
+
+import yaml
+
+from truenas_api_client import json as ejson
+
+
+def write_csv(f, batches, progress):
+    """
+    Columns are the keys of the first entry. JSON columns are serialized.
+    """
+    written = 0
+    writer = None
+    for batch in batches:
+        for entry in batch:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=entry.keys())
+                writer.writeheader()
+
+            row = entry
+            if entry.get('service_data') or entry.get('event_data'):
+                row = entry.copy()
+                if entry.get('service_data'):
+                    row['service_data'] = ejson.dumps(entry['service_data'])
+                if entry.get('event_data'):
+                    row['event_data'] = ejson.dumps(entry['event_data'])
+
+            writer.writerow(row)
+
+        written += len(batch)
+        progress(written)
+
+    return written
+
+
+def write_json(f, batches, progress):
+    """
+    Output is the same as of `ejson.dump(entries, f, indent=4)`.
+    """
+    written = 0
+    f.write('[')
+    for batch in batches:
+        for entry in batch:
+            f.write(',\n' if written else '\n')
+            f.write(textwrap.indent(ejson.dumps(entry, indent=4), '    ', lambda line: True))
+            written += 1
+
+        progress(written)
+
+    f.write('\n]' if written else ']')
+    return written
+
+
+def write_yaml(f, batches, progress):
+    """
+    Output is the same as of `yaml.dump(entries, f)`: a block sequence is just its items one after another.
+    """
+    written = 0
+    for batch in batches:
+        if batch:
+            yaml.dump(batch, f)
+
+        written += len(batch)
+        progress(written)
+
+    if not written:
+        yaml.dump([], f)
+
+    return written
+
+
+EXPORT_WRITERS = {
+    'CSV': write_csv,
+    'JSON': write_json,
+    'YAML': write_yaml,
+}
+
+
+def export_entries(f, export_format, batches, progress):
+    """
+    Write audit entries coming in `batches` (an iterable of lists of entries) to `f` in `export_format`
+    without holding more than a single batch in memory. `progress` is called with the number of entries
+    written so far after every batch. Returns the number of entries written.
+    """
+    return EXPORT_WRITERS[export_format](f, batches, progress)
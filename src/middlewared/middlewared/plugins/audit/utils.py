@@ -16,6 +16,7 @@ AUDIT_DEFAULT_QUOTA = 0
 AUDIT_DEFAULT_FILL_CRITICAL = 95
 AUDIT_DEFAULT_FILL_WARNING = 75
 AUDIT_REPORTS_DIR = os.path.join(AUDIT_DATASET_PATH, 'reports')
+AUDIT_EXPORT_BATCH_SIZE = 10000
 SQL_SAFE_FIELDS = (
     AuditEventParam.AUDIT_ID.value,
     AuditEventParam.MESSAGE_TIMESTAMP.value,
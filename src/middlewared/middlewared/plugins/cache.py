@@ -1,9 +1,102 @@
-from collections import namedtuple
+import asyncio
+import sys
+import threading
+from collections import namedtuple, OrderedDict
 from collections.abc import Callable
+from concurrent.futures import Future
 from time import monotonic
 from typing import Any
 
-from middlewared.service import Service
+from middlewared.service import periodic, Service
+
+DEFAULT_NAMESPACE = 'default'
+# Maximum number of entries with a timeout per namespace. Entries without a timeout are used to hold state
+# (i.e. HA license status, encryption keys) so they are never evicted and do not count towards the limit.
+NAMESPACE_MAX_ENTRIES = 1024
+SWEEP_INTERVAL = 60
+
+
+def estimate_size(value, seen=None):
+    """Rough estimate of memory used by `value` and containers/objects it references."""
+    if seen is None:
+        seen = set()
+
+    if id(value) in seen:
+        return 0
+
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(i, seen) for i in value)
+    elif hasattr(value, '__dict__'):
+        size += estimate_size(vars(value), seen)
+
+    return size
+
+
+class CacheNamespace:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        # Entries that expire, in least recently used order
+        self.entries = OrderedDict()
+        self.pinned = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lookup(self, key, now):
+        """Returns cache entry for `key` or None if it is missing or expired (the latter is removed)."""
+        if (entry := self.pinned.get(key)) is not None:
+            return entry
+
+        if (entry := self.entries.get(key)) is None:
+            return None
+
+        if now >= entry.timeout:
+            del self.entries[key]
+            self.expirations += 1
+            return None
+
+        self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key, entry):
+        self.pinned.pop(key, None)
+        self.entries.pop(key, None)
+        if entry.timeout == 0:
+            self.pinned[key] = entry
+            return
+
+        self.entries[key] = entry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def remove(self, key):
+        if (entry := self.pinned.pop(key, None)) is None:
+            entry = self.entries.pop(key, None)
+
+        return entry
+
+    def sweep(self, now):
+        for key in [key for key, entry in self.entries.items() if now >= entry.timeout]:
+            del self.entries[key]
+            self.expirations += 1
+
+    def stats(self):
+        return {
+            'entries': len(self.entries) + len(self.pinned),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+    def values(self):
+        return [entry.value for entry in (*self.entries.values(), *self.pinned.values())]
 
 
 class CacheService(Service):
@@ -12,50 +105,116 @@ class CacheService(Service):
 
     def __init__(self, *args, **kwargs):
         super(CacheService, self).__init__(*args, **kwargs)
-        self.__cache = {}
+        self.__namespaces = {}
+        self.__inflight = {}
+        self.__lock = threading.Lock()
         self.kv_tuple = namedtuple("Cache", ["value", "timeout"])
 
-    def has_key(self, key: str):
+    def __namespace(self, namespace):
+        try:
+            return self.__namespaces[namespace]
+        except KeyError:
+            return self.__namespaces.setdefault(namespace, CacheNamespace(NAMESPACE_MAX_ENTRIES))
+
+    def has_key(self, key: str, namespace: str = DEFAULT_NAMESPACE):
         """Check if given `key` is in cache."""
-        return key in self.__cache
+        with self.__lock:
+            return self.__namespace(namespace).lookup(key, monotonic()) is not None
 
-    def get(self, key: str):
+    def get(self, key: str, namespace: str = DEFAULT_NAMESPACE):
         """
         Get `key` from cache.
 
         Raises:
             KeyError: not found in the cache
         """
-        if self.__cache[key].timeout > 0:
-            self.get_timeout(key)
-        return self.__cache[key].value
+        with self.__lock:
+            ns = self.__namespace(namespace)
+            if (entry := ns.lookup(key, monotonic())) is None:
+                ns.misses += 1
+                raise KeyError(key)
 
-    def put(self, key: str, value: Any, timeout: int = 0):
-        """Put `key` of `value` in the cache."""
+            ns.hits += 1
+            return entry.value
+
+    def put(self, key: str, value: Any, timeout: int = 0, namespace: str = DEFAULT_NAMESPACE):
+        """
+        Put `key` of `value` in the cache.
+
+        Entries with a `timeout` (in seconds) expire and the least recently used of them are evicted once
+        the namespace holds more than `NAMESPACE_MAX_ENTRIES` of them.
+        """
         if timeout != 0:
             timeout = monotonic() + timeout
-        self.__cache[key] = self.kv_tuple(value=value, timeout=timeout)
 
-    def pop(self, key: str):
+        with self.__lock:
+            self.__namespace(namespace).store(key, self.kv_tuple(value=value, timeout=timeout))
+
+    def pop(self, key: str, namespace: str = DEFAULT_NAMESPACE):
         """Removes and returns `key` from cache."""
-        cache = self.__cache.pop(key, None)
+        with self.__lock:
+            cache = self.__namespace(namespace).remove(key)
+
         if cache is not None:
             cache = cache.value
         return cache
 
-    def get_timeout(self, key: str):
-        """Check if 'key' has expired"""
-        now = monotonic()
-        value, timeout = self.__cache[key]
-        if now >= timeout:
-            # Bust the cache
-            del self.__cache[key]
-            raise KeyError(f"{key} has expired")
+    def get_or_put(self, key: str, timeout: int, method: Callable, namespace: str = DEFAULT_NAMESPACE):
+        """
+        Get `key` from cache or put there the value returned by `method` (which can be a coroutine function).
+
+        Concurrent callers for the same missing `key` wait for the value computed by the first one
+        instead of calling `method` themselves.
+        """
+        with self.__lock:
+            ns = self.__namespace(namespace)
+            if (entry := ns.lookup(key, monotonic())) is not None:
+                ns.hits += 1
+                return entry.value
+
+            ns.misses += 1
+            if (future := self.__inflight.get((namespace, key))) is None:
+                future = self.__inflight[(namespace, key)] = Future()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            return future.result()
 
-    def get_or_put(self, key: str, timeout: int, method: Callable):
         try:
-            return self.get(key)
-        except KeyError:
-            value = method()
-            self.put(key, value, timeout)
-            return value
+            if asyncio.iscoroutinefunction(method):
+                value = self.middleware.run_coroutine(method())
+            else:
+                value = method()
+        except BaseException as e:
+            with self.__lock:
+                self.__inflight.pop((namespace, key), None)
+
+            future.set_exception(e)
+            raise
+
+        self.put(key, value, timeout, namespace)
+        with self.__lock:
+            self.__inflight.pop((namespace, key), None)
+
+        future.set_result(value)
+        return value
+
+    def stats(self):
+        """
+        Hits, misses, evicted and expired entries counts and estimated memory usage (in bytes) per namespace.
+        """
+        with self.__lock:
+            stats = {name: (ns.stats(), ns.values()) for name, ns in self.__namespaces.items()}
+
+        # Values are only referenced here so estimating their size does not need to block the cache
+        return {name: {**ns_stats, 'memory': estimate_size(values)} for name, (ns_stats, values) in stats.items()}
+
+    @periodic(interval=SWEEP_INTERVAL, run_on_start=False)
+    def sweep(self):
+        """Remove expired entries so that values which are not read anymore do not linger in memory."""
+        now = monotonic()
+        with self.__lock:
+            for ns in self.__namespaces.values():
+                ns.sweep(now)
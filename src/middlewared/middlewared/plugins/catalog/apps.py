@@ -34,23 +34,25 @@ class AppService(Service):
             self.middleware.call_sync('catalog.sync').wait_sync()
 
         results = []
-        installed_apps = [
+        installed_apps = {
             (app['metadata']['name'], app['metadata']['train'])
             for app in self.middleware.call_sync('app.query')
-        ]
+        }
 
         catalog = self.middleware.call_sync('catalog.config')
-        for train, train_data in self.middleware.call_sync('catalog.apps', {}).items():
+        index = self.middleware.call_sync('catalog.index')
+        # Narrow down apps to the ones which can possibly match `filters` before building results for them
+        positions = index.lookup(filters)
+        for train, app_data in index.apps if positions is None else map(index.apps.__getitem__, positions):
             if train not in catalog['preferred_trains']:
                 continue
 
-            for app_data in train_data.values():
-                results.append({
-                    'catalog': catalog['label'],
-                    'installed': (app_data['name'], train) in installed_apps,
-                    'train': train,
-                    **app_data,
-                })
+            results.append({
+                'catalog': catalog['label'],
+                'installed': (app_data['name'], train) in installed_apps,
+                'train': train,
+                **app_data,
+            })
 
         return filter_list(results, filters, options)
 
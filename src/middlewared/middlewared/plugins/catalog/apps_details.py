@@ -16,7 +16,8 @@ from middlewared.api.current import CatalogAppsArgs, CatalogAppsResult
 from middlewared.service import private, Service
 
 from .apps_util import get_app_version_details
-from .utils import get_cache_key, OFFICIAL_LABEL
+from .index import CatalogIndex
+from .utils import OFFICIAL_LABEL
 
 
 class CatalogService(Service):
@@ -24,27 +25,27 @@ class CatalogService(Service):
     class Config:
         cli_namespace = 'app.catalog'
 
-    CATEGORIES_SET = set()
+    INDEX = None
 
     @private
     def train_to_apps_version_mapping(self):
-        mapping = {}
-        for train, train_data in self.apps({
-            'cache': True,
-            'cache_only': True,
-        }).items():
-            mapping[train] = {}
-            for app_data in train_data.values():
-                mapping[train][app_data['name']] = {
-                    'version': app_data['latest_version'],
-                    'app_version': app_data['latest_app_version'],
-                }
-
-        return mapping
+        # Shared with other readers, must not be modified
+        return self.INDEX.version_mapping if self.INDEX else {}
 
     @private
     def cached(self, label):
-        return self.middleware.call_sync('cache.has_key', get_cache_key(label))
+        return self.INDEX is not None and self.INDEX.label == label
+
+    @private
+    def index(self):
+        """
+        Index of the apps of all trains of the catalog, the catalog is read from disk if it has not been indexed yet.
+        """
+        label = self.middleware.call_sync('catalog.config')['label']
+        if not self.cached(label):
+            self.apps({'cache': False, 'cache_only': False, 'retrieve_all_trains': True, 'trains': []})
+
+        return self.INDEX if self.cached(label) else CatalogIndex(label, {})
 
     @api_method(CatalogAppsArgs, CatalogAppsResult, roles=['CATALOG_READ'])
     def apps(self, options):
@@ -66,33 +67,17 @@ class CatalogService(Service):
         """
         catalog = self.middleware.call_sync('catalog.config')
         all_trains = options['retrieve_all_trains']
-        cache_available = False
+        index = self.INDEX if options['cache'] and self.cached(catalog['label']) else None
 
-        if options['cache']:
-            cache_key = get_cache_key(catalog['label'])
-            try:
-                orig_cached_data = self.middleware.call_sync('cache.get', cache_key)
-            except KeyError:
-                orig_cached_data = None
-
-            cache_available = orig_cached_data is not None
-
-        if options['cache'] and options['cache_only'] and not cache_available:
+        if options['cache'] and options['cache_only'] and index is None:
             return {}
 
-        if options['cache'] and cache_available:
-            cached_data = {}
-            for train in orig_cached_data:
-                if not all_trains and train not in options['trains']:
-                    continue
+        if index is not None:
+            # Cached train / app dicts are shared with other readers and must not be modified
+            if all_trains:
+                return index.trains
 
-                train_data = {}
-                for catalog_app in orig_cached_data[train]:
-                    train_data[catalog_app] = {k: v for k, v in orig_cached_data[train][catalog_app].items()}
-
-                cached_data[train] = train_data
-
-            return cached_data
+            return {train: train_data for train, train_data in index.trains.items() if train in options['trains']}
         elif not os.path.exists(catalog['location']):
             return {}
 
@@ -104,12 +89,9 @@ class CatalogService(Service):
 
         if all_trains:
             # We will only update cache if we are retrieving data of all trains for a catalog
-            # which happens when we sync catalog(s) periodically or manually
-            # We cache for 90000 seconds giving system an extra 1 hour to refresh it's cache which
-            # happens after 24h - which means that for a small amount of time it's possible that user
-            # come with a case where system is trying to access cached data but it has expired and it's
-            # reading again from disk hence the extra 1 hour.
-            self.middleware.call_sync('cache.put', get_cache_key(catalog['label']), trains, 90000)
+            # which happens when we sync catalog(s) periodically or manually. The index is built
+            # completely before it replaces the previous one so readers never see a partial catalog.
+            self.INDEX = CatalogIndex(catalog['label'], trains)
 
         return trains
 
@@ -157,8 +139,6 @@ class CatalogService(Service):
                 if train in recommended_apps and app in recommended_apps[train]:
                     data[train][app]['recommended'] = True
 
-                self.CATEGORIES_SET.update(data[train][app].get('categories') or [])
-
         if unhealthy_apps:
             self.middleware.call_sync(
                 'alert.oneshot_create', 'CatalogNotHealthy', {
@@ -202,4 +182,4 @@ class CatalogService(Service):
 
     @private
     def retrieve_mapped_categories(self):
-        return self.CATEGORIES_SET
+        return self.INDEX.categories if self.INDEX else frozenset()
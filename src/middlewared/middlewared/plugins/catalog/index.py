@@ -0,0 +1,109 @@
+import bisect
+import itertools
+from collections import defaultdict
+
+from pkg_resources import parse_version
+
+
+class CatalogIndex:
+    """
+    Apps of all trains of a catalog together with lookup structures derived from them.
+
+    An index is built once per catalog sync and then shared by all readers without copying, so neither the index
+    nor any of the train / app dicts it holds may be modified. A newer index replaces it as a whole.
+    """
+
+    # Fields for which `=` / `in` filters are resolved via the index
+    EXACT_FIELDS = ('name', 'title', 'train')
+    # List fields for which `rin` filters are resolved via the index
+    MEMBER_FIELDS = ('categories', 'tags')
+    # Fields for which `^` filters are resolved via the index
+    PREFIX_FIELDS = ('name', 'title')
+
+    def __init__(self, label: str, trains: dict[str, dict[str, dict]]):
+        self.label = label
+        self.trains = trains
+        # (train, app data) of all apps in catalog order, filter lookups return positions in this list
+        self.apps = []
+        self.version_mapping = {}
+        categories = set()
+
+        exact = {field: defaultdict(set) for field in self.EXACT_FIELDS}
+        members = {field: defaultdict(set) for field in self.MEMBER_FIELDS}
+        prefixes = {field: [] for field in self.PREFIX_FIELDS}
+        for train, train_data in trains.items():
+            self.version_mapping[train] = {}
+            for app_data in train_data.values():
+                pos = len(self.apps)
+                self.apps.append((train, app_data))
+                self.version_mapping[train][app_data['name']] = {
+                    'version': app_data['latest_version'],
+                    'app_version': app_data['latest_app_version'],
+                    'parsed_version': parse_version(app_data['latest_version']),
+                }
+                categories.update(app_data.get('categories') or [])
+
+                values = app_data | {'train': train}
+                for field in self.EXACT_FIELDS:
+                    if isinstance(value := values.get(field), str):
+                        exact[field][value.casefold()].add(pos)
+                for field in self.MEMBER_FIELDS:
+                    for value in values.get(field) or []:
+                        if isinstance(value, str):
+                            members[field][value.casefold()].add(pos)
+                for field in self.PREFIX_FIELDS:
+                    if isinstance(value := values.get(field), str):
+                        prefixes[field].append((value.casefold(), pos))
+
+        self.categories = frozenset(categories)
+        self.__exact = {field: {k: frozenset(v) for k, v in index.items()} for field, index in exact.items()}
+        self.__members = {field: {k: frozenset(v) for k, v in index.items()} for field, index in members.items()}
+        self.__prefixes = {field: sorted(values) for field, values in prefixes.items()}
+
+    def lookup(self, filters: list) -> list[int] | None:
+        """
+        Positions in `apps` of the apps that can match `filters` (in catalog order) or None if none of `filters`
+        can be resolved via the index.
+
+        Matching is case insensitive so the result is a superset of what the filters select and `filter_list`
+        still has to be applied to it.
+        """
+        result = None
+        for f in filters:
+            if len(f) != 3 or not isinstance(f[0], str) or not isinstance(f[1], str):
+                continue
+
+            name, op, value = f
+            if (matched := self.__lookup_filter(name, op.removeprefix('C'), value)) is not None:
+                result = matched if result is None else result & matched
+
+        return None if result is None else sorted(result)
+
+    def __lookup_filter(self, name, op, value):
+        if name in self.EXACT_FIELDS and op == '=' and isinstance(value, str):
+            return self.__exact[name].get(value.casefold(), frozenset())
+
+        if name in self.EXACT_FIELDS and op == 'in' and isinstance(value, (list, tuple)):
+            if not all(isinstance(v, str) for v in value):
+                return None
+
+            return frozenset(itertools.chain.from_iterable(
+                self.__exact[name].get(v.casefold(), ()) for v in value
+            ))
+
+        if name in self.MEMBER_FIELDS and op == 'rin' and isinstance(value, str):
+            return self.__members[name].get(value.casefold(), frozenset())
+
+        if name in self.PREFIX_FIELDS and op == '^' and isinstance(value, str):
+            prefix = value.casefold()
+            values = self.__prefixes[name]
+            matched = set()
+            for i in range(bisect.bisect_left(values, (prefix,)), len(values)):
+                if not values[i][0].startswith(prefix):
+                    break
+
+                matched.add(values[i][1])
+
+            return matched
+
+        return None
@@ -15,7 +15,7 @@ from middlewared.api.current import (
 )
 from middlewared.service import CallError, Service, job, pass_app, private
 from middlewared.plugins.pwenc import PWENC_FILE_SECRET
-from middlewared.utils.db import FREENAS_DATABASE
+from middlewared.utils.db import FREENAS_DATABASE, remove_database_wal
 from middlewared.utils.privilege import credential_has_full_admin
 
 CONFIG_FILES = {
@@ -26,6 +26,7 @@ CONFIG_FILES = {
 }
 RE_CONFIG_BACKUP = re.compile(r'.*(\d{4}-\d{2}-\d{2})-(\d+)\.db$')
 UPLOADED_DB_PATH = '/data/uploaded.db'
+RESET_DB_PATH = '/data/reset.db'
 PWENC_UPLOADED = '/data/pwenc_secret_uploaded'
 ADMIN_KEYS_UPLOADED = '/data/admin_authorized_keys_uploaded'
 TRUENAS_ADMIN_KEYS_UPLOADED = '/data/truenas_admin_authorized_keys_uploaded'
@@ -43,11 +44,13 @@ class ConfigService(Service):
 
     @private
     def save_db_only(self, options, job):
+        self.middleware.call_sync('datastore.checkpoint', True)
         with open(FREENAS_DATABASE, 'rb') as f:
             shutil.copyfileobj(f, job.pipes.output.w)
 
     @private
     def save_tar_file(self, options, job):
+        self.middleware.call_sync('datastore.checkpoint', True)
         with tempfile.NamedTemporaryFile(delete=True) as ntf:
             with tarfile.open(ntf.name, 'w') as tar:
                 files = {'freenas-v1.db': FREENAS_DATABASE}
@@ -205,13 +208,13 @@ class ConfigService(Service):
         self._check_access(job, 'reset')
 
         job.set_progress(15, 'Replacing database file')
-        shutil.copy('/data/factory-v1.db', FREENAS_DATABASE)
+        self.middleware.call_sync('datastore.replace', '/data/factory-v1.db', True)
 
         job.set_progress(25, 'Running database upload hooks')
         self.middleware.call_hook_sync('config.on_upload', FREENAS_DATABASE)
 
-        self._handle_failover(job, 'reset', [FREENAS_DATABASE], FREENAS_DATABASE, options['reboot'],
-                              CONFIGURATION_RESET_REBOOT_REASON)
+        self._handle_failover(job, 'reset', [], FREENAS_DATABASE, options['reboot'],
+                              CONFIGURATION_RESET_REBOOT_REASON, replace_database=True)
 
         if options['reboot']:
             job.set_progress(95, 'Will reboot in 10 seconds')
@@ -227,7 +230,7 @@ class ConfigService(Service):
         if job.credentials.is_user_session and not credential_has_full_admin(job.credentials):
             raise CallError(f'Configuration {verb} is limited to full administrators')
 
-    def _handle_failover(self, job, verb, files, db_path, reboot, reboot_reason):
+    def _handle_failover(self, job, verb, files, db_path, reboot, reboot_reason, replace_database=False):
         if not self.middleware.call_sync('failover.licensed'):
             return
 
@@ -236,6 +239,11 @@ class ConfigService(Service):
             for _file in files:
                 self.middleware.call_sync('failover.send_small_file', _file)
 
+            if replace_database:
+                # The other node has its database file open so it can't be overwritten in place
+                self.middleware.call_sync('failover.send_small_file', FREENAS_DATABASE, RESET_DB_PATH)
+                self.middleware.call_sync('failover.call_remote', 'datastore.replace', [RESET_DB_PATH])
+
             job.set_progress(75, 'Running database upload hooks on the other node')
             self.middleware.call_sync(
                 'failover.call_remote', 'core.call_hook', ['config.on_upload', [db_path]],
@@ -282,11 +290,14 @@ class ConfigService(Service):
         if not os.path.exists(dirname):
             os.makedirs(dirname)
 
+        self.middleware.call_sync('datastore.checkpoint', True)
         shutil.copy(FREENAS_DATABASE, newfile)
 
 
 def setup(middleware):
     if os.path.exists(UPLOADED_DB_PATH):
+        # The database is not open yet
+        remove_database_wal()
         shutil.move(UPLOADED_DB_PATH, FREENAS_DATABASE)
 
         if os.path.exists(PWENC_UPLOADED):
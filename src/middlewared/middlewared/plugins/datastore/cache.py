@@ -0,0 +1,225 @@
+from collections import defaultdict, OrderedDict
+import threading
+
+from sqlalchemy import bindparam
+from sqlalchemy.dialects.sqlite.pysqlite import SQLiteDialect_pysqlite
+
+STATEMENT_CACHE_SIZE = 1024
+ROW_CACHE_TABLE_SIZE = 64
+# Model attribute that enables caching of query results for its table
+ROW_CACHE_ATTRIBUTE = '__datastore_cache__'
+DIALECT = SQLiteDialect_pysqlite()
+
+
+class UncacheableFilters(Exception):
+    pass
+
+
+def hit_rate(hits, misses):
+    return hits / (hits + misses) if hits + misses else 0
+
+
+def template_filters(filters, params):
+    """
+    Replace values in `filters` with bind parameters (their values are appended to `params`).
+
+    Returns a tuple of (<filter shape>, <templated filters>). Filters with the same shape compile to the same SQL.
+    `None` values and the number of `in`/`nin` values are part of the shape as they change the SQL generated.
+
+    Raises `UncacheableFilters` for filters that the statement cache does not handle (these are invalid anyway
+    and the uncached query path reports the error).
+    """
+    shape = []
+    templated = []
+    for f in filters:
+        if not isinstance(f, (list, tuple)):
+            raise UncacheableFilters()
+
+        if len(f) == 3:
+            name, op, value = f
+            if not isinstance(name, str) or not isinstance(op, str):
+                raise UncacheableFilters()
+
+            if op in ('in', 'nin'):
+                if isinstance(value, (str, bytes)) or not hasattr(value, '__iter__'):
+                    raise UncacheableFilters()
+
+                value = list(value)
+                values = [v for v in value if v is not None]
+                has_nulls = len(values) != len(value)
+                shape.append((name, op, len(values), has_nulls))
+                templated.append([name, op, [bind(params, v) for v in values] + [None] * has_nulls])
+            elif value is None:
+                shape.append((name, op, None))
+                templated.append(f)
+            else:
+                shape.append((name, op))
+                templated.append([name, op, bind(params, value)])
+        elif len(f) == 2 and f[0] == 'OR' and isinstance(f[1], (list, tuple)):
+            or_shape, or_templated = template_filters(f[1], params)
+            shape.append(('OR', or_shape))
+            templated.append(['OR', or_templated])
+        else:
+            raise UncacheableFilters()
+
+    return tuple(shape), templated
+
+
+def bind(params, value):
+    name = f'p{len(params)}'
+    params.append(value)
+    return bindparam(name, unique=False)
+
+
+class StatementCache:
+    """
+    LRU cache of compiled `datastore.query` statements keyed by table, options and filters shape.
+    """
+
+    def __init__(self, size=STATEMENT_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if (entry := self.entries.get(key)) is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': hit_rate(self.hits, self.misses),
+        }
+
+
+class TableRowCache:
+    def __init__(self, dependencies):
+        # Tables whose contents are part of the query results for this table (joined foreign keys and
+        # many-to-many relationships)
+        self.dependencies = dependencies
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': hit_rate(self.hits, self.misses),
+        }
+
+
+class RowCache:
+    """
+    Serialized (not extended) `datastore.query` results for tables whose model opts in with
+    `__datastore_cache__ = True`.
+
+    Writes are done in the datastore thread while queries are served from the event loop so every table has a
+    generation that is bumped on each write. Results are only stored if none of the tables they were read from
+    have been written to while the query was running.
+    """
+
+    def __init__(self, table_size=ROW_CACHE_TABLE_SIZE):
+        self.table_size = table_size
+        self.lock = threading.Lock()
+        self.tables = {}
+        self.generations = defaultdict(int)
+        self.epoch = 0
+        self.cascades = {}
+
+    def generation(self, dependencies):
+        with self.lock:
+            return self.epoch, tuple(self.generations[table.name] for table in dependencies)
+
+    def get(self, table, dependencies, key):
+        with self.lock:
+            if (table_cache := self.tables.get(table)) is None:
+                table_cache = self.tables[table] = TableRowCache({t.name for t in dependencies})
+
+            if (rows := table_cache.entries.get(key)) is None:
+                table_cache.misses += 1
+                return None
+
+            table_cache.hits += 1
+            table_cache.entries.move_to_end(key)
+            return rows
+
+    def put(self, table, dependencies, key, generation, rows):
+        with self.lock:
+            if generation != (self.epoch, tuple(self.generations[t.name] for t in dependencies)):
+                return
+
+            table_cache = self.tables[table]
+            table_cache.entries[key] = rows
+            while len(table_cache.entries) > self.table_size:
+                table_cache.entries.popitem(last=False)
+
+    def invalidate(self, table):
+        """
+        Invalidate cached results that depend on `table` or on tables whose rows are deleted or updated
+        by foreign key actions when `table` rows are.
+        """
+        affected = self._cascade(table)
+        with self.lock:
+            for name in affected:
+                self.generations[name] += 1
+
+            for table_cache in self.tables.values():
+                if table_cache.entries and not table_cache.dependencies.isdisjoint(affected):
+                    table_cache.entries.clear()
+                    table_cache.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.epoch += 1
+            for table_cache in self.tables.values():
+                if table_cache.entries:
+                    table_cache.entries.clear()
+                    table_cache.invalidations += 1
+
+    def _cascade(self, table):
+        try:
+            return self.cascades[table]
+        except KeyError:
+            pass
+
+        affected = set()
+        pending = [table]
+        while pending:
+            current = pending.pop()
+            if current.name in affected:
+                continue
+
+            affected.add(current.name)
+            for other_table in current.metadata.tables.values():
+                for column in other_table.c:
+                    for foreign_key in column.foreign_keys:
+                        if foreign_key.ondelete is not None or foreign_key.onupdate is not None:
+                            if foreign_key.column.table is current:
+                                pending.append(other_table)
+
+        return self.cascades.setdefault(table, frozenset(affected))
+
+    def stats(self):
+        with self.lock:
+            return {table.name: table_cache.stats() for table, table_cache in self.tables.items()}
+
+
+statement_cache = StatementCache()
+row_cache = RowCache()
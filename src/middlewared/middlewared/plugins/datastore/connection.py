@@ -1,15 +1,26 @@
 from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import os
 import re
 import shutil
+import threading
 import time
 
 from sqlalchemy import create_engine
 
-from middlewared.service import private, Service
+from middlewared.service import CallError, private, Service
 
-from middlewared.utils.db import FREENAS_DATABASE
+from middlewared.utils.db import FREENAS_DATABASE, remove_database_wal
 
+from .cache import row_cache
+
+# Writes (and reads when the database is not in WAL mode) are serialized on a single connection
 thread_pool = ThreadPoolExecutor(1)
+READ_CONNECTIONS = 4
+read_thread_pool = ThreadPoolExecutor(READ_CONNECTIONS)
+# Full checkpoint can't complete while reads are running
+FULL_CHECKPOINT_ATTEMPTS = 5
+FULL_CHECKPOINT_RETRY_INTERVAL = 1
 
 
 def regexp(expr, item):
@@ -20,6 +31,61 @@ def regexp(expr, item):
     return reg.search(item) is not None
 
 
+class ReadConnectionPoolClosed(Exception):
+    pass
+
+
+class ReadConnectionPool:
+    """
+    Read-only connections that allow queries to run concurrently with each other and with writes (which requires
+    the database to be in WAL mode).
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.cond = threading.Condition()
+        self.idle = []
+        self.in_use = 0
+        self.closed = False
+
+    @contextlib.contextmanager
+    def connection(self):
+        with self.cond:
+            if self.closed:
+                raise ReadConnectionPoolClosed()
+
+            connection = self.idle.pop() if self.idle else None
+            self.in_use += 1
+
+        try:
+            if connection is None:
+                connection = self.engine.connect()
+                connection.connection.create_function("REGEXP", 2, regexp)
+                connection.connection.execute("PRAGMA query_only=ON")
+
+            yield connection
+        finally:
+            with self.cond:
+                self.in_use -= 1
+                if connection is not None:
+                    self.idle.append(connection)
+
+                self.cond.notify_all()
+
+    def close(self):
+        """
+        Waits for running queries to finish and closes all connections. The last connection to close
+        checkpoints the database so it must be done before the database file is replaced.
+        """
+        with self.cond:
+            self.closed = True
+            self.cond.wait_for(lambda: self.in_use == 0)
+            for connection in self.idle:
+                connection.close()
+
+            self.idle = []
+
+
 class DatastoreService(Service):
 
     class Config:
@@ -28,6 +94,7 @@ class DatastoreService(Service):
 
     engine = None
     connection = None
+    read_pool = None
 
     @private
     def handle_constraint_violation(self, row, journal):
@@ -57,13 +124,12 @@ class DatastoreService(Service):
 
     @private
     def setup(self):
-        if self.engine is not None:
-            self.engine.dispose()
+        self.close()
 
-        if self.connection is not None:
-            self.connection.close()
+        row_cache.clear()
 
-        self.engine = create_engine(f'sqlite:///{FREENAS_DATABASE}')
+        # Read connections are handed over between `read_thread_pool` threads
+        self.engine = create_engine(f'sqlite:///{FREENAS_DATABASE}', connect_args={'check_same_thread': False})
 
         self.connection = self.engine.connect()
         self.connection.connection.create_function("REGEXP", 2, regexp)
@@ -80,9 +146,82 @@ class DatastoreService(Service):
 
         self.connection.connection.execute("VACUUM")
 
+        # In-memory databases can't use WAL (and can't be shared between connections)
+        if self.connection.connection.execute("PRAGMA journal_mode=WAL").fetchone()[0] == "wal":
+            self.read_pool = ReadConnectionPool(self.engine)
+
+    @private
+    def close(self):
+        if self.read_pool is not None:
+            self.read_pool.close()
+            self.read_pool = None
+
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+        if self.engine is not None:
+            self.engine.dispose()
+            self.engine = None
+
+    @private
+    def replace(self, path, copy=False):
+        """
+        Replace the database file with `path` (which is moved or, if `copy` is set, copied) and connect to it.
+
+        Changes in the write-ahead log of the current database are discarded together with it. This runs in the
+        datastore thread so no query can run until the new database is set up.
+        """
+        self.close()
+        try:
+            remove_database_wal(FREENAS_DATABASE)
+            if copy:
+                shutil.copy(path, FREENAS_DATABASE)
+            else:
+                os.rename(path, FREENAS_DATABASE)
+        finally:
+            self.setup()
+
+    @private
+    def checkpoint(self, full=False):
+        """
+        Move changes from the write-ahead log to the database file.
+
+        A passive checkpoint (done after each write) never waits for running reads so it may leave some of the changes
+        in the log. A `full` checkpoint moves all of them and truncates the log, it must be done right before the
+        database file is copied (i.e. configuration backups or HA replication) or replaced. CallError is raised if
+        it could not be completed.
+        """
+        if self.read_pool is None:
+            return
+
+        if not full:
+            self.connection.connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            return
+
+        for i in range(FULL_CHECKPOINT_ATTEMPTS):
+            if i:
+                time.sleep(FULL_CHECKPOINT_RETRY_INTERVAL)
+
+            busy, log_frames, checkpointed_frames = self.connection.connection.execute(
+                "PRAGMA wal_checkpoint(TRUNCATE)"
+            ).fetchone()
+            if not busy:
+                return
+
+        raise CallError(
+            f"Unable to checkpoint the database: {checkpointed_frames} of {log_frames} write-ahead log frames "
+            "were moved to the database file"
+        )
+
     @private
     def execute(self, *args):
-        return self.connection.execute(*args)
+        try:
+            return self.connection.execute(*args)
+        finally:
+            # We do not know which tables were written to
+            row_cache.clear()
+            self.checkpoint()
 
     @private
     def execute_write(self, stmt, options=None):
@@ -90,6 +229,50 @@ class DatastoreService(Service):
         options.setdefault('ha_sync', True)
         options.setdefault('return_last_insert_rowid', False)
 
+        sql, binds = self._compile(stmt)
+
+        try:
+            result = self.connection.execute(sql, binds)
+        finally:
+            row_cache.invalidate(stmt.table)
+            self.checkpoint()
+
+        self.middleware.call_hook_inline("datastore.post_execute_write", sql, binds, options)
+
+        if options['return_last_insert_rowid']:
+            return self._fetchall(self.connection, "SELECT last_insert_rowid()")[0][0]
+
+        return result
+
+    @private
+    def execute_write_batch(self, stmts, options=None):
+        """
+        Execute write statements in a single transaction (either all or none of them are applied).
+        `datastore.post_execute_write` hook is called for each statement once the transaction is committed.
+
+        Returns the list of results.
+        """
+        options = options or {}
+        options.setdefault('ha_sync', True)
+
+        queries = [self._compile(stmt) for stmt in stmts]
+
+        results = []
+        try:
+            with self.connection.begin():
+                for sql, binds in queries:
+                    results.append(self.connection.execute(sql, binds))
+        finally:
+            for table in {stmt.table for stmt in stmts}:
+                row_cache.invalidate(table)
+            self.checkpoint()
+
+        for sql, binds in queries:
+            self.middleware.call_hook_inline("datastore.post_execute_write", sql, binds, options)
+
+        return results
+
+    def _compile(self, stmt):
         compiled = stmt.compile(self.engine, compile_kwargs={"render_postcompile": True})
 
         sql = compiled.string
@@ -103,18 +286,38 @@ class DatastoreService(Service):
             else:
                 binds.append(value)
 
-        result = self.connection.execute(sql, binds)
-
-        self.middleware.call_hook_inline("datastore.post_execute_write", sql, binds, options)
-
-        if options['return_last_insert_rowid']:
-            return self.fetchall("SELECT last_insert_rowid()")[0][0]
-
-        return result
+        return sql, binds
 
     @private
     def fetchall(self, query, params=None):
-        cursor = self.connection.execute(query, params or [])
+        """
+        Run a read query on the write connection (in the datastore thread, so it waits for writes). This is how code
+        that already runs in the datastore thread (i.e. `datastore.post_execute_write` hooks) must read the database.
+        """
+        return self._fetchall(self.connection, query, params)
+
+    @private
+    async def fetchall_read(self, query, params=None):
+        """
+        Run a read query. Queries do not wait for each other nor for writes if the database is in WAL mode.
+
+        Otherwise, or while the database is being set up, the query is run by `fetchall` in the datastore thread
+        which is why this must not be called from that thread.
+        """
+        return await self.middleware.run_in_executor(read_thread_pool, self._fetchall_read, query, params)
+
+    def _fetchall_read(self, query, params):
+        if (read_pool := self.read_pool) is not None:
+            try:
+                with read_pool.connection() as connection:
+                    return self._fetchall(connection, query, params)
+            except ReadConnectionPoolClosed:
+                pass
+
+        return thread_pool.submit(self.fetchall, query, params).result()
+
+    def _fetchall(self, connection, query, params=None):
+        cursor = connection.execute(query, params or [])
         try:
             return cursor.fetchall()
         finally:
@@ -4,7 +4,7 @@ from .schema import SchemaMixin
 
 
 def in_(col, value):
-    has_nulls = None in value
+    has_nulls = any(v is None for v in value)
     value = [v for v in value if v is not None]
     expr = col.in_(value)
     if has_nulls:
@@ -13,7 +13,7 @@ def in_(col, value):
 
 
 def nin(col, value):
-    has_nulls = None in value
+    has_nulls = any(v is None for v in value)
     value = [v for v in value if v is not None]
     expr = ~col.in_(value)
     if has_nulls:
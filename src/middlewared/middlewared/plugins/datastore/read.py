@@ -1,16 +1,18 @@
 from collections import defaultdict
+import copy
 import re
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, bindparam, func, select
 from sqlalchemy.sql import Alias
 from sqlalchemy.sql.expression import nullsfirst, nullslast
 
 from middlewared.schema import accepts, Bool, Dict, Int, List, Ref, Str
-from middlewared.service import Service
+from middlewared.service import private, Service
 from middlewared.service_exception import MatchNotFound
 from middlewared.utils import filters
 from middlewared.validators import QueryFilters, QueryOptions
 
+from .cache import DIALECT, ROW_CACHE_ATTRIBUTE, row_cache, statement_cache, template_filters, UncacheableFilters
 from .filter import FilterMixin
 from .schema import SchemaMixin
 
@@ -28,6 +30,10 @@ class DatastoreService(Service, FilterMixin, SchemaMixin):
     class Config:
         private = True
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__row_cache_dependencies = {}
+
     @accepts(
         Str('name'),
         List('query-filters', items=[List('query-filter')], validators=[QueryFilters()], register=True),
@@ -86,6 +92,112 @@ class DatastoreService(Service, FilterMixin, SchemaMixin):
         # which might happen with "prefix"
         options = options.copy()
 
+        statement, aliases, params, cache_key = self._query_statement(table, filters, options)
+
+        dependencies = None
+        if cache_key is not None:
+            dependencies = self._row_cache_dependencies(table)
+
+        if dependencies is not None and (cached := row_cache.get(table, dependencies, cache_key)) is not None:
+            result = copy.deepcopy(cached)
+        else:
+            if dependencies is not None:
+                generation = row_cache.generation(dependencies)
+
+            result = await self.middleware.call("datastore.fetchall_read", statement, params)
+            if options['count']:
+                result = result[0][0]
+            else:
+                relationships = [{} for row in result]
+                if options['relationships']:
+                    # This will only fetch many-to-many relationships for primary table, not for joins, but that's
+                    # enough
+                    relationships = await self._fetch_many_to_many(table, result)
+
+                result = [
+                    self._serialize(row, table, aliases, relationships[i], options['prefix'])
+                    for i, row in enumerate(result)
+                ]
+
+            if dependencies is not None:
+                row_cache.put(table, dependencies, cache_key, generation, copy.deepcopy(result))
+
+        if options['count']:
+            return result
+
+        result = await self._queryset_extend(
+            result, options['extend'], options['extend_context'], options['select'], options['extra'],
+        )
+
+        if options['get']:
+            try:
+                return result[0]
+            except IndexError:
+                raise MatchNotFound() from None
+
+        return result
+
+    @accepts(Str('name'), Ref('query-options'))
+    async def config(self, name, options):
+        """
+        Get configuration settings object for a given `name`.
+
+        This is a shortcut for `query(name, {"get": true})`.
+        """
+        options['get'] = True
+        return await self.query(name, [], options)
+
+    @private
+    def cache_stats(self):
+        """
+        Hit rates of the compiled statements cache and of per-table query results cache.
+        """
+        return {
+            'statements': statement_cache.stats(),
+            'rows': row_cache.stats(),
+        }
+
+    def _query_statement(self, table, filters, options):
+        """
+        Returns a tuple of (<statement>, <aliases>, <bind parameters>, <cache key>).
+
+        Statements are compiled once per table, options and filters shape. Filter values, offset and limit
+        are bound at execution time. Cache key is `None` when query results can't be cached.
+        """
+        params = []
+        try:
+            shape, templated_filters = template_filters(filters, params)
+        except UncacheableFilters:
+            statement, aliases = self._build_query(table, filters, options, options['offset'], options['limit'])
+            return statement, aliases, {}, None
+
+        statement_key = (
+            table, options['relationships'], options['count'], options['prefix'], tuple(options['order_by']),
+            bool(options['offset']), bool(options['limit']), shape,
+        )
+        if (entry := statement_cache.get(statement_key)) is None:
+            statement, aliases = self._build_query(
+                table, templated_filters, options, bindparam('offset'), bindparam('limit'),
+            )
+            entry = (statement.compile(dialect=DIALECT), aliases)
+            statement_cache.put(statement_key, entry)
+
+        statement, aliases = entry
+        bind_params = {f'p{i}': value for i, value in enumerate(params)}
+        if options['offset']:
+            bind_params['offset'] = options['offset']
+        if options['limit']:
+            bind_params['limit'] = options['limit']
+
+        try:
+            cache_key = (statement_key, tuple(params), options['offset'], options['limit'])
+            hash(cache_key)
+        except TypeError:
+            cache_key = None
+
+        return statement, aliases, bind_params, cache_key
+
+    def _build_query(self, table, filters, options, offset, limit):
         aliases = {}
         if options['count']:
             qs = select([func.count(self._get_pk(table))])
@@ -106,7 +218,7 @@ class DatastoreService(Service, FilterMixin, SchemaMixin):
             qs = qs.where(and_(*self._filters_to_queryset(filters, table, prefix, aliases)))
 
         if options['count']:
-            return (await self.middleware.call("datastore.fetchall", qs))[0][0]
+            return qs, aliases
 
         order_by = options['order_by']
         if order_by:
@@ -132,41 +244,33 @@ class DatastoreService(Service, FilterMixin, SchemaMixin):
             qs = qs.order_by(*order_by)
 
         if options['offset']:
-            qs = qs.offset(options['offset'])
+            qs = qs.offset(offset)
 
         if options['limit']:
-            qs = qs.limit(options['limit'])
+            qs = qs.limit(limit)
 
-        result = await self.middleware.call("datastore.fetchall", qs)
+        return qs, aliases
 
-        relationships = [{} for row in result]
-        if options['relationships']:
-            # This will only fetch many-to-many relationships for primary table, not for joins, but that's enough
-            relationships = await self._fetch_many_to_many(table, result)
-
-        result = await self._queryset_serialize(
-            result,
-            table, aliases, relationships, options['extend'], options['extend_context'], options['prefix'],
-            options['select'], options['extra'],
-        )
-
-        if options['get']:
-            try:
-                return result[0]
-            except IndexError:
-                raise MatchNotFound() from None
+    def _row_cache_dependencies(self, table):
+        """
+        Returns tables that query results of `table` are read from if its model opts in for results caching
+        (`None` otherwise).
+        """
+        try:
+            return self.__row_cache_dependencies[table]
+        except KeyError:
+            pass
 
-        return result
+        dependencies = None
+        if getattr(self._get_model(table), ROW_CACHE_ATTRIBUTE, False):
+            dependencies = {table}
+            dependencies.update(foreign_key.column.table for foreign_key in self._get_queryset_joins(table))
+            for relationship in self._get_relationships(table).values():
+                dependencies.update((relationship.secondary, relationship.target))
 
-    @accepts(Str('name'), Ref('query-options'))
-    async def config(self, name, options):
-        """
-        Get configuration settings object for a given `name`.
+            dependencies = sorted(dependencies, key=lambda t: t.name)
 
-        This is a shortcut for `query(name, {"get": true})`.
-        """
-        options['get'] = True
-        return await self.query(name, [], options)
+        return self.__row_cache_dependencies.setdefault(table, dependencies)
 
     def _get_queryset_joins(self, table):
         result = {}
@@ -184,13 +288,7 @@ class DatastoreService(Service, FilterMixin, SchemaMixin):
 
         return result
 
-    async def _queryset_serialize(
-        self, qs, table, aliases, relationships, extend, extend_context, field_prefix, select, extra_options,
-    ):
-        rows = []
-        for i, row in enumerate(qs):
-            rows.append(self._serialize(row, table, aliases, relationships[i], field_prefix))
-
+    async def _queryset_extend(self, rows, extend, extend_context, select, extra_options):
         if extend_context:
             extend_context_value = await self.middleware.call(extend_context, rows, extra_options)
         else:
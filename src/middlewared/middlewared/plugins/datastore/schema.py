@@ -29,11 +29,12 @@ class SchemaMixin:
         if f'{name}_id' in table.c:
             return table.c[f'{name}_id']
 
-    def _get_relationships(self, table):
+    def _get_model(self, table):
         for model in Model.registry._class_registry.values():
             if hasattr(model, "__tablename__") and model.__tablename__ == table.name:
-                break
-        else:
-            raise RuntimeError("Could not find model for table %s" % table.name)
+                return model
+
+        raise RuntimeError("Could not find model for table %s" % table.name)
 
-        return inspect(model).relationships
+    def _get_relationships(self, table):
+        return inspect(self._get_model(table)).relationships
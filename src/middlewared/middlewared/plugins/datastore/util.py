@@ -36,7 +36,7 @@ class DatastoreService(Service, SchemaMixin):
     async def sql(self, query, *args):
         try:
             if query.strip().split()[0].upper() == 'SELECT':
-                return [dict(row) for row in await self.middleware.call('datastore.fetchall', query, *args)]
+                return [dict(row) for row in await self.middleware.call('datastore.fetchall_read', query, *args)]
             else:
                 await self.middleware.call('datastore.execute', query, *args)
         except Exception as e:
@@ -46,7 +46,7 @@ class DatastoreService(Service, SchemaMixin):
     async def dump_json(self):
         models = []
         for table, in await self.middleware.call(
-                "datastore.fetchall",
+                "datastore.fetchall_read",
                 "SELECT name FROM sqlite_master WHERE type = 'table'"
         ):
             try:
@@ -64,7 +64,7 @@ class DatastoreService(Service, SchemaMixin):
                         "verbose_name": row[1],
                         "database_type": row[2],
                     }
-                    for row in await self.middleware.call("datastore.fetchall", "PRAGMA table_info('%s');" % table)
+                    for row in await self.middleware.call("datastore.fetchall_read", "PRAGMA table_info('%s');" % table)
                 ],
                 "entries": entries,
             })
@@ -1,7 +1,7 @@
 from sqlalchemy import and_, types
 from sqlalchemy.sql import sqltypes
 
-from middlewared.schema import accepts, Any, Bool, Dict, Str
+from middlewared.schema import accepts, Any, Bool, Dict, List, Str
 from middlewared.service import Service
 
 from .filter import FilterMixin
@@ -49,13 +49,7 @@ class DatastoreService(Service, FilterMixin, SchemaMixin):
         """
         table = self._get_table(name)
         insert, relationships = self._extract_relationships(table, options['prefix'], data)
-
-        for column in table.c:
-            if column.default is not None:
-                insert.setdefault(column.name, column.default.arg)
-            if not column.nullable:
-                if isinstance(column.type, (types.String, types.Text)):
-                    insert.setdefault(column.name, '')
+        self._set_insert_defaults(table, insert)
 
         pk_column = self._get_pk(table)
         return_last_insert_rowid = type(pk_column.type) == sqltypes.Integer
@@ -116,10 +110,7 @@ class DatastoreService(Service, FilterMixin, SchemaMixin):
         else:
             id_ = id_or_filters
 
-        for column in table.c:
-            if column.foreign_keys:
-                if column.name[:-3] in data:
-                    data[column.name] = data.pop(column.name[:-3])
+        self._rename_foreign_keys(table, data)
 
         update, relationships = self._extract_relationships(table, options['prefix'], data)
 
@@ -141,6 +132,83 @@ class DatastoreService(Service, FilterMixin, SchemaMixin):
 
         return id_
 
+    @accepts(
+        Str('name'),
+        Dict(
+            'changes',
+            List('insert', items=[Dict('data', additional_attrs=True)]),
+            List('update', items=[List('id_and_data')]),
+            List('delete', items=[Any('id')]),
+        ),
+        Dict(
+            'options',
+            Bool('ha_sync', default=True),
+            Str('prefix', default=''),
+            Bool('send_events', default=True),
+        ),
+    )
+    async def write_batch(self, name, changes, options):
+        """
+        Delete, update and insert entries in `name` in a single transaction.
+
+        `changes.update` is a list of `[id, data]` pairs. Many-to-many relationships can't be changed this way.
+        """
+        table = self._get_table(name)
+        pk_column = self._get_pk(table)
+
+        stmts = []
+        for id_ in changes['delete']:
+            stmts.append(table.delete().where(pk_column == id_))
+
+        updated = []
+        for id_, data in changes['update']:
+            data = data.copy()
+            self._rename_foreign_keys(table, data)
+            update, relationships = self._extract_relationships(table, options['prefix'], data)
+            if relationships:
+                raise RuntimeError('Relationships can\'t be updated in a batch')
+
+            if update:
+                stmts.append(table.update().values(**update).where(pk_column == id_))
+                updated.append(id_)
+
+        inserted = []
+        for data in changes['insert']:
+            insert, relationships = self._extract_relationships(table, options['prefix'], data)
+            if relationships:
+                raise RuntimeError('Relationships can\'t be inserted in a batch')
+
+            self._set_insert_defaults(table, insert)
+            stmts.append(table.insert().values(**insert))
+            inserted.append(insert)
+
+        if not stmts:
+            return
+
+        await self.middleware.call('datastore.execute_write_batch', stmts, {'ha_sync': options['ha_sync']})
+
+        if options['send_events']:
+            for id_ in changes['delete']:
+                await self.middleware.call('datastore.send_delete_events', name, id_)
+            for id_ in updated:
+                await self.middleware.call('datastore.send_update_events', name, id_)
+            for insert in inserted:
+                await self.middleware.call('datastore.send_insert_events', name, insert)
+
+    def _set_insert_defaults(self, table, insert):
+        for column in table.c:
+            if column.default is not None:
+                insert.setdefault(column.name, column.default.arg)
+            if not column.nullable:
+                if isinstance(column.type, (types.String, types.Text)):
+                    insert.setdefault(column.name, '')
+
+    def _rename_foreign_keys(self, table, data):
+        for column in table.c:
+            if column.foreign_keys:
+                if column.name[:-3] in data:
+                    data[column.name] = data.pop(column.name[:-3])
+
     def _extract_relationships(self, table, prefix, data):
         relationships = self._get_relationships(table)
 
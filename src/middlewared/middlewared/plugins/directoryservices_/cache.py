@@ -139,9 +139,9 @@ class DSCache(Service):
         Query User / Group cache with `query-filters` and `query-options`.
 
         NOTE: only consumers for this endpoint should be user.query and group.query.
-        query-options (apart from determining whether to include "SMB" information)
-        are not evaluated here because user.query and group.query applies pagination
-        on full results.
+        Results are ordered by `id` and only `offset` and `limit` query-options are
+        evaluated here because user.query and group.query apply the remaining ones
+        to results combined with local accounts.
         """
         ds = self.middleware.call_sync('directoryservices.status')
         if ds['type'] is None:
@@ -163,9 +163,7 @@ class DSCache(Service):
 
             return [entry] if entry else []
 
-        # options must be omitted to defer pagination logic to caller
-        entries = query_cache_entries(IDType[id_type], filters, {})
-        return sorted(entries, key=lambda i: i['id'])
+        return query_cache_entries(IDType[id_type], filters, options)
 
     def idmap_online_check_wait_wbclient(self, job):
         """
@@ -1,4 +1,6 @@
+import bisect
 import enum
+import itertools
 import os
 
 from collections import defaultdict
@@ -7,7 +9,7 @@ from middlewared.utils.directoryservices.constants import (
     DSType
 )
 from middlewared.job import Job
-from middlewared.utils import filter_list
+from middlewared.utils import filters
 from middlewared.utils.itertools import batched
 from middlewared.utils.nss import pwd, grp
 from middlewared.utils.nss.nss_common import NssModule
@@ -43,6 +45,11 @@ TDB_LOCKS = defaultdict(Lock)
 
 CACHE_OPTIONS = TDBOptions(TDBPathType.PERSISTENT, TDBDataType.JSON)
 
+# Decoded views of cache TDB files by IDType name. Only accessed under TDB lock of respective file.
+CACHE_VIEWS = {}
+
+compile_filters = filters().compile_filters
+
 
 class DSCacheFile(enum.Enum):
     USER = 'directoryservice_cache_user'
@@ -339,6 +346,156 @@ def _tdb_add_entry(
     handle.store(f'NAME_{name}', entry)
 
 
+class DSCacheView:
+    """
+    Decoded snapshot of `ID_` entries of user or group cache TDB file. Entries are kept
+    ordered by `id` along with sorted indexes of names (exact and casefolded) and of
+    uids / gids so that queries filtering on them and pages of results do not have to
+    decode or scan the whole cache.
+
+    `handle` is the TDB handle the view was built from. Once DSCacheFill renames new
+    cache files into place, a new handle is opened and the view is rebuilt.
+    """
+    # Greater than any string which starts with a given prefix
+    PREFIX_END = '\U0010ffff'
+
+    def __init__(self, handle: TDBHandle, id_type: IDType, entries: Iterable[dict]):
+        self.handle = handle
+        if id_type is IDType.USER:
+            self.name_keys, self.xid_key = ('username',), 'uid'
+        else:
+            self.name_keys, self.xid_key = ('name', 'group'), 'gid'
+
+        self.by_id = {}
+        for entry in entries:
+            self.by_id[entry['id']] = entry
+
+        self.rebuild_indexes()
+
+    def rebuild_indexes(self) -> None:
+        self.entries = sorted(self.by_id.values(), key=lambda entry: entry['id'])
+        self.ids = [entry['id'] for entry in self.entries]
+        self.xids = [entry[self.xid_key] for entry in self.entries]
+        # synthetic ids are generated from uid / gid so both have the same order
+        self.xids_ordered = all(a < b for a, b in zip(self.xids, self.xids[1:]))
+        name_key = self.name_keys[0]
+        self.names = sorted((entry[name_key], entry['id']) for entry in self.entries)
+        self.names_casefold = sorted((entry[name_key].casefold(), entry['id']) for entry in self.entries)
+
+    def add(self, entry: dict) -> None:
+        replaced = entry['id'] in self.by_id
+        self.by_id[entry['id']] = entry
+        if replaced:
+            self.rebuild_indexes()
+            return
+
+        position = bisect.bisect_left(self.ids, entry['id'])
+        self.entries.insert(position, entry)
+        self.ids.insert(position, entry['id'])
+        self.xids.insert(position, entry[self.xid_key])
+        if self.xids_ordered:
+            neighbours = self.xids[max(position - 1, 0):position + 2]
+            self.xids_ordered = all(a < b for a, b in zip(neighbours, neighbours[1:]))
+
+        name = entry[self.name_keys[0]]
+        bisect.insort(self.names, (name, entry['id']))
+        bisect.insort(self.names_casefold, (name.casefold(), entry['id']))
+
+    def name_range(self, op: str, value) -> tuple[list, int, int] | None:
+        if not isinstance(value, str):
+            return None
+
+        names = self.names
+        if op.startswith('C'):
+            names = self.names_casefold
+            op = op[1:]
+            value = value.casefold()
+
+        match op:
+            case '=':
+                end = f'{value}\0'
+            case '^':
+                end = f'{value}{self.PREFIX_END}'
+            case _:
+                return None
+
+        return names, bisect.bisect_left(names, (value,)), bisect.bisect_left(names, (end,))
+
+    def id_range(self, ids: list, op: str, value) -> tuple[int, int] | None:
+        if not isinstance(value, int) or isinstance(value, bool):
+            return None
+
+        match op:
+            case '=':
+                return bisect.bisect_left(ids, value), bisect.bisect_right(ids, value)
+            case '>':
+                return bisect.bisect_right(ids, value), len(ids)
+            case '>=':
+                return bisect.bisect_left(ids, value), len(ids)
+            case '<':
+                return 0, bisect.bisect_left(ids, value)
+            case '<=':
+                return 0, bisect.bisect_right(ids, value)
+
+        return None
+
+    def candidates(self, filters: list) -> Iterable[dict]:
+        """
+        Entries (in `id` order) which may match `filters` based on the most selective
+        filter that can be served by an index.
+        """
+        best_size = len(self.entries)
+        best = self.entries
+        for f in filters:
+            if len(f) != 3:
+                # disjunction
+                continue
+
+            attr, op, value = f
+            if attr in self.name_keys:
+                if (found := self.name_range(op, value)) is not None:
+                    names, start, end = found
+                    if end - start < best_size:
+                        best_size = end - start
+                        best = (names, start, end)
+            elif attr == 'id' or (attr == self.xid_key and self.xids_ordered):
+                if (found := self.id_range(self.ids if attr == 'id' else self.xids, op, value)) is not None:
+                    start, end = found
+                    if end - start < best_size:
+                        best_size = end - start
+                        best = (self.entries, start, end)
+
+        if best is self.entries:
+            return self.entries
+
+        index, start, end = best
+        if index is self.entries:
+            return (self.entries[i] for i in range(start, end))
+
+        return [self.by_id[id_] for id_ in sorted(id_ for name, id_ in index[start:end])]
+
+    def query(self, filters: list, offset: int = 0, limit: int = 0) -> list[dict]:
+        """
+        Entries matching `filters` ordered by `id`. Returned entries are shallow copies so
+        that callers can update them without affecting the view.
+        """
+        matches = self.candidates(filters)
+        if filters:
+            matches = filter(compile_filters(filters), matches)
+
+        return [entry.copy() for entry in itertools.islice(matches, offset, offset + limit if limit else None)]
+
+
+def get_cache_view(id_type: IDType, handle: TDBHandle) -> DSCacheView:
+    """ Should be called under TDB lock (i.e. inside `get_tdb_handle`) """
+    if (view := CACHE_VIEWS.get(id_type.name)) is None or view.handle is not handle:
+        view = CACHE_VIEWS[id_type.name] = DSCacheView(
+            handle, id_type, handle.entries(include_keys=False, key_prefix='ID_')
+        )
+
+    return view
+
+
 def insert_cache_entry(
     id_type: IDType,
     xid: int,
@@ -358,6 +515,9 @@ def insert_cache_entry(
             TDBBatchOperation(action=TDBBatchAction.SET, key=f'NAME_{xid}', value=entry),
         ])
 
+        if (view := CACHE_VIEWS.get(id_type.name)) is not None and view.handle is handle:
+            view.add(entry.copy())
+
 
 def retrieve_cache_entry(
     id_type: IDType,
@@ -385,5 +545,10 @@ def query_cache_entries(
     filters: list,
     options: dict
 ) -> list:
+    """
+    Query cache entries ordered by `id`. Only `offset` and `limit` query-options
+    are evaluated.
+    """
     with get_tdb_handle(DSCacheFile[id_type.name].value, CACHE_OPTIONS) as handle:
-        return filter_list(handle.entries(include_keys=False, key_prefix='ID_'), filters, options)
+        view = get_cache_view(id_type, handle)
+        return view.query(filters, options.get('offset') or 0, options.get('limit') or 0)
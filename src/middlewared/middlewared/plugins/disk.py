@@ -136,8 +136,9 @@ class DiskService(CRUDService):
             if await self.middleware.call('truenas.is_ix_hardware') or disk['name'].startswith('nvme'):
                 disk['supports_smart'] = True
             else:
-                disk_query = await self.middleware.call('disk.smartctl', disk['name'], ['-a', '--json=c'], {'silent': True})
-                disk['supports_smart'] = disk_query.get('smart_support', {}).get('available', False)
+                # S.M.A.R.T. support does not change, any snapshot will do
+                snapshot = await self.middleware.call('disk.smart_snapshot', disk['name'], {'max_age': None}) or {}
+                disk['supports_smart'] = snapshot.get('smart_support', {}).get('available', False)
 
         if disk['name'] in context['boot_pool_disks']:
             disk['pool'] = context['boot_pool_name']
@@ -5,7 +5,9 @@ class DiskService(Service):
     @private
     async def toggle_smart_off(self, name):
         await self.middleware.call('disk.smartctl', name, ['--smart=off'], {'silent': True})
+        await self.middleware.call('disk.reset_smart_snapshots', name)
 
     @private
     async def toggle_smart_on(self, name):
         await self.middleware.call('disk.smartctl', name, ['--smart=on'], {'silent': True})
+        await self.middleware.call('disk.reset_smart_snapshots', name)
@@ -1,11 +1,6 @@
-import json
-import re
-
 from middlewared.schema import Bool, Dict, Int, List, returns, Str
 from middlewared.service import accepts, CallError, private, Service
 
-RE_SATA_DOM_LIFETIME = re.compile(r'^164\s+.*\s+([0-9]+)$', re.M)
-
 
 class DiskService(Service):
     @accepts(Str('name'))
@@ -38,7 +33,7 @@ class DiskService(Service):
         """
         Returns S.M.A.R.T. attributes values for specified disk name.
         """
-        output = json.loads(await self.middleware.call('disk.smartctl', name, ['-a', '--json=c']))
+        output = await self.middleware.call('disk.smart_snapshot', name, {'silent': False})
 
         if 'ata_smart_attributes' in output:
             return output['ata_smart_attributes']['table']
@@ -51,11 +46,11 @@ class DiskService(Service):
 
     @private
     async def sata_dom_lifetime_left(self, name):
-        output = await self.middleware.call('disk.smartctl', name, ['-A'], {'silent': True})
+        output = await self.middleware.call('disk.smart_snapshot', name)
         if output is None:
             return None
 
-        m = RE_SATA_DOM_LIFETIME.search(output)
-        if m:
-            aec = int(m.group(1))
-            return max(1.0 - aec / 3000, 0)
+        for attribute in output.get('ata_smart_attributes', {}).get('table', []):
+            if attribute['id'] == 164:
+                aec = attribute['raw']['value']
+                return max(1.0 - aec / 3000, 0)
@@ -1,15 +1,27 @@
 import asyncio
+import json
 import subprocess
+import time
 
-from middlewared.common.smart.smartctl import get_smartctl_args, smartctl, SMARTCTX
-from middlewared.schema import accepts, Bool, Dict, List, Str
+from middlewared.common.smart.smartctl import get_smartctl_args, smartctl, SMARTCTL_POWERMODES, SMARTCTX
+from middlewared.schema import accepts, Bool, Dict, Int, List, Str
 from middlewared.service import CallError, private, Service
 from middlewared.utils.asyncio_ import asyncio_map
 
+# Maximum number of `smartctl` processes running at the same time
+SMARTCTL_CONCURRENCY = 8
+SMART_SNAPSHOT_MAX_AGE = 30
+
 
 class DiskService(Service):
     smartctl_args_for_disk = {}
     smartctl_args_for_device_lock = asyncio.Lock()
+    smartctl_semaphore = asyncio.BoundedSemaphore(SMARTCTL_CONCURRENCY)
+    # disk name => (`smartctl -a --json=c` output, monotonic time)
+    smart_snapshots = {}
+    # (disk name, powermode) => monotonic time when `smartctl` did not read the disk in `powermode`
+    smart_snapshots_skipped = {}
+    smart_snapshots_inflight = {}
 
     @private
     async def update_smartctl_args_for_disks(self):
@@ -28,6 +40,7 @@ class DiskService(Service):
                         lambda disk: get_smartctl_args(context, disk["name"], disk["smartoptions"]), disks, 8
                     )
                 ))
+                await self.reset_smart_snapshots()
             except Exception:
                 self.logger.error("update_smartctl_args_for_disks failed", exc_info=True)
             finally:
@@ -69,8 +82,9 @@ class DiskService(Service):
             if smartctl_args is None:
                 raise CallError(f'S.M.A.R.T. is unavailable for disk {disk}')
 
-            cp = await smartctl(smartctl_args + args, check=False, stderr=subprocess.STDOUT,
-                                encoding='utf8', errors='ignore')
+            async with self.smartctl_semaphore:
+                cp = await smartctl(smartctl_args + args, check=False, stderr=subprocess.STDOUT,
+                                    encoding='utf8', errors='ignore')
             if (cp.returncode & 0b11) != 0:
                 raise CallError(f'smartctl failed for disk {disk}:\n{cp.stdout}')
         except CallError:
@@ -81,6 +95,94 @@ class DiskService(Service):
 
         return cp.stdout
 
+    @accepts(
+        Str('disk'),
+        Dict(
+            'options',
+            Int('max_age', default=SMART_SNAPSHOT_MAX_AGE, null=True),
+            Str('powermode', enum=SMARTCTL_POWERMODES, default=SMARTCTL_POWERMODES[0]),
+            Bool('silent', default=True),
+        ),
+    )
+    @private
+    async def smart_snapshot(self, disk, options):
+        """
+        Returns parsed `smartctl -a --json=c` output for `disk`. It is shared between callers and must not be modified.
+
+        A snapshot taken less than `max_age` seconds ago (any snapshot if `max_age` is null) is returned without running
+        `smartctl`. Concurrent calls for the same disk and `powermode` share a single `smartctl` run.
+
+        Unless `powermode` is `NEVER`, `smartctl` does not wake up a disk that is in `powermode` or lower power mode
+        and `None` is returned. The disk is not checked again in that `powermode` for `max_age` seconds.
+        """
+        def fresh(taken_at):
+            return taken_at is not None and (options['max_age'] is None or now - taken_at < options['max_age'])
+
+        now = time.monotonic()
+        if (snapshot := self.smart_snapshots.get(disk)) is not None and fresh(snapshot[1]):
+            return snapshot[0]
+
+        key = (disk, options['powermode'])
+        if fresh(self.smart_snapshots_skipped.get(key)):
+            return None
+
+        if (task := self.smart_snapshots_inflight.get(key)) is None:
+            task = self.smart_snapshots_inflight[key] = self.middleware.create_task(
+                self.__take_smart_snapshot(disk, options['powermode'])
+            )
+
+        try:
+            # Do not cancel the `smartctl` run other callers might be waiting for
+            return await asyncio.shield(task)
+        except CallError:
+            if options['silent']:
+                return None
+
+            raise
+
+    async def __take_smart_snapshot(self, disk, powermode):
+        key = (disk, powermode)
+        try:
+            try:
+                output = await self.middleware.call('disk.smartctl', disk, ['-a', '-n', powermode.lower(), '--json=c'])
+            except CallError:
+                if powermode != SMARTCTL_POWERMODES[0] and self.__current_smart_snapshot_run(key):
+                    self.smart_snapshots_skipped[key] = time.monotonic()
+
+                raise
+
+            data = json.loads(output)
+            # Do not store the data if snapshots were reset while `smartctl` was running as it might be outdated
+            if self.__current_smart_snapshot_run(key):
+                self.smart_snapshots[disk] = (data, time.monotonic())
+                for skipped_key in [k for k in self.smart_snapshots_skipped if k[0] == disk]:
+                    self.smart_snapshots_skipped.pop(skipped_key)
+
+            return data
+        finally:
+            if self.__current_smart_snapshot_run(key):
+                self.smart_snapshots_inflight.pop(key)
+
+    def __current_smart_snapshot_run(self, key):
+        return self.smart_snapshots_inflight.get(key) is asyncio.current_task()
+
+    @private
+    async def reset_smart_snapshots(self, disk=None):
+        """
+        Discard SMART snapshots (of `disk` or all disks). Should be called when the data has changed (i.e. a
+        S.M.A.R.T. test was started).
+        """
+        if disk is None:
+            self.smart_snapshots.clear()
+            self.smart_snapshots_skipped.clear()
+            self.smart_snapshots_inflight.clear()
+            return
+
+        self.smart_snapshots.pop(disk, None)
+        for snapshots in (self.smart_snapshots_skipped, self.smart_snapshots_inflight):
+            for key in [key for key in snapshots if key[0] == disk]:
+                snapshots.pop(key)
+
 
 async def setup(middleware):
     await middleware.call('disk.update_smartctl_args_for_disks')
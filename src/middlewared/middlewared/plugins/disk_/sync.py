@@ -107,12 +107,13 @@ class DiskService(Service, ServiceChangeMixin):
     def sync_all(self, job, opts):
         """
         Synchronize all disks with the cache in database.
+
+        All database changes are applied in a single transaction. Returns the number of disks that were `added`,
+        `changed`, marked as `expired` and `removed` (after they had been expired for `DISK_EXPIRECACHE_DAYS`).
         """
         # Skip sync disks on standby node
-        licensed = self.middleware.call_sync('failover.licensed')
-        if licensed:
-            status = self.middleware.call_sync('failover.status')
-            if status == 'BACKUP':
+        if self.middleware.call_sync('failover.licensed'):
+            if self.middleware.call_sync('failover.status') == 'BACKUP':
                 return
 
         job.set_progress(10, 'Enumerating system disks')
@@ -121,11 +122,13 @@ class DiskService(Service, ServiceChangeMixin):
 
         job.set_progress(20, 'Enumerating disk information from database')
         db_disks = self.middleware.call_sync('datastore.query', 'storage.disk', [], {'order_by': ['disk_expiretime']})
+        db_disks_by_identifier = {disk['disk_identifier']: disk for disk in db_disks}
 
-        options = {'send_events': False, 'ha_sync': False}
-        seen_disks = {}
-        changed = set()
+        updated = {}
+        inserted = {}
         deleted = set()
+        expired = set()
+        seen_disks = {}
         dif_formatted_disks = []
         increment = round((40 - 20) / number_of_disks, 3)  # 20% of the total percentage
         progress_percent = 40
@@ -141,10 +144,8 @@ class DiskService(Service, ServiceChangeMixin):
                 # 2. or can't translate device to identifier
                 if not disk['disk_expiretime']:
                     disk['disk_expiretime'] = utc_now() + timedelta(days=self.DISK_EXPIRECACHE_DAYS)
-                    self.middleware.call_sync(
-                        'datastore.update', 'storage.disk', disk['disk_identifier'], disk, options
-                    )
-                    changed.add(disk['disk_identifier'])
+                    updated[disk['disk_identifier']] = disk
+                    expired.add(disk['disk_identifier'])
                 elif disk['disk_expiretime'] < utc_now():
                     # Disk expire time has surpassed, go ahead and remove it
                     if disk['disk_kmip_uid']:
@@ -152,8 +153,8 @@ class DiskService(Service, ServiceChangeMixin):
                             'kmip.reset_sed_disk_password', disk['disk_identifier'], disk['disk_kmip_uuid'],
                             background=True
                         )
-                    self.middleware.call_sync('datastore.delete', 'storage.disk', disk['disk_identifier'], options)
                     deleted.add(disk['disk_identifier'])
+                    db_disks_by_identifier.pop(disk['disk_identifier'])
                 continue
             else:
                 disk['disk_expiretime'] = None
@@ -170,23 +171,20 @@ class DiskService(Service, ServiceChangeMixin):
                 disk['disk_expiretime'] = utc_now() + timedelta(days=self.DISK_EXPIRECACHE_DAYS)
 
             if self._disk_changed(disk, original_disk):
-                self.middleware.call_sync('datastore.update', 'storage.disk', disk['disk_identifier'], disk, options)
-                changed.add(disk['disk_identifier'])
+                updated[disk['disk_identifier']] = disk
 
             seen_disks[name] = disk
 
-        qs = None
         progress_percent = 70
         for name in filter(lambda x: x not in seen_disks, sys_disks):
             progress_percent += increment
             disk_identifier = self.dev_to_ident(name, sys_disks)
-            if qs is None:
-                qs = self.middleware.call_sync('datastore.query', 'storage.disk')
-
-            if disk := [i for i in qs if i['disk_identifier'] == disk_identifier]:
+            if disk := db_disks_by_identifier.get(disk_identifier):
                 new = False
-                disk = disk[0]
                 job.set_progress(progress_percent, f'Updating disk {name!r}')
+            elif disk := inserted.get(disk_identifier):
+                new = True
+                job.set_progress(progress_percent, f'Updating new disk {name!r}')
             else:
                 new = True
                 disk = {'disk_identifier': disk_identifier}
@@ -201,19 +199,23 @@ class DiskService(Service, ServiceChangeMixin):
 
             if not new:
                 if self._disk_changed(disk, original_disk):
-                    self.middleware.call_sync(
-                        'datastore.update', 'storage.disk', disk['disk_identifier'], disk, options
-                    )
-                    changed.add(disk['disk_identifier'])
+                    updated[disk['disk_identifier']] = disk
             else:
-                self.middleware.call_sync('datastore.insert', 'storage.disk', disk, options)
-                changed.add(disk['disk_identifier'])
+                inserted[disk['disk_identifier']] = disk
+
+        job.set_progress(90, 'Updating disks in database')
+        self.middleware.call_sync('datastore.write_batch', 'storage.disk', {
+            'insert': list(inserted.values()),
+            'update': [[identifier, disk] for identifier, disk in updated.items()],
+            'delete': list(deleted),
+        }, {'send_events': False})
 
         if dif_formatted_disks:
             self.middleware.call_sync('alert.oneshot_create', 'DifFormatted', dif_formatted_disks)
         else:
             self.middleware.call_sync('alert.oneshot_delete', 'DifFormatted', None)
 
+        changed = set(updated) | set(inserted)
         if changed or deleted:
             job.set_progress(92, 'Restarting necessary services')
             self.middleware.call_sync('disk.restart_services_after_sync')
@@ -230,16 +232,15 @@ class DiskService(Service, ServiceChangeMixin):
             job.set_progress(95, 'Synchronizing ZFS GUIDs')
             self.middleware.call_sync('disk.sync_all_zfs_guid')
 
-        if licensed and status == 'MASTER':
-            job.set_progress(96, 'Synchronizing database to standby controller')
-            # there could be, literally, > 1k database changes in this method on large systems
-            # so we're not sync'ing these db changes synchronously. Instead we're sync'ing the
-            # entire database to the remote node after we're done. The (potential) speed
-            # improvement this provides is substantial
-            self.middleware.call_sync('failover.datastore.force_send')
-
+        result = {
+            'added': len(inserted),
+            'changed': len(set(updated) - expired),
+            'expired': len(expired),
+            'removed': len(deleted),
+        }
+        self.logger.info('Disks synced: %r', result)
         job.set_progress(100, 'Syncing all disks complete')
-        return 'OK'
+        return result
 
     def _disk_changed(self, disk, original_disk):
         # storage_disk.disk_size is a string
@@ -1,7 +1,6 @@
 import asyncio
 import datetime
 import time
-import json
 
 from middlewared.api import api_method
 from middlewared.api.current import DiskTemperatureAlertsArgs, DiskTemperatureAlertsResult
@@ -62,8 +61,8 @@ class DiskService(Service):
 
     @private
     async def temperature_uncached(self, name, powermode):
-        if output := await self.middleware.call('disk.smartctl', name, ['-a', '-n', powermode.lower(), '--json=c'], {'silent': True}):
-            return parse_smartctl_for_temperature_output(json.loads(output))
+        if data := await self.middleware.call('disk.smart_snapshot', name, {'powermode': powermode}):
+            return parse_smartctl_for_temperature_output(data)
 
     @private
     async def reset_temperature_cache(self):
@@ -1,4 +1,5 @@
 from middlewared.plugins.apps.ix_apps.docker.utils import get_docker_client, PROJECT_KEY
+from middlewared.plugins.apps.ix_apps.state import APP_RESOURCES
 from middlewared.service import Service
 
 
@@ -25,18 +26,26 @@ class DockerEventService(Service):
             self.process_internal(docker_client)
 
     def process_internal(self, client):
-        for container_event in client.events(
+        events = client.events(
             decode=True, filters={
-                'type': ['container'],
+                'type': ['container', 'network', 'volume'],
                 'event': [
                     'create', 'destroy', 'detach', 'die', 'health_status', 'kill', 'unpause',
-                    'oom', 'pause', 'rename', 'resize', 'restart', 'start', 'stop', 'update',
+                    'oom', 'pause', 'remove', 'rename', 'resize', 'restart', 'start', 'stop', 'update',
                 ]
             }
-        ):
+        )
+        # Events might have been missed while we were not listening
+        APP_RESOURCES.invalidate()
+        for container_event in events:
             if not isinstance(container_event, dict):
                 continue
 
+            if container_event.get('Type') != 'container':
+                # Networks and volumes are app resources too but their events do not tell which app they belong to
+                APP_RESOURCES.invalidate()
+                continue
+
             if project := container_event.get('Actor', {}).get('Attributes', {}).get(PROJECT_KEY):
                 self.middleware.send_event('docker.events', 'ADDED', id=project, fields=container_event)
 
@@ -3,17 +3,21 @@
 # Licensed under the terms of the TrueNAS Enterprise License Agreement
 # See the file LICENSE.IX for complete terms and conditions
 
-import os
 import time
 
-from middlewared.service import Service
+from middlewared.service import CallError, Service
 from middlewared.plugins.config import FREENAS_DATABASE
 from middlewared.plugins.datastore.connection import thread_pool
 from middlewared.utils.threading import start_daemon_thread, set_thread_name
 from middlewared.utils import db as db_utils
 
+from .datastore_log import ReplicaState, ReplicationLog
+
 FREENAS_DATABASE_REPLICATED = f'{FREENAS_DATABASE}.replicated'
 RAISE_ALERT_SYNC_RETRY_TIME = 1200  # 20mins (some platforms take 15-20mins to reboot)
+# For how long to retry sending replication log batches before sending the whole database
+REPLICATION_RETRY_TIMEOUT = 60
+REPLICATION_RETRY_INTERVAL = 1
 
 
 class FailoverDatastoreService(Service):
@@ -34,6 +38,127 @@ class FailoverDatastoreService(Service):
 
         await self.middleware.call('datastore.execute', sql, params)
 
+    async def sql_batch(self, data, entries):
+        """
+        Apply `[seq, sql, params]` `entries` of the remote node replication log `data['epoch']`.
+
+        Returns `{'seq': <seq>}` where `seq` is the last statement applied (the remote node replays everything after
+        it) or `{'seq': None}` if this node does not follow the replication log and needs the whole database.
+        """
+        if await self.middleware.call('system.version') != data['version']:
+            return
+
+        if await self.middleware.call('failover.status') != 'BACKUP':
+            # Non-BACKUP nodes are responsible for checking their failover status (see `sql`)
+            return
+
+        return await self.middleware.call('failover.datastore.apply_batch', data['epoch'], entries)
+
+    def apply_batch(self, epoch, entries):
+        if (pending := self.replica.pending(epoch, entries)) is None:
+            return {'seq': None}
+
+        for seq, sql, params in pending:
+            try:
+                self.middleware.call_sync('datastore.execute', sql, params)
+            except Exception:
+                self.logger.error('Error applying replicated SQL query %r', sql, exc_info=True)
+                self.replica.start(None)
+                return {'seq': None}
+
+            self.replica.seq = seq
+
+        return {'seq': self.replica.seq}
+
+    def replication_start(self, epoch):
+        """
+        Follow the remote node replication log `epoch` (our database has just been replaced with the one from the
+        remote node that contains all the statements logged before it).
+        """
+        self.replica.start(epoch)
+
+    log = ReplicationLog()
+    replica = ReplicaState()
+    replication_thread = None
+
+    def replicate(self, sql, params):
+        """
+        Queue SQL query for replication to the remote node. This is executed in `hook_datastore_execute_write` and
+        must not block.
+        """
+        if self.failure:
+            # The whole database is going to be sent
+            return
+
+        if not self.log.append(sql, params):
+            self.logger.warning('Too many SQL queries are waiting to be replicated, sending the whole database')
+            self.set_failure()
+            return
+
+        if self.replication_thread is None:
+            self.replication_thread = start_daemon_thread(name='failover_replication', target=self._replicate_log)
+
+    def _replicate_log(self):
+        set_thread_name('failover_replication')
+
+        version = None
+        failing_since = None
+        while True:
+            epoch, batch = self.log.batch()
+            try:
+                if version is None:
+                    version = self.middleware.call_sync('system.version')
+
+                ack = self.middleware.call_sync(
+                    'failover.call_remote',
+                    'failover.datastore.sql_batch',
+                    [{'version': version, 'epoch': epoch}, batch],
+                    {'timeout': 10},
+                )
+            except CallError as e:
+                if e.errno == CallError.ENOMETHOD:
+                    # Remote node runs a different version, `sql_batch` would discard queries anyway
+                    ack = None
+                else:
+                    ack = self._replication_error(e, failing_since)
+            except Exception as e:
+                ack = self._replication_error(e, failing_since)
+
+            if ack is False:
+                failing_since = failing_since or time.monotonic()
+                time.sleep(REPLICATION_RETRY_INTERVAL)
+                continue
+
+            failing_since = None
+            if ack is None:
+                # Remote node discarded the queries (see `sql_batch`)
+                self.log.acknowledge(epoch, batch[-1][0])
+                continue
+
+            if ack['seq'] is not None:
+                if ack['seq'] < batch[-1][0]:
+                    self.logger.debug('Remote node requested replay of SQL queries starting from %d', ack['seq'] + 1)
+
+                if self.log.acknowledge(epoch, ack['seq']):
+                    continue
+
+            if epoch == self.log.epoch:
+                self.logger.warning('Remote node can not continue SQL replication, sending the whole database')
+                self.middleware.call_sync('failover.datastore.set_failure')
+
+    def _replication_error(self, error, failing_since):
+        """
+        Returns False if sending should be retried or the acknowledgement that makes the whole database to be sent.
+        """
+        if failing_since is None:
+            self.logger.warning('Error replicating SQL on the remote node: %r', error)
+            return False
+
+        if time.monotonic() - failing_since < REPLICATION_RETRY_TIMEOUT:
+            return False
+
+        return {'seq': None}
+
     failure = False
 
     def is_failure(self):
@@ -41,6 +166,8 @@ class FailoverDatastoreService(Service):
 
     def set_failure(self):
         self.failure = True
+        # The queries will be replicated as a part of the database
+        self.log.reset()
         try:
             # This is executed in `hook_datastore_execute_write` so we can't query local failover status here and we'll
             # have to rely on remote.
@@ -84,6 +211,10 @@ class FailoverDatastoreService(Service):
             start_daemon_thread(target=send_retry)
 
     def send(self):
+        # This is executed in the datastore thread so all the queries logged so far are in the database file
+        # once it is checkpointed
+        self.middleware.call_sync('datastore.checkpoint', True)
+        epoch = self.log.reset()
         token = self.middleware.call_sync('failover.call_remote', 'auth.generate_token', [
             300,  # ttl
             {},  # Attributes (not required for file uploads)
@@ -92,6 +223,9 @@ class FailoverDatastoreService(Service):
         ])
         self.middleware.call_sync('failover.send_file', token, FREENAS_DATABASE, FREENAS_DATABASE_REPLICATED, {'mode': db_utils.FREENAS_DATABASE_MODE})
         self.middleware.call_sync('failover.call_remote', 'failover.datastore.receive')
+        self.middleware.call_sync(
+            'failover.call_remote', 'failover.datastore.replication_start', [epoch], {'raise_connect_error': False},
+        )
 
         self.failure = False
         self.middleware.call_sync('alert.oneshot_delete', 'FailoverSyncFailed', None)
@@ -134,8 +268,9 @@ class FailoverDatastoreService(Service):
             )
             return
 
-        os.rename(FREENAS_DATABASE_REPLICATED, FREENAS_DATABASE)
-        self.middleware.call_sync('datastore.setup')
+        self.middleware.call_sync('datastore.replace', FREENAS_DATABASE_REPLICATED)
+        # Wait for `replication_start` from the remote node
+        self.replica.start(None)
 
     async def force_send(self):
         if await self.middleware.call('failover.status') == 'MASTER':
@@ -147,6 +282,8 @@ def hook_datastore_execute_write(middleware, sql, params, options):
     # No switching to the async context that will yield to database queries is allowed here as it will result in
     # a deadlock. That's why we can't query failover status and will always try to replicate all queries to the other
     # node. The other node will check its own failover status upon receiving them.
+    # Queries are only appended to the replication log here, they are sent in batches by `failover_replication`
+    # thread.
 
     if not options['ha_sync']:
         return
@@ -154,27 +291,7 @@ def hook_datastore_execute_write(middleware, sql, params, options):
     if not middleware.call_sync('failover.licensed'):
         return
 
-    if middleware.call_sync('failover.datastore.is_failure'):
-        return
-
-    try:
-        middleware.call_sync(
-            'failover.call_remote',
-            'failover.datastore.sql',
-            [
-                {
-                    'version': middleware.call_sync('system.version'),
-                },
-                sql,
-                params,
-            ],
-            {
-                'timeout': 10,
-            },
-        )
-    except Exception as e:
-        middleware.logger.warning('Error replicating SQL on the remote node: %r', e)
-        middleware.call_sync('failover.datastore.set_failure')
+    middleware.call_sync('failover.datastore.replicate', sql, params)
 
 
 async def setup(middleware):
@@ -0,0 +1,134 @@
+# Copyright (c) - iXsystems Inc. dba TrueNAS
+#
+# Licensed under the terms of the TrueNAS Enterprise License Agreement
+# See the file LICENSE.IX for complete terms and conditions
+
+import collections
+import threading
+import uuid
+
+REPLICATION_BATCH_SIZE = 500
+# `failover.datastore.sql_batch` messages are limited to `MsgSizeLimit.EXTENDED`, leave room for JSON encoding
+REPLICATION_BATCH_MAX_BYTES = 1024 * 1024
+# Once this many statements are waiting to be acknowledged the whole database is sent instead
+REPLICATION_LOG_MAX_ENTRIES = 50000
+
+
+def entry_size(sql, params):
+    return len(sql) + sum(len(p) if isinstance(p, (str, bytes)) else 8 for p in params)
+
+
+class ReplicationLog:
+    """
+    Ordered log of SQL statements executed on this node that were not yet acknowledged by the remote node.
+
+    Every statement gets a sequence number within the log `epoch`. A new epoch starts (with an empty log) every time
+    the whole database is sent to the remote node as from that point the remote node's database contains all the
+    statements logged before.
+    """
+
+    def __init__(self, max_entries=REPLICATION_LOG_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.cond = threading.Condition()
+        self.epoch = None
+        self.entries = collections.deque()
+        self.last_seq = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Start a new epoch discarding all pending statements. Returns the new epoch.
+        """
+        with self.cond:
+            self.epoch = uuid.uuid4().hex
+            self.entries.clear()
+            self.last_seq = 0
+            return self.epoch
+
+    def append(self, sql, params):
+        """
+        Returns False if the log is full (the statement is not logged).
+        """
+        with self.cond:
+            if len(self.entries) >= self.max_entries:
+                return False
+
+            self.last_seq += 1
+            self.entries.append((self.last_seq, sql, params, entry_size(sql, params)))
+            self.cond.notify_all()
+            return True
+
+    def batch(self, timeout=None, max_entries=REPLICATION_BATCH_SIZE, max_bytes=REPLICATION_BATCH_MAX_BYTES):
+        """
+        Wait for pending statements and return a tuple of (<epoch>, <[seq, sql, params] list>) starting with the
+        oldest statement that was not acknowledged. The list is empty if `timeout` expires.
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.entries, timeout)
+
+            batch = []
+            size = 0
+            for seq, sql, params, entry_bytes in self.entries:
+                if batch and (len(batch) >= max_entries or size + entry_bytes > max_bytes):
+                    break
+
+                batch.append([seq, sql, params])
+                size += entry_bytes
+
+            return self.epoch, batch
+
+    def acknowledge(self, epoch, seq):
+        """
+        Remote node has applied all statements up to `seq` (and expects `seq + 1` next).
+
+        Returns False if the remote node needs statements that are not in the log anymore.
+        """
+        with self.cond:
+            if epoch != self.epoch:
+                # The log was reset while the batch was being sent
+                return True
+
+            if self.entries and seq < self.entries[0][0] - 1:
+                return False
+
+            while self.entries and self.entries[0][0] <= seq:
+                self.entries.popleft()
+
+            return True
+
+
+class ReplicaState:
+    """
+    Position of this node in the remote node's replication log.
+    """
+
+    def __init__(self):
+        self.epoch = None
+        self.seq = 0
+
+    def start(self, epoch):
+        self.epoch = epoch
+        self.seq = 0
+
+    def pending(self, epoch, entries):
+        """
+        Returns statements from `entries` that should be applied next. Already applied statements are skipped and
+        everything after a gap is left out (so that the remote node replays it starting from `self.seq + 1`).
+
+        Returns None if this node does not follow the log `epoch` (its database has to be replaced).
+        """
+        if self.epoch is None or epoch != self.epoch:
+            return None
+
+        pending = []
+        seq = self.seq
+        for entry in entries:
+            if entry[0] <= seq:
+                continue
+            if entry[0] != seq + 1:
+                break
+
+            pending.append(entry)
+            seq = entry[0]
+
+        return pending
@@ -2,6 +2,7 @@ import errno
 import json
 import os
 import subprocess
+import tempfile
 from pathlib import Path
 from typing import Literal
 
@@ -20,6 +21,7 @@ from middlewared.service import private, job, ValidationErrors, Service
 from middlewared.service_exception import CallError, MatchNotFound, ValidationError
 from middlewared.utils.filesystem.acl import (
     ACL_UNDEFINED_ID,
+    ACLXattr,
     FS_ACL_Type,
     NFS4ACE_Tag,
     POSIXACE_Tag,
@@ -30,8 +32,14 @@ from middlewared.utils.filesystem.acl import (
     validate_nfs4_ace_full,
 )
 from middlewared.utils.filesystem.directory import directory_is_empty
+from middlewared.utils.filesystem.recursive_perm import InheritedAcl, RecursivePermissionChange
 from middlewared.utils.path import FSLocation, path_location
-from .utils import acltool, AclToolAction, calculate_inherited_acl, canonicalize_nfs4_acl, gen_aclstring_posix1e
+from .utils import calculate_inherited_acl, canonicalize_nfs4_acl, gen_aclstring_posix1e
+
+ACL_XATTRS_BY_TYPE = {
+    FS_ACL_Type.NFS4: frozenset([ACLXattr.ZFS_NATIVE]),
+    FS_ACL_Type.POSIX1E: frozenset([ACLXattr.POSIX_ACCESS, ACLXattr.POSIX_DEFAULT]),
+}
 
 
 class SimplifiedAclEntry(BaseModel):
@@ -137,6 +145,48 @@ class FilesystemService(Service):
 
         return loc
 
+    def _recursive_perm_change(self, job, path, options, uid, gid, mode=None, acl=None, start_percent=10):
+        """
+        Apply changes below `path`. Returns False if the job was aborted part way through.
+        """
+        try:
+            # ZFS reports count of objects in the dataset which is a good enough estimate for job progress
+            st = os.statvfs(path)
+            estimate = st.f_files - st.f_ffree
+        except OSError:
+            estimate = 0
+
+        # The job is only finished once this returns so that no file is changed after it has been aborted
+        change = RecursivePermissionChange(
+            path, uid=uid, gid=gid, mode=mode, acl=acl, traverse=options.get('traverse', False),
+            should_abort=lambda: job.aborted,
+        )
+
+        def progress(processed, rate):
+            percent = start_percent
+            if estimate:
+                percent += (99 - start_percent) * min(processed / estimate, 1)
+
+            job.set_progress(
+                percent, f'Processed {processed} files ({int(rate)} files/s).',
+                {'processed': processed, 'files_per_second': rate},
+            )
+
+        try:
+            processed = change.run(progress)
+        except OSError as e:
+            raise CallError(f'{e.filename}: failed to change permissions: {e.strerror}', e.errno)
+
+        if change.aborted:
+            self.logger.warning('%s: recursive permissions change aborted after processing %d files in %d seconds.',
+                                path, processed, change.elapsed)
+            job.set_progress(
+                description=f'Aborted after processing {processed} files.', extra={'processed': processed},
+            )
+            return False
+
+        return True
+
     @private
     def path_get_acltype(self, path):
         """
@@ -156,7 +206,7 @@ class FilesystemService(Service):
         roles=['FILESYSTEM_ATTRS_WRITE'],
         audit='Filesystem change owner', audit_extended=lambda data: data['path']
     )
-    @job(lock="perm_change")
+    @job(lock="perm_change", abortable=True)
     def chown(self, job, data):
         """
         Change owner or group of file at `path`.
@@ -173,6 +223,9 @@ class FilesystemService(Service):
 
         If `traverse` and `recursive` are specified, then the chown
         operation will traverse filesystem mount points.
+
+        Recursive operations report the count of processed files in
+        job progress and may be aborted.
         """
         job.set_progress(0, 'Preparing to change owner.')
         verrors = ValidationErrors()
@@ -198,22 +251,22 @@ class FilesystemService(Service):
         self._common_perm_path_validate("filesystem.chown", data, verrors)
         verrors.check()
 
+        os.chown(data['path'], uid, gid)
+
         if not options['recursive']:
             job.set_progress(100, 'Finished changing owner.')
-            os.chown(data['path'], uid, gid)
             return
 
         job.set_progress(10, f'Recursively changing owner of {data["path"]}.')
-        options['posixacl'] = True
-        acltool(data['path'], AclToolAction.CHOWN, uid, gid, options)
-        job.set_progress(100, 'Finished changing owner.')
+        if self._recursive_perm_change(job, data['path'], options, uid, gid):
+            job.set_progress(100, 'Finished changing owner.')
 
     @api_method(
         FilesystemSetPermArgs, FilesystemSetPermResult,
         roles=['FILESYSTEM_ATTRS_WRITE'],
         audit='Filesystem set permission', audit_extended=lambda data: data['path']
     )
-    @job(lock="perm_change")
+    @job(lock="perm_change", abortable=True)
     def setperm(self, job, data):
         """
         Set unix permissions on given `path`.
@@ -244,6 +297,8 @@ class FilesystemService(Service):
         will be converted to trivial ACLs. An ACL is trivial if it can be
         expressed as a file mode without losing any access rules.
 
+        Recursive operations report the count of processed files in
+        job progress and may be aborted.
         """
         job.set_progress(0, 'Preparing to set permissions.')
         options = data['options']
@@ -285,7 +340,7 @@ class FilesystemService(Service):
             )
 
         verrors.check()
-        is_nfs4acl = current_acl['acltype'] == 'NFS4'
+        acl_xattrs = ACL_XATTRS_BY_TYPE.get(current_acl['acltype'])
 
         if mode is not None:
             mode = int(mode, 8)
@@ -301,12 +356,12 @@ class FilesystemService(Service):
             job.set_progress(100, 'Finished setting permissions.')
             return
 
-        action = AclToolAction.CLONE if mode else AclToolAction.STRIP
         job.set_progress(10, f'Recursively setting permissions on {data["path"]}.')
-        options['posixacl'] = not is_nfs4acl
-        options['do_chmod'] = True
-        acltool(data['path'], action, uid, gid, options)
-        job.set_progress(100, 'Finished setting permissions.')
+        if self._recursive_perm_change(
+            job, data['path'], options, uid, gid, mode=mode or None,
+            acl=InheritedAcl.strip(acl_xattrs) if acl_xattrs else None,
+        ):
+            job.set_progress(100, 'Finished setting permissions.')
 
     @private
     def getacl_nfs4(self, path, simplified, resolve_ids):
@@ -502,6 +557,57 @@ class FilesystemService(Service):
 
         return ret
 
+    @private
+    def inherited_acl_nfs4(self, path):
+        """
+        NFSv4 ACLs that files and directories created below `path` would receive. They are written by
+        nfs4xdr_setfacl to temporary files within `path` and read back so that they can be copied to
+        existing files as raw extended attributes.
+        """
+        current_acl = self.getacl_nfs4(path, False, False)
+        child_dir = calculate_inherited_acl(current_acl, True)
+        child_file = calculate_inherited_acl(current_acl, False)
+        deeper = {'acltype': FS_ACL_Type.NFS4, 'acl': child_dir}
+        acls = [child_file, child_dir, calculate_inherited_acl(deeper, False), calculate_inherited_acl(deeper, True)]
+
+        templates = []
+        with tempfile.TemporaryDirectory(prefix='.acl_template_', dir=path) as tmpdir:
+            for idx, acl in enumerate(acls):
+                if not acl:
+                    # nothing is inherited, ACL is stripped
+                    templates.append({})
+                    continue
+
+                template_path = os.path.join(tmpdir, str(idx))
+                if idx % 2:
+                    os.mkdir(template_path)
+                else:
+                    os.close(os.open(template_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+
+                self.setacl_nfs4_internal(template_path, acl, False, ValidationErrors())
+                templates.append({ACLXattr.ZFS_NATIVE: os.getxattr(template_path, ACLXattr.ZFS_NATIVE)})
+
+        return InheritedAcl(ACL_XATTRS_BY_TYPE[FS_ACL_Type.NFS4], *templates)
+
+    @private
+    def inherited_acl_posix1e(self, path):
+        """
+        POSIX1e ACLs that files and directories created below `path` would receive, i.e. the default ACL of `path`
+        as access ACL (and default ACL for directories).
+        """
+        xattrs = ACL_XATTRS_BY_TYPE[FS_ACL_Type.POSIX1E]
+        try:
+            default_acl = os.getxattr(path, ACLXattr.POSIX_DEFAULT)
+        except OSError as e:
+            if e.errno != errno.ENODATA:
+                raise
+
+            return InheritedAcl.strip(xattrs)
+
+        file_acl = {ACLXattr.POSIX_ACCESS: default_acl}
+        dir_acl = {ACLXattr.POSIX_ACCESS: default_acl, ACLXattr.POSIX_DEFAULT: default_acl}
+        return InheritedAcl(xattrs, file_acl, dir_acl, file_acl, dir_acl)
+
     @private
     def setacl_nfs4_internal(self, path, acl, do_canon, verrors):
         payload = {
@@ -535,7 +641,6 @@ class FilesystemService(Service):
         recursive = data['options'].get('recursive', False)
         do_strip = data['options'].get('stripacl', False)
         do_canon = data['options'].get('canonicalize', False)
-        action = AclToolAction.CLONE
 
         verrors = ValidationErrors()
 
@@ -545,7 +650,6 @@ class FilesystemService(Service):
         verrors.check()
 
         if do_strip:
-            action = AclToolAction.STRIP
             strip_acl_path(data['path'])
 
         else:
@@ -560,14 +664,22 @@ class FilesystemService(Service):
 
             self.setacl_nfs4_internal(data['path'], data['dacl'], do_canon, verrors)
 
+        os.chown(data['path'], data['uid'], data['gid'])
+
         if not recursive:
-            os.chown(data['path'], data['uid'], data['gid'])
             job.set_progress(100, 'Finished setting NFSv4 ACL.')
             return
 
-        acltool(data['path'], action, data['uid'], data['gid'], data['options'])
+        job.set_progress(10, f'Recursively setting NFSv4 ACL on {data["path"]}.')
+        if do_strip:
+            inherited_acl = InheritedAcl.strip(ACL_XATTRS_BY_TYPE[FS_ACL_Type.NFS4])
+        else:
+            inherited_acl = self.inherited_acl_nfs4(data['path'])
 
-        job.set_progress(100, 'Finished setting NFSv4 ACL.')
+        if self._recursive_perm_change(
+            job, data['path'], data['options'], data['uid'], data['gid'], acl=inherited_acl,
+        ):
+            job.set_progress(100, 'Finished setting NFSv4 ACL.')
 
     @private
     def setacl_posix1e(self, job, current_acl, data):
@@ -577,7 +689,6 @@ class FilesystemService(Service):
         do_strip = options.get('stripacl', False)
         dacl = data.get('dacl', [])
         verrors = ValidationErrors()
-        action = AclToolAction.STRIP if do_strip else AclToolAction.CLONE
 
         if do_strip and dacl:
             verrors.add(
@@ -620,15 +731,22 @@ class FilesystemService(Service):
                 raise CallError(f'Failed to set ACL [{aclstring}] on path [{data["path"]}]: '
                                 f'{setacl.stderr.decode()}')
 
+        os.chown(data['path'], data['uid'], data['gid'])
+
         if not recursive:
-            os.chown(data['path'], data['uid'], data['gid'])
             job.set_progress(100, 'Finished setting POSIX1e ACL.')
             return
 
-        options['posixacl'] = True
-        acltool(data['path'], action, data['uid'], data['gid'], options)
+        job.set_progress(50, f'Recursively setting POSIX1e ACL on {data["path"]}.')
+        if do_strip:
+            inherited_acl = InheritedAcl.strip(ACL_XATTRS_BY_TYPE[FS_ACL_Type.POSIX1E])
+        else:
+            inherited_acl = self.inherited_acl_posix1e(data['path'])
 
-        job.set_progress(100, 'Finished setting POSIX1e ACL.')
+        if self._recursive_perm_change(
+            job, data['path'], options, data['uid'], data['gid'], acl=inherited_acl, start_percent=50,
+        ):
+            job.set_progress(100, 'Finished setting POSIX1e ACL.')
 
     @api_method(
         FilesystemSetAclArgs,
@@ -637,7 +755,7 @@ class FilesystemService(Service):
         audit='Filesystem set ACL',
         audit_extended=lambda data: data['path']
     )
-    @job(lock="perm_change")
+    @job(lock="perm_change", abortable=True)
     def setacl(self, job, data):
         """
         Set ACL of a given path. Takes the following parameters:
@@ -717,6 +835,8 @@ class FilesystemService(Service):
         `who` a user or group name may be specified in lieu of numeric ID for USER or GROUP entries
 
         `perms` - object containing posix permissions.
+
+        Recursive operations report the count of processed files in job progress and may be aborted.
         """
         verrors = ValidationErrors()
         data['loc'] = self._common_perm_path_validate("filesystem.setacl", data, verrors)
@@ -12,6 +12,7 @@ HOSTS_FILE_EARMARKER = '# STATIC ENTRIES'
 
 class NetworkConfigurationModel(sa.Model):
     __tablename__ = 'network_globalconfiguration'
+    __datastore_cache__ = True
 
     id = sa.Column(sa.Integer(), primary_key=True)
     gc_hostname = sa.Column(sa.String(120), default='nas')
@@ -1,3 +1,4 @@
+import collections
 import os
 import pathlib
 
@@ -79,15 +80,15 @@ class PoolDatasetService(Service):
         filters, options = self.build_filters_and_options()
         datasets = self.middleware.call_sync('pool.dataset.query', filters, options)
         mnt_info = getmntinfo()
-        info = self.build_details(mnt_info)
+        info = self.build_details_index(self.build_details(mnt_info), mnt_info)
         for dataset in datasets:
-            self.collapse_datasets(dataset, info, mnt_info)
+            self.collapse_datasets(dataset, info)
 
         return datasets
 
     @private
-    def normalize_dataset(self, dataset, info, mnt_info):
-        atime, case, readonly = self.get_mntinfo(dataset, mnt_info)
+    def normalize_dataset(self, dataset, info):
+        atime, case, readonly = self.get_mntinfo(dataset, info['mntinfo'])
         dataset['locked'] = dataset['locked']
         dataset['atime'] = atime
         dataset['casesensitive'] = case
@@ -104,10 +105,10 @@ class PoolDatasetService(Service):
         dataset['rsync_tasks_count'] = self.get_rsync_tasks_count(dataset, info['rsync'])
 
     @private
-    def collapse_datasets(self, dataset, info, mnt_info):
-        self.normalize_dataset(dataset, info, mnt_info)
+    def collapse_datasets(self, dataset, info):
+        self.normalize_dataset(dataset, info)
         for child in dataset.get('children', []):
-            self.collapse_datasets(child, info, mnt_info)
+            self.collapse_datasets(child, info)
 
     @private
     def get_mount_info(self, path, mntinfo):
@@ -128,9 +129,12 @@ class PoolDatasetService(Service):
 
     @private
     def get_mntinfo(self, ds, mntinfo):
+        """
+        `mntinfo` maps mountpoints to mount information (see `build_details_index`).
+        """
         atime = case = True
         readonly = False
-        for devid, info in filter(lambda x: x[1]['mountpoint'] == ds['mountpoint'], mntinfo.items()):
+        if (info := mntinfo.get(ds['mountpoint'])) is not None:
             atime = not ('NOATIME' in info['mount_opts'])
             readonly = 'RO' in info['mount_opts']
             case = any((i for i in ('CASESENSITIVE', 'CASEMIXED') if i in info['super_opts']))
@@ -222,65 +226,88 @@ class PoolDatasetService(Service):
         return results
 
     @private
-    def get_nfs_shares(self, ds, nfsshares):
-        nfs_shares = []
-        for share in nfsshares:
-            if share['path'] == ds['mountpoint'] or share['mount_info'].get('mount_source') == ds['id']:
-                nfs_shares.append({'enabled': share['enabled'], 'path': share['path']})
+    def build_details_index(self, details, mntinfo):
+        """
+        Index the attachments retrieved by `build_details` by the keys datasets are matched on (mountpoint,
+        mount source dataset, zvol name) so that looking up the attachments of a dataset does not have to
+        scan every one of them.
+        """
+        index = {
+            'mntinfo': {info['mountpoint']: info for info in mntinfo.values()},
+            'repl': collections.Counter(
+                src_ds for task in details['repl'] if task['direction'] == 'PUSH' for src_ds in task['source_datasets']
+            ),
+            'snap': collections.Counter(task['dataset'] for task in details['snap']),
+        }
 
-        return nfs_shares
+        for key, path_key in (('nfs', 'path'), ('smb', 'path'), ('app', 'path'), ('virt_instance', 'source')):
+            index[key] = AttachmentIndex()
+            for entry in details[key]:
+                index[key].add(
+                    entry, ('path', entry[path_key]), ('source', entry.get('mount_info', {}).get('mount_source')),
+                    ('zvol', entry.get('zvol')),
+                )
+
+        index['iscsi'] = AttachmentIndex()
+        for share in details['iscsi']:
+            if share['extent']['type'] == 'DISK':
+                # we store extent information prefixed with `zvol/` (i.e. zvol/tank/zvol01).
+                index['iscsi'].add(share, ('zvol', zvol_path_to_name(f"/dev/{share['extent']['path']}")))
+            elif share['extent']['type'] == 'FILE':
+                index['iscsi'].add(share, ('source', share['mount_info'].get('mount_source')))
+
+        for key in ('cloud', 'rsync'):
+            # we only care about tasks that are configured to push
+            index[key] = collections.Counter(
+                pathlib.Path(task['path']) for task in details[key] if task['direction'] == 'PUSH'
+            )
+
+        return index
 
     @private
-    def get_smb_shares(self, ds, smbshares):
-        smb_shares = []
-        for share in smbshares:
-            if share['path'] == ds['mountpoint'] or share['mount_info'].get('mount_source') == ds['id']:
-                smb_shares.append({
-                    'enabled': share['enabled'],
-                    'path': share['path'],
-                    'share_name': share['name']
-                })
+    def get_nfs_shares(self, ds, nfsshares):
+        return [
+            {'enabled': share['enabled'], 'path': share['path']}
+            for share in nfsshares.get(('path', ds['mountpoint']), ('source', ds['id']))
+        ]
 
-        return smb_shares
+    @private
+    def get_smb_shares(self, ds, smbshares):
+        return [
+            {'enabled': share['enabled'], 'path': share['path'], 'share_name': share['name']}
+            for share in smbshares.get(('path', ds['mountpoint']), ('source', ds['id']))
+        ]
 
     @private
     def get_iscsi_shares(self, ds, iscsishares):
         iscsi_shares = []
-        for share in iscsishares:
-            if share['extent']['type'] == 'DISK' and ds['type'] == 'VOLUME':
-                if zvol_path_to_name(f"/dev/{share['extent']['path']}") == ds['id']:
-                    # we store extent information prefixed with `zvol/` (i.e. zvol/tank/zvol01).
-                    iscsi_shares.append({
-                        'enabled': share['extent']['enabled'],
-                        'type': 'DISK',
-                        'path': f'/dev/{share["extent"]["path"]}',
-                    })
-            elif share['extent']['type'] == 'FILE' and ds['type'] == 'FILESYSTEM':
-                if share['mount_info'].get('mount_source') == ds['id']:
-                    # this isn't common but possible, you can share a "file"
-                    # via iscsi which means it's not a dataset but a file inside
-                    # a dataset so we need to find the source dataset for the file
-                    iscsi_shares.append({
-                        'enabled': share['extent']['enabled'],
-                        'type': 'FILE',
-                        'path': share['extent']['path'],
-                    })
+        if ds['type'] == 'VOLUME':
+            for share in iscsishares.get(('zvol', ds['id'])):
+                iscsi_shares.append({
+                    'enabled': share['extent']['enabled'],
+                    'type': 'DISK',
+                    'path': f'/dev/{share["extent"]["path"]}',
+                })
+        elif ds['type'] == 'FILESYSTEM':
+            for share in iscsishares.get(('source', ds['id'])):
+                # this isn't common but possible, you can share a "file"
+                # via iscsi which means it's not a dataset but a file inside
+                # a dataset so we need to find the source dataset for the file
+                iscsi_shares.append({
+                    'enabled': share['extent']['enabled'],
+                    'type': 'FILE',
+                    'path': share['extent']['path'],
+                })
 
         return iscsi_shares
 
     @private
     def get_repl_tasks_count(self, ds, repltasks):
-        count = 0
-        for repl in filter(lambda x: x['direction'] == 'PUSH', repltasks):
-            # we only care about replication tasks that are configured to push
-            for src_ds in filter(lambda x: x == ds['id'], repl['source_datasets']):
-                count += 1
-
-        return count
+        return repltasks[ds['id']]
 
     @private
     def get_snapshot_tasks_count(self, ds, snaptasks):
-        return len([i for i in snaptasks if i['dataset'] == ds['id']])
+        return snaptasks[ds['id']]
 
     @private
     def get_cloudsync_tasks_count(self, ds, cldtasks):
@@ -291,33 +318,49 @@ class PoolDatasetService(Service):
         return self._get_push_tasks_count(ds, rsynctasks)
 
     def _get_push_tasks_count(self, ds, tasks):
-        count = 0
-        if ds['mountpoint']:
-            for i in filter(lambda x: x['direction'] == 'PUSH', tasks):
-                # we only care about cloud sync tasks that are configured to push
-                if pathlib.Path(ds['mountpoint']).is_relative_to(i['path']):
-                    count += 1
+        # task is counted if dataset mountpoint is its path or is located under its path
+        if not ds['mountpoint'] or not tasks:
+            return 0
 
-        return count
+        mountpoint = pathlib.Path(ds['mountpoint'])
+        return sum(tasks[path] for path in (mountpoint, *mountpoint.parents))
 
     @private
     def get_virt_instances(self, ds, _instances):
-        instances = []
-        for i in _instances:
-            if (
-                'zvol' in i and i['zvol'] == ds['id'] or
-                i['source'] == ds['mountpoint'] or
-                i.get('mount_info', {}).get('mount_source') == ds['id']
-            ):
-                instances.append({'name': i['instance'], 'path': i['source']})
-
-        return instances
+        return [
+            {'name': i['instance'], 'path': i['source']}
+            for i in _instances.get(('zvol', ds['id']), ('path', ds['mountpoint']), ('source', ds['id']))
+        ]
 
     @private
     def get_apps(self, ds, _apps):
-        apps = []
-        for app in _apps:
-            if app['path'] == ds['mountpoint'] or app['mount_info'].get('mount_source') == ds['id']:
-                apps.append({'name': app['name'], 'path': app['path']})
+        return [
+            {'name': app['name'], 'path': app['path']}
+            for app in _apps.get(('path', ds['mountpoint']), ('source', ds['id']))
+        ]
+
+
+class AttachmentIndex:
+    """
+    Attachments indexed by (<kind>, <value>) keys. Looking up several keys returns every attachment
+    matching any of them exactly once and in the order the attachments were added.
+    """
+
+    def __init__(self):
+        self.index = collections.defaultdict(dict)
+        self.count = 0
+
+    def add(self, attachment, *keys):
+        for key in keys:
+            if key[1] is not None:
+                self.index[key][self.count] = attachment
+
+        self.count += 1
+
+    def get(self, *keys):
+        matches = {}
+        for key in keys:
+            if key in self.index:
+                matches.update(self.index[key])
 
-        return apps
+        return [matches[position] for position in sorted(matches)]
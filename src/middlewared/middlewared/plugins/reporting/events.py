@@ -3,10 +3,12 @@ import time
 from middlewared.event import EventSource
 from middlewared.schema import Dict, Float, Int
 from middlewared.service import Service
-from middlewared.utils.disks import get_disk_names, get_disks_with_identifiers
+from middlewared.utils.disks import DISKS_TO_IGNORE
 from middlewared.validators import Range
 
-from .realtime_reporting import get_arc_stats, get_cpu_stats, get_disk_stats, get_interface_stats, get_memory_info
+from .realtime_reporting import (
+    DISK_STATS_SAMPLER, get_arc_stats, get_cpu_stats, get_disk_stats, get_interface_stats, get_memory_info,
+)
 
 
 class ReportingRealtimeService(Service):
@@ -15,8 +17,7 @@ class ReportingRealtimeService(Service):
         namespace = 'reporting.realtime'
         private = True
 
-    def stats(self, disk_mapping=None):
-        disk_mapping = disk_mapping or get_disks_with_identifiers()
+    def stats(self):
         # this gathers the most recent metric recorded via netdata (for all charts)
         retries = 2
         while retries > 0:
@@ -34,15 +35,11 @@ class ReportingRealtimeService(Service):
         if failed_to_connect := not bool(netdata_metrics):
             data = {'failed_to_connect': failed_to_connect}
         else:
-            disks = get_disk_names()
-            if len(disks) != len(disk_mapping):
-                disk_mapping = get_disks_with_identifiers()
-
             data = {
                 'zfs': get_arc_stats(netdata_metrics),  # ZFS ARC Size
                 'memory': get_memory_info(netdata_metrics),
                 'cpu': get_cpu_stats(netdata_metrics),
-                'disks': get_disk_stats(netdata_metrics, disks, disk_mapping),
+                'disks': get_disk_stats(DISK_STATS_SAMPLER.rates()),
                 'interfaces': get_interface_stats(
                     netdata_metrics, [
                         iface['name'] for iface in self.middleware.call_sync(
@@ -113,12 +110,22 @@ class RealtimeEventSource(EventSource):
 
     def run_sync(self):
         interval = self.arg['interval']
-        disk_mapping = get_disks_with_identifiers()
 
         while not self._cancel_sync.is_set():
-            self.send_event('ADDED', fields=self.middleware.call_sync('reporting.realtime.stats', disk_mapping))
+            self.send_event('ADDED', fields=self.middleware.call_sync('reporting.realtime.stats'))
             time.sleep(interval)
 
 
+async def udev_block_devices_hook(middleware, data):
+    if data.get('SUBSYSTEM') != 'block' or data.get('DEVTYPE') != 'disk' or data['SYS_NAME'].startswith(
+        DISKS_TO_IGNORE
+    ):
+        return
+
+    if data['ACTION'] in ('add', 'remove'):
+        DISK_STATS_SAMPLER.invalidate()
+
+
 def setup(middleware):
+    middleware.register_hook('udev.block', udev_block_devices_hook)
     middleware.register_event_source('reporting.realtime', RealtimeEventSource, roles=['REPORTING_READ'])
@@ -6,9 +6,12 @@ import asyncio
 import contextlib
 import json
 import logging
+import time
 
 from .exceptions import ApiException, ClientConnectError
-from .utils import NETDATA_URI, NETDATA_REQUEST_TIMEOUT
+from .utils import (
+    NETDATA_MAX_CONCURRENT_REQUESTS, NETDATA_URI, NETDATA_REQUEST_TIMEOUT,
+)
 
 
 logger = logging.getLogger('netdata_api')
@@ -16,6 +19,37 @@ logger = logging.getLogger('netdata_api')
 
 class ClientMixin:
 
+    # Connection pool shared by all netdata requests so that we keep re-using connections to netdata
+    # instead of establishing a new one for every request
+    _session: aiohttp.ClientSession | None = None
+    _semaphore: asyncio.Semaphore | None = None
+    # Most recent `allmetrics` response together with the time it was retrieved and the pending request (if any)
+    # so that concurrent realtime stats consumers share one request
+    _all_metrics: tuple[float, dict] | None = None
+    _all_metrics_request: asyncio.Future | None = None
+
+    @classmethod
+    def session(cls) -> aiohttp.ClientSession:
+        if cls._session is None or cls._session.closed:
+            cls._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=NETDATA_MAX_CONCURRENT_REQUESTS),
+            )
+            cls._semaphore = asyncio.Semaphore(NETDATA_MAX_CONCURRENT_REQUESTS)
+
+        return cls._session
+
+    @classmethod
+    async def close(cls):
+        if cls._session is not None:
+            await cls._session.close()
+            cls._session = None
+
+        cls._all_metrics = None
+
+    @classmethod
+    def decode(cls, body: bytes) -> dict:
+        return json.loads(body.decode(errors='ignore'))
+
     @classmethod
     @contextlib.asynccontextmanager
     async def request(
@@ -26,12 +60,11 @@ class ClientMixin:
         resource = resource.removeprefix('/')
         uri = f'{NETDATA_URI}/{version}/{resource}'
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
-                async with session.get(uri) as resp:
-                    if resp.status != 200:
-                        raise ApiException(f'Received {resp.status!r} response code from {uri!r}')
+            async with cls.session().get(uri, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                if resp.status != 200:
+                    raise ApiException(f'Received {resp.status!r} response code from {uri!r}')
 
-                    yield resp
+                yield resp
         except (asyncio.TimeoutError, aiohttp.ClientResponseError) as e:
             raise ApiException(f'Failed {resource!r} call: {e!r}')
         except (aiohttp.client_exceptions.ClientConnectorError, aiohttp.client_exceptions.ClientOSError) as e:
@@ -41,30 +74,45 @@ class ClientMixin:
     async def api_call(cls, resource: str, timeout: int = NETDATA_REQUEST_TIMEOUT, version: str = 'v1') -> dict:
         try:
             async with cls.request(resource, timeout, version) as resp:
-                output = ''
-                async for line in resp.content.iter_any():
-                    output += line.decode(errors='ignore')
-                return json.loads(output)
+                return cls.decode(await resp.read())
         except aiohttp.client_exceptions.ContentTypeError as e:
             raise ApiException(f'Malformed response received from {resource!r} endpoint: {e}')
 
+    @classmethod
+    async def cached_api_call(cls, resource: str, max_age: float) -> dict:
+        """
+        Same as `api_call` for `allmetrics`, but a response that is not older than `max_age` seconds is re-used and
+        concurrent callers wait for the same request.
+        """
+        if cls._all_metrics is not None and time.monotonic() - cls._all_metrics[0] < max_age:
+            return cls._all_metrics[1]
+
+        if cls._all_metrics_request is None:
+            cls._all_metrics_request = asyncio.ensure_future(cls.api_call(resource))
+            cls._all_metrics_request.add_done_callback(cls._all_metrics_retrieved)
+
+        return await asyncio.shield(cls._all_metrics_request)
+
+    @classmethod
+    def _all_metrics_retrieved(cls, future: asyncio.Future):
+        cls._all_metrics_request = None
+        if not future.cancelled() and future.exception() is None:
+            cls._all_metrics = (time.monotonic(), future.result())
+
     @classmethod
     async def fetch(cls, uri: str, session: aiohttp.ClientSession, identifier: typing.Optional[str]) -> dict:
-        output = ''
         response = {'error': None, 'data': None, 'uri': uri, 'identifier': identifier}
-        async with session.get(uri) as call_resp:
-            if call_resp.status != 200:
-                response['error'] = f'Received {call_resp.status!r} response code from {uri!r}'
-            else:
-                try:
-                    async for line in call_resp.content.iter_any():
-                        output += line.decode(errors='ignore')
-
-                    response['data'] = json.loads(output)
-                except aiohttp.client_exceptions.ContentTypeError as e:
-                    response['error'] = f'Malformed response received from {uri!r} endpoint: {e}'
-                except json.JSONDecodeError:
-                    response['error'] = f'Failed to decode response from {uri!r}'
+        async with cls._semaphore:
+            async with session.get(uri) as call_resp:
+                if call_resp.status != 200:
+                    response['error'] = f'Received {call_resp.status!r} response code from {uri!r}'
+                else:
+                    try:
+                        response['data'] = cls.decode(await call_resp.read())
+                    except aiohttp.client_exceptions.ContentTypeError as e:
+                        response['error'] = f'Malformed response received from {uri!r} endpoint: {e}'
+                    except json.JSONDecodeError:
+                        response['error'] = f'Failed to decode response from {uri!r}'
 
         return response
 
@@ -76,20 +124,22 @@ class ClientMixin:
         assert version in ('v1', 'v2'), f'Invalid API version {version!r}'
 
         uri = f'{NETDATA_URI}/{version}'
+        session = cls.session()
         tasks = []
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+            async with asyncio.timeout(timeout):
                 for identifier, resource in resources:
                     resource = resource.removeprefix('/')
                     tasks.append(cls.fetch(f'{uri}/{resource}', session, identifier))
 
-                yield await asyncio.gather(*tasks)
-
+                results = await asyncio.gather(*tasks)
         except (asyncio.TimeoutError, aiohttp.ClientResponseError) as e:
             raise ApiException(f'Failed {resources!r} call: {e!r}')
         except (aiohttp.client_exceptions.ClientConnectorError, aiohttp.client_exceptions.ClientOSError) as e:
             raise ClientConnectError(f'Failed to connect to {uri!r}: {e!r}')
 
+        yield results
+
     @classmethod
     async def api_calls(
         cls, resources: typing.List[typing.Tuple[str, str]], timeout: int = NETDATA_REQUEST_TIMEOUT, version: str = 'v1'
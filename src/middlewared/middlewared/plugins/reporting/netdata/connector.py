@@ -3,7 +3,7 @@ import typing
 
 from .client import ClientMixin
 from .exceptions import ApiException
-from .utils import get_query_parameters
+from .utils import get_query_parameters, NETDATA_ALL_METRICS_TTL
 
 
 class Netdata(ClientMixin):
@@ -15,7 +15,7 @@ class Netdata(ClientMixin):
 
     @classmethod
     async def get_all_metrics(cls):
-        return await cls.api_call('allmetrics?format=json', version='v1')
+        return await cls.cached_api_call('allmetrics?format=json', NETDATA_ALL_METRICS_TTL)
 
     @classmethod
     async def get_charts(cls):
@@ -5,6 +5,8 @@ NETDATA_PORT = 6999
 NETDATA_REQUEST_TIMEOUT = 30  # seconds
 NETDATA_URI = f'http://127.0.0.1:{NETDATA_PORT}/api'
 NETDATA_UPDATE_EVERY = 2  # seconds
+NETDATA_ALL_METRICS_TTL = 1  # seconds
+NETDATA_MAX_CONCURRENT_REQUESTS = 8
 
 
 def get_query_parameters(query_params: dict | None, prefix: str = '&') -> str:
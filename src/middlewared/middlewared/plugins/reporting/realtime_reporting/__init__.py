@@ -1,5 +1,5 @@
 from .arcstat import get_arc_stats  # noqa
 from .cpu import get_cpu_stats  # noqa
 from .ifstat import get_interface_stats  # noqa
-from .iostat import get_disk_stats  # noqa
+from .iostat import DISK_STATS_SAMPLER, get_disk_stats  # noqa
 from .memory import get_memory_info  # noqa
@@ -1,7 +1,12 @@
 import collections
+import contextlib
+import os
 import typing
 
 
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+
 def get_cgroup_stats(netdata_metrics: dict, cgroups: typing.List[str]) -> dict[str, dict]:
     data = collections.defaultdict(dict)
     cgroup_keys = list(filter(lambda x: x.startswith('cgroup_'), netdata_metrics.keys()))
@@ -18,3 +23,51 @@ def get_cgroup_stats(netdata_metrics: dict, cgroups: typing.List[str]) -> dict[s
                 context[f'{name}_{dimension}_{unit}'] = value['value']
 
     return data
+
+
+def get_pid_cgroup_path(pid: int) -> str | None:
+    """
+    Path of the cgroup v2 directory of process `pid` or None if the process does not exist (anymore).
+    """
+    with contextlib.suppress(FileNotFoundError, ProcessLookupError):
+        with open(f'/proc/{pid}/cgroup') as f:
+            for line in f:
+                hierarchy, _, path = line.rstrip('\n').split(':', 2)
+                if hierarchy == '0':
+                    return os.path.join(CGROUP_ROOT, path.lstrip('/'))
+
+    return None
+
+
+def read_cgroup_usage(cgroup_path: str) -> dict | None:
+    """
+    Read cumulative CPU time (in nanoseconds), current memory usage and I/O bytes of a cgroup v2 directly from its
+    interface files. These are the same counters that docker reports in `cpu_stats.cpu_usage.total_usage`,
+    `memory_stats.usage` and `blkio_stats.io_service_bytes_recursive`.
+
+    Returns None if the cgroup does not exist (anymore).
+    """
+    usage = {'cpu_usage': 0, 'memory': 0, 'blkio': {'read': 0, 'write': 0}}
+    try:
+        with open(os.path.join(cgroup_path, 'cpu.stat')) as f:
+            for line in f:
+                key, value = line.split()
+                if key == 'usage_usec':
+                    usage['cpu_usage'] = int(value) * 1000
+                    break
+
+        with open(os.path.join(cgroup_path, 'memory.current')) as f:
+            usage['memory'] = int(f.read())
+
+        with open(os.path.join(cgroup_path, 'io.stat')) as f:
+            for line in f:
+                for field in line.split()[1:]:
+                    key, value = field.split('=', 1)
+                    if key == 'rbytes':
+                        usage['blkio']['read'] += int(value)
+                    elif key == 'wbytes':
+                        usage['blkio']['write'] += int(value)
+    except FileNotFoundError:
+        return None
+
+    return usage
@@ -1,30 +1,19 @@
-from .utils import normalize_value, safely_retrieve_dimension
+from middlewared.utils.disk_stats import DiskStatsSampler
 
 
-def get_disk_stats(netdata_metrics: dict, disks: list[str], disk_mapping: dict[str, str]) -> dict:
-    total_disks = len(disks)
+# Shared by `reporting.realtime` consumers, disk topology is invalidated on udev block device add/remove events
+DISK_STATS_SAMPLER = DiskStatsSampler()
+
+
+def get_disk_stats(disk_rates: dict[str, dict]) -> dict:
+    total_disks = len(disk_rates)
     read_ops = read_bytes = write_ops = write_bytes = busy = 0
-    for disk in disks:
-        mapped_key = disk_mapping.get(disk)
-        read_ops += safely_retrieve_dimension(
-            netdata_metrics, f'truenas_disk_stats.ops.{mapped_key}', f'{mapped_key}.read_ops', 0
-        )
-        read_bytes += normalize_value(
-            safely_retrieve_dimension(
-                netdata_metrics, f'truenas_disk_stats.io.{mapped_key}', f'{mapped_key}.reads', 0
-            ), multiplier=1024,
-        )
-        write_ops += normalize_value(safely_retrieve_dimension(
-            netdata_metrics, f'truenas_disk_stats.ops.{mapped_key}', f'{mapped_key}.write_ops', 0
-        ))
-        write_bytes += normalize_value(
-            safely_retrieve_dimension(
-                netdata_metrics, f'truenas_disk_stats.io.{mapped_key}', f'{mapped_key}.writes', 0
-            ), multiplier=1024,
-        )
-        busy += safely_retrieve_dimension(
-            netdata_metrics, f'truenas_disk_stats.busy.{mapped_key}', f'{mapped_key}.busy', 0
-        )
+    for rates in disk_rates.values():
+        read_ops += rates['read_ops']
+        read_bytes += rates['read_bytes']
+        write_ops += rates['write_ops']
+        write_bytes += rates['write_bytes']
+        busy += rates['busy']
 
     return {
         'read_ops': read_ops,
@@ -46,6 +46,9 @@ class NetdataService(Service):
     async def get_charts(self):
         return await Netdata.get_charts()
 
+    async def terminate(self):
+        await Netdata.close()
+
     async def active_total_metrics(self):
         number = 0
         for chart_details in (await Netdata.get_charts()).values():
@@ -3,7 +3,6 @@ from datetime import datetime, timedelta, timezone
 import functools
 import re
 import time
-import json
 from typing import Any
 
 from humanize import ordinal
@@ -31,10 +30,10 @@ async def annotate_disk_smart_tests(middleware, tests_filter, disk):
     if disk["disk"] is None:
         return
 
-    output = await middleware.call("disk.smartctl", disk["disk"], ["-a", "--json=c"], {"silent": True})
-    if output is None:
+    # Fresh enough for `smart.test.progress` event source that polls this at most every ten seconds
+    data = await middleware.call("disk.smart_snapshot", disk["disk"], {"max_age": 5})
+    if data is None:
         return
-    data = json.loads(output)
 
     tests = parse_smart_selftest_results(data) or []
     current_test = parse_current_smart_selftest(data)
@@ -566,6 +565,7 @@ class SMARTTestService(CRUDService):
         except CallError as e:
             output['error'] = e.errmsg
         else:
+            await self.middleware.call('disk.reset_smart_snapshots', disk['disk'])
             expected_result_time = None
             time_details = re.findall(RE_TIME, result)
             if time_details:
@@ -778,6 +778,7 @@ class SMARTTestService(CRUDService):
         Abort non-captive S.M.A.R.T. tests for disk.
         """
         await self.middleware.call("disk.smartctl", disk, ["-X"], {"silent": True})
+        await self.middleware.call("disk.reset_smart_snapshots", disk)
 
 
 class SmartModel(sa.Model):
@@ -66,6 +66,7 @@ from middlewared.utils.tdb import TDBError
 
 class SMBModel(sa.Model):
     __tablename__ = 'services_cifs'
+    __datastore_cache__ = True
 
     id = sa.Column(sa.Integer(), primary_key=True)
     cifs_srv_netbiosname = sa.Column(sa.String(120))
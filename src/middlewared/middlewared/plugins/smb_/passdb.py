@@ -1,13 +1,15 @@
 import os
 
+from dataclasses import asdict
+
 from middlewared.api.current import UserEntry
 from middlewared.service import filterable_api_method, Service, job, private
 from middlewared.utils.sid import get_domain_rid
 from .util_account_policy import sync_account_policy
 from .util_passdb import (
     delete_passdb_entry,
-    insert_passdb_entries,
     query_passdb_entries,
+    sync_passdb_entries,
     update_passdb_entry,
     user_entry_to_passdb_entry,
     PassdbMustReinit,
@@ -61,6 +63,9 @@ class SMBService(Service):
         Params:
             force - force resync by deleting the existing passdb.tdb file
 
+        Returns:
+            counts of `unchanged`, `updated` (or inserted) and `removed` passdb entries
+
         Raises:
             PassdbMustReinit - the synchronize job must be rerun with force command
             RuntimeError - TDB library error
@@ -73,33 +78,34 @@ class SMBService(Service):
                 pass
 
         pdb_entries = {entry['user_rid']: entry for entry in query_passdb_entries([], {})}
-        to_update = []
+        to_sync = []
         broken_entries = []
+        keep_rids = []
 
         for entry in self.middleware.call_sync('user.query', [("smb", "=", True), ('local', '=', True)]):
-            existing_entry = pdb_entries.pop(get_domain_rid(entry['sid']), None)
+            rid = get_domain_rid(entry['sid'])
+            existing_entry = pdb_entries.pop(rid, None)
             try:
-                to_update.append(user_entry_to_passdb_entry(server_name, entry, existing_entry))
+                to_sync.append(user_entry_to_passdb_entry(server_name, entry, existing_entry))
             except ValueError:
                 # This will occur if config was restored without a secret seed
                 broken_entries.append(entry['username'])
-                continue
-
-            if existing_entry and existing_entry['username'] != entry['username']:
-                # username changed. Since it's part of key for one of tdb entries we have to nuke it.
-                delete_passdb_entry(existing_entry['username'], existing_entry['user_rid'])
-
-        # inserting over existing entries replaces them
-        # this is performed with a transaction lock in place and so
-        # we don't have to worry about rollback in case of failure
-        insert_passdb_entries(to_update)
+                # Leave whatever passdb has for this user alone
+                keep_rids.append(rid)
 
         for entry in pdb_entries.values():
             # we popped off keys as we matched them to existing DB users.
             # any remaining shouldn't be in the passdb file
-
             self.logger.debug('%s: removing user from SMB user database', entry['username'])
-            delete_passdb_entry(entry['username'], entry['user_rid'])
+
+        # Only entries that differ from passdb contents are written (renamed users have
+        # their old entries removed) and all of it happens in a single transaction so
+        # we don't have to worry about rollback in case of failure
+        result = sync_passdb_entries(to_sync, keep_rids)
+        self.logger.debug(
+            'passdb synchronized: %d entries unchanged, %d updated, %d removed',
+            result.unchanged, result.updated, result.removed,
+        )
 
         if broken_entries:
             self.middleware.call_sync("alert.oneshot_create", "SMBUserMissingHash",
@@ -107,3 +113,5 @@ class SMBService(Service):
             )
         else:
             self.middleware.call_sync("alert.oneshot_delete", "SMBUserMissingHash")
+
+        return asdict(result)
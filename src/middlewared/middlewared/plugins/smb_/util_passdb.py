@@ -384,6 +384,84 @@ def insert_passdb_entries(entries: list[PDBEntry]) -> None:
         hdl.batch_op(batch_ops)
 
 
+@dataclass(frozen=True)
+class PassdbSyncResult:
+    unchanged: int
+    updated: int
+    removed: int
+
+
+def sync_passdb_entries(entries: list[PDBEntry], keep_rids: Iterable[int] = ()) -> PassdbSyncResult:
+    """ Make passdb.tdb contain exactly the specified entries
+
+    Packed entries are compared with existing TDB contents and only entries that
+    differ are written. Entries that are not in `entries` (and whose RID is not in
+    `keep_rids`) are removed. All changes are made in a single transaction, which
+    means that in case of failure they are rolled back.
+
+    Params:
+        entries - list of PDBEntry objects that passdb should contain
+        keep_rids - RIDs of existing entries that should be left as-is
+
+    Returns:
+        PassdbSyncResult with counts of unchanged, updated (or inserted) and removed entries
+
+    Raises:
+        TypeError - list item isn't PDBEntry object
+        RuntimeError - TDB library error
+    """
+    if not os.path.exists(PASSDB_PATH):
+        _add_version_info()
+
+    with get_tdb_handle(PASSDB_PATH, PASSDB_TDB_OPTIONS) as hdl:
+        existing = {
+            entry['key']: entry['value']
+            for entry in hdl.entries()
+            if entry['key'].startswith((USER_PREFIX, RID_PREFIX))
+        }
+        wanted = {}
+        for rid in keep_rids:
+            rid_key = f'{RID_PREFIX}{rid:08x}'
+            if (username := existing.get(rid_key)) is not None:
+                wanted[rid_key] = username
+                user_key = f'{USER_PREFIX}{b64decode(username)[:-1].decode()}'
+                if user_key in existing:
+                    wanted[user_key] = existing[user_key]
+
+        batch_ops = []
+        unchanged = updated = 0
+        for entry in entries:
+            if not isinstance(entry, PDBEntry):
+                raise TypeError(f'{type(entry)}: not a PDBEntry')
+
+            entry_ops = []
+            for key, value in (
+                (f'{USER_PREFIX}{entry.username.lower()}', b64encode(_pack_pdb_entry(entry)).decode()),
+                (f'{RID_PREFIX}{entry.user_rid:08x}', b64encode(entry.username.lower().encode() + b'\x00').decode()),
+            ):
+                wanted[key] = value
+                if existing.get(key) != value:
+                    entry_ops.append(TDBBatchOperation(action=TDBBatchAction.SET, key=key, value=value))
+
+            if entry_ops:
+                batch_ops.extend(entry_ops)
+                updated += 1
+            else:
+                unchanged += 1
+
+        removed = 0
+        for key in existing.keys() - wanted.keys():
+            # Stale entries and USER entries left behind by renamed users
+            batch_ops.append(TDBBatchOperation(action=TDBBatchAction.DEL, key=key))
+            if key.startswith(RID_PREFIX):
+                removed += 1
+
+        if batch_ops:
+            hdl.batch_op(batch_ops)
+
+    return PassdbSyncResult(unchanged=unchanged, updated=updated, removed=removed)
+
+
 def delete_passdb_entry(username: str, rid: int) -> None:
     """ Delete a passdb entry under a transaction lock """
     if not os.path.exists(PASSDB_PATH):
@@ -13,6 +13,7 @@ from .utils import HTTPS_PROTOCOLS
 
 class SystemGeneralModel(sa.Model):
     __tablename__ = 'system_settings'
+    __datastore_cache__ = True
 
     id = sa.Column(sa.Integer(), primary_key=True)
     stg_guiaddress = sa.Column(sa.JSON(list), default=['0.0.0.0'])
@@ -4,7 +4,6 @@ import datetime
 import logging
 
 from middlewared.service import CallError, Service
-from middlewared.utils.disks import get_disks_with_identifiers
 from middlewared.utils.version import parse_version_string
 
 from .mixin import TNCAPIMixin
@@ -39,10 +38,9 @@ class TNCHeartbeatService(Service, TNCAPIMixin):
             system_id=creds['system_id'],
             version=parse_version_string(await self.middleware.call('system.version_short')),
         )
-        disk_mapping = await self.middleware.run_in_thread(get_disks_with_identifiers)
         while tnc_config['status'] in CONFIGURED_TNC_STATES:
             sleep_error = False
-            resp = await self.call(heartbeat_url, 'post', await self.payload(disk_mapping), get_response=False)
+            resp = await self.call(heartbeat_url, 'post', await self.payload(), get_response=False)
             if resp['error'] is not None and resp['status_code'] is None:
                 logger.debug('TNC Heartbeat: Failed to connect to heart beat service (%s)', resp['error'])
                 sleep_error = True
@@ -112,10 +110,10 @@ class TNCHeartbeatService(Service, TNCAPIMixin):
 
             tnc_config = await self.middleware.call('tn_connect.config_internal')
 
-    async def payload(self, disk_mapping=None):
+    async def payload(self):
         return {
             'alerts': await self.middleware.call('alert.list'),
-            'stats': await self.middleware.call('reporting.realtime.stats', disk_mapping),
+            'stats': await self.middleware.call('reporting.realtime.stats'),
         }
 
 
@@ -3,6 +3,7 @@ from contextlib import asynccontextmanager
 from ctypes import c_bool
 from datetime import time as _time, timedelta
 import errno
+import json
 import logging
 import multiprocessing
 import os
@@ -44,6 +45,9 @@ from zettarepl.utils.logging import (
 from zettarepl.zettarepl import create_zettarepl
 
 from middlewared.logger import setup_logging
+from middlewared.plugins.zettarepl_.definition_changes import (
+    apply_definition_tasks_changes, definition_tasks_changes, definition_tasks_subset,
+)
 from middlewared.service.service import Service
 from middlewared.service_exception import CallError
 from middlewared.utils.cgroups import move_to_root_cgroups
@@ -236,8 +240,9 @@ class ZettareplProcess:
                     self.zettarepl.max_parallel_replication_tasks = args["max_parallel_replication_tasks"]
                 if "timezone" in args:
                     self.zettarepl.scheduler.tz_clock.timezone = pytz.timezone(args["timezone"])
-            if command == "tasks":
-                definition = Definition.from_data(args, raise_on_error=False)
+            if command == "tasks_changes":
+                self.definition = apply_definition_tasks_changes(self.definition, args)
+                definition = Definition.from_data(self.definition, raise_on_error=False)
                 self.observer_queue.put(DefinitionErrors(definition.errors))
                 self.zettarepl.set_tasks(definition.tasks)
             if command == "run_task":
@@ -269,6 +274,10 @@ class ZettareplService(Service):
         self.queue = None
         self.process = None
         self.zettarepl = None
+        # Definition the running zettarepl process has
+        self.definition = None
+        # Per-task definitions (or hold reasons) along with the data they were built from
+        self.task_definitions_cache = {}
 
     def is_running(self):
         return self.process is not None and self.process.is_alive()
@@ -301,6 +310,7 @@ class ZettareplService(Service):
                 )
                 self.process = multiprocessing.Process(name="zettarepl", target=zettarepl_process)
                 self.process.start()
+                self.definition = definition
                 start_daemon_thread(target=self._join, args=(self.process, startup_error))
 
                 if self.observer_queue_reader is None:
@@ -327,6 +337,7 @@ class ZettareplService(Service):
                     os.kill(self.process.pid, signal.SIGKILL)
 
                 self.process = None
+                self.definition = None
 
     def _join(self, process, startup_error):
         process.join()
@@ -375,8 +386,16 @@ class ZettareplService(Service):
         if self._is_empty_definition(definition):
             self.middleware.call_sync("zettarepl.stop")
         else:
-            self.middleware.call_sync("zettarepl.start")
-            self.queue.put(("tasks", definition))
+            with self.lock:
+                if running := self.is_running():
+                    # Only send tasks that were added, changed or removed
+                    if changes := definition_tasks_changes(self.definition, definition):
+                        self.queue.put(("tasks_changes", changes))
+
+                    self.definition = definition
+
+            if not running:
+                self.middleware.call_sync("zettarepl.start")
 
         self.middleware.call_sync("zettarepl.notify_definition", definition, hold_tasks)
 
@@ -609,6 +628,10 @@ class ZettareplService(Service):
         pools = {pool["name"]: pool for pool in await self.middleware.call("pool.query")}
 
         hold_tasks = {}
+        # Tasks definitions of which were not cached (and thus need to be validated)
+        built_periodic_snapshot_tasks = set()
+        built_replication_tasks = set()
+        task_definitions_cache = {}
 
         periodic_snapshot_tasks = {}
         for periodic_snapshot_task in await self.middleware.call("pool.snapshottask.query", [["enabled", "=", True]]):
@@ -617,22 +640,48 @@ class ZettareplService(Service):
                 hold_tasks[f"periodic_snapshot_task_{periodic_snapshot_task['id']}"] = hold_task_reason
                 continue
 
-            periodic_snapshot_tasks[f"task_{periodic_snapshot_task['id']}"] = self.periodic_snapshot_task_definition(
-                periodic_snapshot_task,
-            )
+            task_id = f"task_{periodic_snapshot_task['id']}"
+            cache_id = f"periodic_snapshot_{task_id}"
+            cache_key = json.dumps(periodic_snapshot_task, sort_keys=True, default=str)
+            if (cached := self.task_definitions_cache.get(cache_id)) and cached[0] == cache_key:
+                task_definitions_cache[cache_id] = cached
+            else:
+                task_definitions_cache[cache_id] = (
+                    cache_key, self.periodic_snapshot_task_definition(periodic_snapshot_task), None,
+                )
+                built_periodic_snapshot_tasks.add(task_id)
+
+            periodic_snapshot_tasks[task_id] = task_definitions_cache[cache_id][1]
 
         replication_tasks = {}
+        replication_context = {}
         for replication_task in await self.middleware.call("replication.query", [["enabled", "=", True]]):
-            try:
-                replication_tasks[f"task_{replication_task['id']}"] = await self._replication_task_definition(
-                    pools, replication_task
-                )
-            except HoldReplicationTaskException as e:
-                hold_tasks[f"replication_task_{replication_task['id']}"] = e.reason
+            task_id = f"task_{replication_task['id']}"
+            cache_id = f"replication_{task_id}"
+            cache_key = await self._replication_task_definition_cache_key(pools, replication_task, replication_context)
+            if (cached := self.task_definitions_cache.get(cache_id)) and cached[0] == cache_key:
+                task_definitions_cache[cache_id] = cached
+            else:
+                try:
+                    task_definitions_cache[cache_id] = (
+                        cache_key, await self._replication_task_definition(pools, replication_task), None,
+                    )
+                    built_replication_tasks.add(task_id)
+                except HoldReplicationTaskException as e:
+                    task_definitions_cache[cache_id] = (cache_key, None, e.reason)
+
+            _, definition, hold_task_reason = task_definitions_cache[cache_id]
+            if hold_task_reason:
+                hold_tasks[cache_id] = hold_task_reason
+            else:
+                replication_tasks[task_id] = definition
+
+        self.task_definitions_cache = task_definitions_cache
 
         for job_id, replication_task in self.onetime_replication_tasks.items():
             try:
                 replication_tasks[f"job_{job_id}"] = await self._replication_task_definition(pools, replication_task)
+                built_replication_tasks.add(f"job_{job_id}")
             except HoldReplicationTaskException as e:
                 hold_tasks[f"job_{job_id}"] = e.reason
 
@@ -644,8 +693,12 @@ class ZettareplService(Service):
             "replication-tasks": replication_tasks,
         }
 
-        # Test if does not cause exceptions
-        Definition.from_data(definition, raise_on_error=False)
+        if built_periodic_snapshot_tasks or built_replication_tasks:
+            # Test if new task definitions do not cause exceptions (cached ones have already been tested)
+            Definition.from_data(
+                definition_tasks_subset(definition, built_periodic_snapshot_tasks, built_replication_tasks),
+                raise_on_error=False,
+            )
 
         hold_tasks = {
             task_id: {
@@ -781,6 +834,45 @@ class ZettareplService(Service):
 
         return definition
 
+    async def _replication_task_definition_cache_key(self, pools, replication_task, context):
+        """
+        Serialized replication task along with everything else `_replication_task_definition` depends on.
+        Data shared by all replication tasks is only queried once per `context`.
+        """
+        key = {
+            "task": replication_task,
+            "pools": {
+                pool: pools[pool]["status"] if pool in pools else None
+                for pool in {
+                    dataset.split("/")[0]
+                    for dataset in replication_task["source_datasets"] + [replication_task["target_dataset"]]
+                }
+            },
+        }
+
+        if replication_task["transport"] != "LOCAL":
+            if not context:
+                context.update({
+                    "can_perform_activity": await self.middleware.call(
+                        "network.general.can_perform_activity", "replication"
+                    ),
+                    "credentials": {
+                        credential["id"]: credential
+                        for credential in await self.middleware.call("keychaincredential.query")
+                    },
+                    "fips": (await self.middleware.call("system.security.config"))["enable_fips"],
+                })
+
+            credentials = context["credentials"].get((replication_task["ssh_credentials"] or {}).get("id")) or {}
+            key.update({
+                "can_perform_activity": context["can_perform_activity"],
+                "credentials": credentials,
+                "key_pair": context["credentials"].get((credentials.get("attributes") or {}).get("private_key")),
+                "fips": context["fips"],
+            })
+
+        return json.dumps(key, sort_keys=True, default=str)
+
     def _hold_task_reason(self, pools, dataset):
         pool = dataset.split("/")[0]
 
@@ -0,0 +1,58 @@
+TASKS_SECTIONS = ("periodic-snapshot-tasks", "replication-tasks")
+
+
+def definition_tasks_changes(old, new):
+    """
+    Tasks that were added or changed (`updated`) and removed (`removed`) in `new` definition compared to `old`
+    for each tasks section of zettarepl definition. Sections without changes are omitted.
+    """
+    changes = {}
+    for section in TASKS_SECTIONS:
+        old_tasks = old.get(section, {})
+        new_tasks = new.get(section, {})
+        updated = {task_id: task for task_id, task in new_tasks.items() if old_tasks.get(task_id) != task}
+        removed = [task_id for task_id in old_tasks if task_id not in new_tasks]
+        if updated or removed:
+            changes[section] = {"updated": updated, "removed": removed}
+
+    return changes
+
+
+def apply_definition_tasks_changes(definition, changes):
+    """
+    Returns a copy of `definition` with `changes` (as returned by `definition_tasks_changes`) applied.
+    """
+    definition = dict(definition)
+    for section, section_changes in changes.items():
+        tasks = dict(definition.get(section, {}))
+        for task_id in section_changes["removed"]:
+            tasks.pop(task_id, None)
+
+        tasks.update(section_changes["updated"])
+        definition[section] = tasks
+
+    return definition
+
+
+def definition_tasks_subset(definition, periodic_snapshot_tasks_ids, replication_tasks_ids):
+    """
+    Copy of `definition` that only contains specified tasks and periodic snapshot tasks the specified replication
+    tasks depend on.
+    """
+    replication_tasks = {
+        task_id: task
+        for task_id, task in definition["replication-tasks"].items()
+        if task_id in replication_tasks_ids
+    }
+    periodic_snapshot_tasks_ids = set(periodic_snapshot_tasks_ids)
+    for task in replication_tasks.values():
+        periodic_snapshot_tasks_ids.update(task["periodic-snapshot-tasks"])
+
+    return definition | {
+        "periodic-snapshot-tasks": {
+            task_id: task
+            for task_id, task in definition["periodic-snapshot-tasks"].items()
+            if task_id in periodic_snapshot_tasks_ids
+        },
+        "replication-tasks": replication_tasks,
+    }
@@ -8,6 +8,7 @@ from middlewared.service_exception import InstanceNotFound
 from middlewared.utils import filter_list, filter_getattrs
 from middlewared.validators import Match, ReplicationSnapshotNamingSchema
 
+from .snapshot_utils import filter_snapshots, snapshot_query_pushdown
 from .utils import get_snapshot_count_cached
 from .validation_utils import validate_snapshot_name
 
@@ -103,19 +104,16 @@ class ZFSSnapshot(CRUDService):
 
         holds = extra.get('holds', False)
         properties = extra.get('properties')
-        with libzfs.ZFS() as zfs:
-            # Handle `id` filter to avoid getting all snapshots first
-            kwargs = dict(holds=holds, mounted=False, props=properties, min_txg=min_txg, max_txg=max_txg)
-            if filters and len(filters) == 1 and len(filters[0]) == 3 and filters[0][0] in (
-                    'id', 'name'
-            ) and filters[0][1] == '=':
-                kwargs['datasets'] = [filters[0][2]]
-
-            snapshots = zfs.snapshots_serialized(**kwargs)
-
-        # FIXME: awful performance with hundreds/thousands of snapshots
         select = options.pop('select', None)
-        result = filter_list(snapshots, filters, options)
+        # Narrow down libzfs iteration to datasets and txg range that can match the filters
+        if (pushdown := snapshot_query_pushdown(filters, min_txg, max_txg)) is None:
+            snapshots = []
+        else:
+            kwargs, filters = pushdown
+            with libzfs.ZFS() as zfs:
+                snapshots = zfs.snapshots_serialized(holds=holds, mounted=False, props=properties, **kwargs)
+
+        result = filter_snapshots(snapshots, filters, options)
 
         if options['extra'].get('retention'):
             if isinstance(result, list):
@@ -0,0 +1,108 @@
+import heapq
+
+from middlewared.service_exception import MatchNotFound
+from middlewared.utils import filter_list, filters
+
+compile_filters = filters().compile_filters
+
+CREATETXG_ORDER_BY = (['createtxg'], ['-createtxg'])
+TXG_FILTER_OPS = ('=', '>', '>=', '<', '<=')
+
+
+def parse_txg(value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+
+    return None
+
+
+def snapshot_query_pushdown(query_filters, min_txg=0, max_txg=0):
+    """
+    Translate snapshot `query-filters` into keyword arguments for `snapshots_serialized` so that libzfs only
+    iterates over snapshots which can possibly match.
+
+    Returns a tuple of (<kwargs>, <remaining filters>) or None if no snapshot can match. `id`, `name`, `dataset`
+    and `pool` filters only narrow down the datasets to iterate and are kept in remaining filters. `createtxg`
+    comparisons are converted into a (numeric) txg range and are fully handled by libzfs.
+    """
+    kwargs = {}
+    remaining = []
+    for f in query_filters:
+        if len(f) != 3:
+            remaining.append(f)
+            continue
+
+        attr, op, value = f
+        if attr == 'createtxg' and op in TXG_FILTER_OPS and (txg := parse_txg(value)) is not None:
+            if op in ('=', '>', '>='):
+                min_txg = max(min_txg, txg + 1 if op == '>' else txg)
+            if op in ('=', '<', '<='):
+                upper = txg - 1 if op == '<' else txg
+                if upper < 1:
+                    # `max_txg` of 0 means no upper bound for libzfs
+                    return None
+
+                max_txg = min(max_txg, upper) if max_txg else upper
+
+            continue
+
+        remaining.append(f)
+        if 'datasets' in kwargs:
+            continue
+
+        if attr in ('id', 'name'):
+            if op == '=' and isinstance(value, str):
+                kwargs['datasets'] = [value]
+            elif op == '^' and isinstance(value, str) and '@' in value:
+                kwargs.update(datasets=[value.split('@', 1)[0]], recursive=False)
+        elif attr in ('dataset', 'pool') and op in ('=', 'in'):
+            datasets = [value] if op == '=' else value
+            if not isinstance(datasets, list) or not all(isinstance(ds, str) for ds in datasets):
+                continue
+            if not datasets:
+                return None
+
+            kwargs.update(datasets=datasets, recursive=attr == 'pool')
+
+    if max_txg and min_txg > max_txg:
+        return None
+
+    kwargs.update(min_txg=min_txg, max_txg=max_txg)
+    return kwargs, remaining
+
+
+def filter_snapshots(snapshots, query_filters, options):
+    """
+    `filter_list` for serialized snapshots. Ordering by `createtxg` alone is numeric and, when only a page of
+    results is requested, matching snapshots are streamed through a bounded heap instead of being collected
+    and sorted.
+    """
+    if options.get('count') or options.get('order_by') not in CREATETXG_ORDER_BY:
+        return filter_list(snapshots, query_filters, options)
+
+    if query_filters:
+        snapshots = filter(compile_filters(query_filters), snapshots)
+
+    descending = options['order_by'][0].startswith('-')
+    offset = options.get('offset') or 0
+    limit = options.get('limit') or 0
+    if options.get('get'):
+        offset, limit = 0, 1
+
+    def key(snapshot):
+        return int(snapshot['createtxg'])
+
+    if limit:
+        rv = (heapq.nlargest if descending else heapq.nsmallest)(offset + limit, snapshots, key=key)[offset:]
+    else:
+        rv = sorted(snapshots, key=key, reverse=descending)[offset:]
+
+    if options.get('get'):
+        if not rv:
+            raise MatchNotFound()
+
+        return rv[0]
+
+    return rv
@@ -0,0 +1,94 @@
+# Benchmark of `datastore.fetchall_read` latency while a slow query and writes are running, with concurrent read
+# connections (WAL) and with all queries serialized on the write connection.
+#
+# python3 -m middlewared.pytest.benchmark.datastore_contention [--queries N] [--slow-rows N]
+
+import argparse
+import asyncio
+import functools
+import statistics
+import tempfile
+import time
+from unittest.mock import Mock, patch
+
+from sqlalchemy import text
+
+from middlewared.plugins.datastore import connection
+
+SLOW_QUERY = '''
+    WITH RECURSIVE counter(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM counter WHERE x < :rows)
+    SELECT count(*) FROM counter
+'''
+
+
+class BenchmarkMiddleware(Mock):
+    async def run_in_executor(self, pool, method, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(pool, functools.partial(method, *args, **kwargs))
+
+
+async def benchmark(ds, queries, slow_rows):
+    loop = asyncio.get_running_loop()
+    stop = False
+
+    async def slow_reader():
+        while not stop:
+            await ds.fetchall_read(text(SLOW_QUERY), {'rows': slow_rows})
+
+    async def writer():
+        i = 0
+        while not stop:
+            await loop.run_in_executor(
+                connection.thread_pool, ds.execute, text('UPDATE config SET value = :value'), {'value': i},
+            )
+            i += 1
+            await asyncio.sleep(0.005)
+
+    background = [asyncio.create_task(slow_reader()), asyncio.create_task(writer())]
+    await asyncio.sleep(0.05)
+
+    latencies = []
+    for _ in range(queries):
+        start = time.perf_counter()
+        await ds.fetchall_read('SELECT value FROM config')
+        latencies.append(time.perf_counter() - start)
+
+    stop = True
+    await asyncio.gather(*background)
+    return latencies
+
+
+def run(database, concurrent, queries, slow_rows):
+    with patch('middlewared.plugins.datastore.connection.FREENAS_DATABASE', database):
+        ds = connection.DatastoreService(BenchmarkMiddleware())
+        ds.setup()
+
+    ds.connection.execute('CREATE TABLE IF NOT EXISTS config (id INTEGER PRIMARY KEY, value INTEGER)')
+    ds.connection.execute('INSERT OR REPLACE INTO config VALUES (1, 0)')
+    if not concurrent:
+        ds.read_pool.close()
+        ds.read_pool = None
+
+    try:
+        return asyncio.run(benchmark(ds, queries, slow_rows))
+    finally:
+        ds.connection.close()
+        ds.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--slow-rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f'{"connections":<12} {"p50":>10} {"p95":>10} {"max":>10}')
+        for name, concurrent in (('single', False), ('concurrent', True)):
+            latencies = sorted(run(f'{tmp}/{name}.db', concurrent, args.queries, args.slow_rows))
+            p50 = statistics.median(latencies)
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            print(f'{name:<12} {p50 * 1000:>8.2f}ms {p95 * 1000:>8.2f}ms {latencies[-1] * 1000:>8.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
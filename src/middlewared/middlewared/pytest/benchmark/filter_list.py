@@ -0,0 +1,76 @@
+# Micro-benchmark comparing compiled query-filters predicates with per-row
+# interpretation of filters.
+#
+# python3 -m middlewared.pytest.benchmark.filter_list [--rows N] [--rounds N]
+
+import argparse
+import time
+
+from middlewared.utils import filters
+
+
+FILTERS = {
+    'equal': [['pool', '=', 'tank']],
+    'casefold': [['name', 'C^', 'TANK/DATASET_1']],
+    'in': [['id', 'in', list(range(0, 10000, 7))]],
+    'nested': [['properties.used.parsed', '>', 1024]],
+    'or': [['OR', [
+        [['pool', '=', 'tank'], ['properties.used.parsed', '<', 4096]],
+        ['name', '$', '@auto-1'],
+    ]]],
+}
+
+
+def generate_rows(count):
+    return [
+        {
+            'id': i,
+            'pool': 'tank' if i % 2 else 'dozer',
+            'name': f'tank/dataset_{i % 100}@auto-{i}',
+            'properties': {'used': {'parsed': i * 16}},
+        }
+        for i in range(count)
+    ]
+
+
+def interpreted(f, rows, flt):
+    value_maps = {}
+    f.validate_filters(flt, value_maps=value_maps)
+    getter = f.getter_fn(rows[0])
+    return [i for i in rows if all(f.eval_filter(i, x, getter, value_maps) for x in flt)]
+
+
+def compiled(f, rows, flt):
+    predicate = f.compile_filters(flt)
+    return [i for i in rows if predicate(i)]
+
+
+def measure(fn, rounds, *args):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    f = filters()
+    rows = generate_rows(args.rows)
+    print(f'{"filter":<10} {"interpreted":>12} {"compiled":>12} {"speedup":>8}')
+    for name, flt in FILTERS.items():
+        slow, expected = measure(interpreted, args.rounds, f, rows, flt)
+        fast, result = measure(compiled, args.rounds, f, rows, flt)
+        assert result == expected, name
+        print(f'{name:<10} {slow * 1000:>10.1f}ms {fast * 1000:>10.1f}ms {slow / fast:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
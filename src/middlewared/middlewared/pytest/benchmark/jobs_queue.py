@@ -0,0 +1,74 @@
+# Benchmark of the job scheduler: enqueue jobs contending for a number of job
+# locks and then drain the queue the way `JobsQueue.run` does.
+#
+# python3 -m middlewared.pytest.benchmark.jobs_queue [--jobs N] [--locks N]
+
+import argparse
+import asyncio
+import time
+from unittest.mock import Mock
+
+from middlewared.job import Job, JobsQueue
+
+
+def job_options(lock):
+    return {
+        'lock': lock,
+        'lock_queue_size': None,
+        'logs': False,
+        'process': False,
+        'pipes': [],
+        'check_pipes': False,
+        'transient': False,
+        'description': None,
+        'abortable': False,
+        'read_roles': [],
+    }
+
+
+async def benchmark(jobs, locks):
+    middleware = Mock()
+    queue = JobsQueue(middleware)
+    queue.deque.maxlen = jobs * 2
+    pending = [
+        Job(middleware, 'test.job', None, None, [], job_options(f'lock_{i % locks}' if locks else None), None, None,
+            None, None)
+        for i in range(jobs)
+    ]
+
+    start = time.perf_counter()
+    for job in pending:
+        queue.add(job)
+
+    enqueued = time.perf_counter()
+    running = []
+    for i in range(jobs):
+        if not queue.runnable:
+            # Everything that could be started is running, let jobs finish
+            for job in running:
+                job.set_state('RUNNING')
+                job.set_state('SUCCESS')
+                queue.finish(job)
+
+            running = []
+
+        running.append(await queue.next())
+
+    drained = time.perf_counter()
+    return enqueued - start, drained - enqueued
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', type=int, default=10000)
+    parser.add_argument('--locks', type=int, default=100)
+    args = parser.parse_args()
+
+    enqueue, drain = asyncio.run(benchmark(args.jobs, args.locks))
+    print(f'{args.jobs} jobs, {args.locks} locks')
+    print(f'enqueue: {enqueue * 1000:.1f}ms ({enqueue / args.jobs * 1e6:.1f}us/job)')
+    print(f'drain:   {drain * 1000:.1f}ms ({drain / args.jobs * 1e6:.1f}us/job)')
+
+
+if __name__ == '__main__':
+    main()
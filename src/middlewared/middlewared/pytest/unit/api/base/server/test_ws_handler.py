@@ -1,6 +1,8 @@
+from unittest.mock import Mock
+
 import pytest
 
-from middlewared.api.base.server.ws_handler.rpc import RpcWebSocketHandler
+from middlewared.api.base.server.ws_handler.rpc import RpcWebSocketApp, RpcWebSocketHandler
 
 
 @pytest.mark.parametrize(
@@ -97,3 +99,36 @@ async def test_validate_message(ws_msg, error_type):
             await RpcWebSocketHandler.validate_message(ws_msg)
     else:
         await RpcWebSocketHandler.validate_message(ws_msg)
+
+
+def test_event_message():
+    app = RpcWebSocketApp(Mock(), None, Mock())
+    assert app.event_message("pool.query", "CHANGED", {"id": 1, "fields": {"name": "tank"}, "cleared": True}) == {
+        "jsonrpc": "2.0",
+        "method": "collection_update",
+        "params": {
+            "msg": "changed",
+            "collection": "pool.query",
+            "id": 1,
+            "fields": {"name": "tank"},
+            "extra": {"cleared": True},
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_subscription_index():
+    middleware = Mock()
+    middleware.event_source_manager.short_name_arg.return_value = ("pool.query", None)
+    middleware.event_source_manager.event_sources = {}
+    app = RpcWebSocketApp(middleware, None, Mock())
+
+    await app.subscribe("1", "pool.query")
+    await app.subscribe("2", "pool.query")
+    middleware.subscribe_wsclient_event.assert_called_with(app, "pool.query")
+
+    await app.unsubscribe("1")
+    middleware.unsubscribe_wsclient_event.assert_not_called()
+
+    await app.unsubscribe("2")
+    middleware.unsubscribe_wsclient_event.assert_called_once_with(app, "pool.query")
@@ -0,0 +1,86 @@
+from unittest.mock import Mock, patch
+
+import pytest
+import yaml
+
+from middlewared.plugins.apps.compose_utils import compose_action
+from middlewared.plugins.apps.ix_apps.state import AppResourcesCache, YamlFileCache
+
+
+def resources(name):
+    return {'containers': [{'Name': name}], 'networks': [], 'volumes': []}
+
+
+def test_resources_only_dirty_projects_are_refreshed():
+    docker = {'ix-a': resources('a1'), 'ix-b': resources('b1')}
+
+    def list_resources_by_project(project_name=None):
+        return {k: v for k, v in docker.items() if project_name in (None, k)}
+
+    cache = AppResourcesCache()
+    with patch(
+        'middlewared.plugins.apps.ix_apps.state.list_resources_by_project', Mock(side_effect=list_resources_by_project)
+    ) as list_mock:
+        assert cache.get() == docker
+        assert cache.get('ix-a') == {'ix-a': resources('a1')}
+        assert list_mock.call_count == 1
+
+        docker['ix-a'] = resources('a2')
+        docker['ix-b'] = resources('b2')
+        cache.invalidate('ix-a')
+        cache.invalidate('ix-b')
+        assert cache.get('ix-a') == {'ix-a': resources('a2')}
+        assert list_mock.call_args.kwargs == {'project_name': 'ix-a'}
+
+        del docker['ix-a']
+        cache.invalidate('ix-a')
+        assert cache.get() == {'ix-b': resources('b2')}
+        assert list_mock.call_count == 4
+
+        # Nothing changed
+        cache.get()
+        assert list_mock.call_count == 4
+
+
+def test_resources_reconcile():
+    cache = AppResourcesCache()
+    with patch('middlewared.plugins.apps.ix_apps.state.list_resources_by_project', Mock(return_value={})) as list_mock:
+        cache.get()
+        with patch('middlewared.plugins.apps.ix_apps.state.RECONCILE_INTERVAL', -1):
+            cache.get()
+
+        cache.invalidate()
+        cache.get()
+
+    assert list_mock.call_args_list == [((),), ((),), ((),)]
+
+
+def test_yaml_file_cache(tmp_path):
+    path = tmp_path / 'metadata.yaml'
+    path.write_text(yaml.safe_dump({'app': {'version': '1.0.0'}}))
+    load = Mock(side_effect=lambda: yaml.safe_load(path.read_text()))
+    cache = YamlFileCache(lambda: str(path), load)
+
+    assert cache.get() == {'app': {'version': '1.0.0'}}
+    cache.get()['app']['version'] = 'modified'
+    assert cache.get() == {'app': {'version': '1.0.0'}}
+    assert load.call_count == 1
+
+    new_path = tmp_path / 'metadata.yaml.tmp'
+    new_path.write_text(yaml.safe_dump({'app': {'version': '2.0.0'}}))
+    new_path.rename(path)
+    assert cache.get() == {'app': {'version': '2.0.0'}}
+    assert load.call_count == 2
+
+
+@pytest.mark.parametrize('action,invalidated', [('up', True), ('down', True), ('pull', False)])
+def test_compose_action_invalidates_app_resources(action, invalidated):
+    cache = AppResourcesCache()
+    with (
+        patch('middlewared.plugins.apps.compose_utils.APP_RESOURCES', cache),
+        patch('middlewared.plugins.apps.compose_utils.get_rendered_templates_of_app', Mock(return_value=['a.yaml'])),
+        patch('middlewared.plugins.apps.compose_utils.run', Mock(return_value=Mock(returncode=0))),
+    ):
+        compose_action('app', '1.0.0', action)
+
+    assert cache.dirty == ({'ix-app'} if invalidated else set())
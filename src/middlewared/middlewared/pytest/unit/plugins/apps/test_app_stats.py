@@ -0,0 +1,66 @@
+import threading
+from unittest.mock import Mock, patch
+
+from middlewared.plugins.apps.ix_apps.docker.stats import get_container_stats
+from middlewared.plugins.apps.stats import AppStatsSampler
+
+USAGE = {'cpu_usage': 1000, 'memory': 2048, 'blkio': {'read': 1, 'write': 2}}
+
+
+def container(pid=100, network_mode='bridge'):
+    c = Mock(attrs={'State': {'Pid': pid}, 'HostConfig': {'NetworkMode': network_mode}})
+    c.stats.return_value = {'networks': {'eth0': {'rx_bytes': 10, 'tx_bytes': 20}}}
+    return c
+
+
+def test_container_stats_from_cgroup():
+    c = container()
+    with patch('middlewared.plugins.apps.ix_apps.docker.stats.get_pid_cgroup_path', return_value='/cgroup'):
+        with patch('middlewared.plugins.apps.ix_apps.docker.stats.read_cgroup_usage', return_value=USAGE):
+            assert get_container_stats(c) == USAGE | {'networks': {'eth0': {'rx_bytes': 10, 'tx_bytes': 20}}}
+            host = container(network_mode='host')
+            assert get_container_stats(host) == USAGE | {'networks': {}}
+            host.stats.assert_not_called()
+
+
+def test_container_stats_not_running():
+    assert get_container_stats(container(pid=0)) is None
+
+
+def test_container_stats_without_cgroup():
+    c = container()
+    c.stats.return_value = {
+        'cpu_stats': {'cpu_usage': {'total_usage': 1000}},
+        'memory_stats': {'usage': 2048},
+        'blkio_stats': {'io_service_bytes_recursive': [
+            {'op': 'read', 'value': 1}, {'op': 'write', 'value': 2}, {'op': 'total', 'value': 3},
+        ]},
+    }
+    with patch('middlewared.plugins.apps.ix_apps.docker.stats.get_pid_cgroup_path', return_value=None):
+        assert get_container_stats(c) == USAGE | {'networks': {}}
+
+
+def test_sampler_is_shared():
+    calls = []
+
+    def list_stats():
+        calls.append(threading.get_ident())
+        return {'ix-app': len(calls)}
+
+    with patch('middlewared.plugins.apps.stats.list_resources_stats_by_project', list_stats):
+        with patch('middlewared.plugins.apps.stats.normalize_projects_stats', lambda new, old, interval: [new, old]):
+            first = AppStatsSampler.subscribe(0.05)
+            second = AppStatsSampler.subscribe(0.05)
+            assert first is second
+
+            seq, stats = first.next(0, 5)
+            assert second.next(0, 5) == (seq, stats)
+            assert first.next(seq, 5)[0] == seq + 1
+
+            thread = first.thread
+            first.unsubscribe()
+            second.unsubscribe()
+            thread.join(5)
+
+    assert len(set(calls)) == 1
+    assert 0.05 not in AppStatsSampler.samplers
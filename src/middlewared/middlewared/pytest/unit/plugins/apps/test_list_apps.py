@@ -273,8 +273,8 @@ def common_impl(
 @unittest.mock.patch('os.scandir')
 @unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.upgrade_available_for_app')
 @unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.translate_resources_to_desired_workflow')
-@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.list_resources_by_project')
-@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.get_collective_metadata')
+@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.app_resources_by_project')
+@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.collective_metadata')
 def test_app_event_crashed(
     mock_get_collective_metadata, mock_list_resources_by_project,
     mock_translate_resources_to_desired_workflow, mock_upgrade_available_for_app,
@@ -383,8 +383,8 @@ def test_app_event_crashed(
 @unittest.mock.patch('os.scandir')
 @unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.upgrade_available_for_app')
 @unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.translate_resources_to_desired_workflow')
-@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.list_resources_by_project')
-@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.get_collective_metadata')
+@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.app_resources_by_project')
+@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.collective_metadata')
 def test_app_event_deploying(
     mock_get_collective_metadata, mock_list_resources_by_project,
     mock_translate_resources_to_desired_workflow, mock_upgrade_available_for_app,
@@ -424,8 +424,8 @@ def test_app_event_deploying(
 @unittest.mock.patch('os.scandir')
 @unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.upgrade_available_for_app')
 @unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.translate_resources_to_desired_workflow')
-@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.list_resources_by_project')
-@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.get_collective_metadata')
+@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.app_resources_by_project')
+@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.collective_metadata')
 def test_app_event_running(
     mock_get_collective_metadata, mock_list_resources_by_project,
     mock_translate_resources_to_desired_workflow, mock_upgrade_available_for_app,
@@ -488,8 +488,8 @@ def test_app_event_running(
 @unittest.mock.patch('os.scandir')
 @unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.upgrade_available_for_app')
 @unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.translate_resources_to_desired_workflow')
-@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.list_resources_by_project')
-@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.get_collective_metadata')
+@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.app_resources_by_project')
+@unittest.mock.patch('middlewared.plugins.apps.ix_apps.query.collective_metadata')
 def test_app_event_stopped(
     mock_get_collective_metadata, mock_list_resources_by_project,
     mock_translate_resources_to_desired_workflow, mock_upgrade_available_for_app,
@@ -0,0 +1,74 @@
+import csv
+import datetime
+import io
+import itertools
+
+import pytest
+import yaml
+
+from truenas_api_client import json as ejson
+
+from middlewared.plugins.audit.export import export_entries
+
+
+ENTRIES = [
+    {
+        'audit_id': f'00000000-0000-0000-0000-00000000000{i}',
+        'message_timestamp': 1700000000 + i,
+        'timestamp': datetime.datetime(2024, 1, 1, 0, 0, i),
+        'username': 'bob',
+        'service_data': {'vers': {'major': 0, 'minor': 1}} if i % 2 else None,
+        'event': 'AUTHENTICATION',
+        'event_data': {'credentials': {'type': 'LOGIN_PASSWORD'}, 'error': None},
+        'success': bool(i % 3),
+    }
+    for i in range(7)
+]
+
+
+def export(export_format, batches):
+    f = io.StringIO()
+    progress = []
+    written = export_entries(f, export_format, iter(batches), progress.append)
+    return f.getvalue(), written, progress
+
+
+@pytest.mark.parametrize('batches', [
+    [ENTRIES],
+    [ENTRIES[:3], ENTRIES[3:6], ENTRIES[6:]],
+    [ENTRIES[:1], [], ENTRIES[1:]],
+])
+def test_export_json(batches):
+    f = io.StringIO()
+    ejson.dump(ENTRIES, f, indent=4)
+
+    output, written, progress = export('JSON', batches)
+    assert output == f.getvalue()
+    assert written == len(ENTRIES)
+    assert progress[-1] == len(ENTRIES)
+
+
+@pytest.mark.parametrize('batches', [
+    [ENTRIES],
+    [ENTRIES[:3], ENTRIES[3:6], ENTRIES[6:]],
+])
+def test_export_yaml(batches):
+    output, written, progress = export('YAML', batches)
+    assert output == yaml.dump(ENTRIES)
+    assert progress == list(itertools.accumulate(len(batch) for batch in batches))
+
+
+def test_export_csv():
+    output, written, progress = export('CSV', [ENTRIES[:4], ENTRIES[4:]])
+    assert written == len(ENTRIES)
+    assert progress == [4, 7]
+
+    rows = list(csv.DictReader(io.StringIO(output)))
+    assert list(rows[0].keys()) == list(ENTRIES[0].keys())
+    assert [row['audit_id'] for row in rows] == [entry['audit_id'] for entry in ENTRIES]
+    assert rows[1]['service_data'] == ejson.dumps(ENTRIES[1]['service_data'])
+    assert rows[0]['service_data'] == ''
+    assert rows[0]['event_data'] == ejson.dumps(ENTRIES[0]['event_data'])
+    # Entries are not modified
+    assert ENTRIES[1]['service_data'] == {'vers': {'major': 0, 'minor': 1}}
+
@@ -0,0 +1,70 @@
+import pytest
+
+from middlewared.plugins.catalog.index import CatalogIndex
+from middlewared.utils import filter_list
+
+
+def app(name, title, version, categories=(), tags=()):
+    return {
+        'name': name,
+        'title': title,
+        'latest_version': version,
+        'latest_app_version': f'app-{version}',
+        'categories': list(categories),
+        'tags': list(tags),
+    }
+
+
+TRAINS = {
+    'stable': {
+        'plex': app('plex', 'Plex', '1.2.10', ['media'], ['streaming']),
+        'nextcloud': app('nextcloud', 'Nextcloud', '2.0.0', ['productivity'], ['files']),
+        'jellyfin': app('jellyfin', 'Jellyfin', '1.0.0', ['media'], ['Streaming']),
+    },
+    'community': {
+        'plex': app('plex', 'Plex Community', '1.3.0', ['media']),
+        'pihole': app('pihole', 'Pi-hole', '3.0.0', ['networking'], ['dns']),
+    },
+}
+
+
+@pytest.fixture(scope='module')
+def index():
+    return CatalogIndex('TRUENAS', TRAINS)
+
+
+def available(index):
+    return [{'train': train, **app_data} for train, app_data in index.apps]
+
+
+def test_version_mapping(index):
+    assert index.trains is TRAINS
+    assert index.version_mapping['stable']['plex']['version'] == '1.2.10'
+    assert index.version_mapping['stable']['plex']['app_version'] == 'app-1.2.10'
+    assert index.version_mapping['stable']['plex']['parsed_version'] > index.version_mapping['stable']['jellyfin'][
+        'parsed_version'
+    ]
+    assert index.categories == {'media', 'productivity', 'networking'}
+
+
+@pytest.mark.parametrize('filters', [
+    [['name', '=', 'plex']],
+    [['name', 'C=', 'PLEX'], ['train', '=', 'community']],
+    [['name', 'in', ['pihole', 'jellyfin']]],
+    [['categories', 'rin', 'media']],
+    [['tags', 'Crin', 'streaming']],
+    [['title', 'C^', 'p']],
+    [['title', '^', 'Plex'], ['categories', 'rin', 'media']],
+    [['name', '^', 'x']],
+    [['name', '=', 'missing']],
+])
+def test_lookup_matches_filter_list(index, filters):
+    positions = index.lookup(filters)
+    assert positions is not None
+    assert filter_list([available(index)[i] for i in positions], filters) == filter_list(available(index), filters)
+
+
+def test_lookup_not_indexed(index):
+    assert index.lookup([]) is None
+    assert index.lookup([['description', '=', 'x'], ['OR', [['name', '=', 'plex'], ['name', '=', 'pihole']]]]) is None
+    assert index.lookup([['name', '~', 'pl'], ['train', '=', 'community']]) == [3, 4]
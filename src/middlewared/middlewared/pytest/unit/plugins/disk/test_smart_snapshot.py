@@ -0,0 +1,66 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from middlewared.plugins.disk_.smartctl import DiskService
+from middlewared.pytest.unit.middleware import Middleware
+from middlewared.service_exception import CallError
+
+
+@pytest.fixture
+def disk_service():
+    calls = []
+
+    async def smartctl(disk, args):
+        calls.append((disk, args))
+        await asyncio.sleep(0.01)
+        if disk == "sdb":
+            raise CallError("Device is in STANDBY mode, exit(2)")
+
+        return json.dumps({"disk": disk, "run": len(calls)})
+
+    m = Middleware()
+    m["disk.smartctl"] = smartctl
+    m.create_task = asyncio.ensure_future
+
+    service = DiskService(m)
+    with patch.multiple(DiskService, smart_snapshots={}, smart_snapshots_skipped={}, smart_snapshots_inflight={}):
+        yield service, calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_smartctl_run(disk_service):
+    service, calls = disk_service
+    results = await asyncio.gather(*[service.smart_snapshot("sda", {}) for _ in range(5)])
+
+    assert results == [{"disk": "sda", "run": 1}] * 5
+    assert calls == [("sda", ["-a", "-n", "never", "--json=c"])]
+
+
+@pytest.mark.asyncio
+async def test_max_age(disk_service):
+    service, calls = disk_service
+    await service.smart_snapshot("sda", {})
+    assert (await service.smart_snapshot("sda", {"max_age": None}))["run"] == 1
+    assert (await service.smart_snapshot("sda", {"max_age": 0}))["run"] == 2
+
+
+@pytest.mark.asyncio
+async def test_reset(disk_service):
+    service, calls = disk_service
+    await service.smart_snapshot("sda", {})
+    await service.reset_smart_snapshots("sda")
+    assert (await service.smart_snapshot("sda", {}))["run"] == 2
+
+
+@pytest.mark.asyncio
+async def test_standby_disk_is_not_checked_again(disk_service):
+    service, calls = disk_service
+    assert await service.smart_snapshot("sdb", {"powermode": "STANDBY"}) is None
+    assert await service.smart_snapshot("sdb", {"powermode": "STANDBY"}) is None
+    assert calls == [("sdb", ["-a", "-n", "standby", "--json=c"])]
+
+    with pytest.raises(CallError):
+        await service.smart_snapshot("sdb", {"silent": False})
@@ -0,0 +1,57 @@
+from datetime import timedelta
+from unittest.mock import Mock
+
+from middlewared.plugins.disk_.sync import DiskService
+from middlewared.pytest.unit.middleware import Middleware
+from middlewared.utils.time_utils import utc_now
+
+
+def sys_disk(name, serial, model):
+    return {
+        "name": name, "serial": serial, "serial_lunid": None, "lunid": None, "parts": [], "dif": False,
+        "rotationrate": None, "type": "SSD", "size": 1024, "subsystem": "scsi", "number": 0, "model": model,
+        "bus": "SATA",
+    }
+
+
+def db_disk(identifier, name, model, expiretime=None):
+    return {
+        "disk_identifier": identifier, "disk_name": name, "disk_serial": identifier[8:], "disk_lunid": None,
+        "disk_rotationrate": None, "disk_type": "SSD", "disk_size": "1024", "disk_subsystem": "scsi",
+        "disk_number": 0, "disk_model": model, "disk_bus": "SATA", "disk_expiretime": expiretime,
+        "disk_kmip_uid": None,
+    }
+
+
+def test__sync_all():
+    m = Middleware()
+    m["failover.licensed"] = Mock(return_value=False)
+    m["device.get_disks"] = Mock(return_value={
+        "sda": sys_disk("sda", "A", "Model"),
+        "sdb": sys_disk("sdb", "B", "New model"),
+        "sdc": sys_disk("sdc", "C", "Model"),
+    })
+    db_disks = [
+        db_disk("{serial}A", "sda", "Model"),
+        db_disk("{serial}B", "sdb", "Old model"),
+        db_disk("{serial}X", "sdx", "Model"),
+        db_disk("{serial}Y", "sdy", "Model", utc_now() - timedelta(days=1)),
+    ]
+    # Disks are queried again after they were written to emit events
+    m["datastore.query"] = Mock(side_effect=[db_disks, db_disks + [db_disk("{serial}C", "sdc", "Model")]])
+    m["datastore.write_batch"] = Mock()
+    m["alert.oneshot_delete"] = Mock()
+    m["disk.restart_services_after_sync"] = Mock()
+
+    result = DiskService(m).sync_all(Mock(), {"zfs_guid": False})
+
+    assert result == {"added": 1, "changed": 1, "expired": 1, "removed": 1}
+
+    m["datastore.write_batch"].assert_called_once()
+    name, changes, options = m["datastore.write_batch"].call_args.args
+    assert [disk["disk_identifier"] for disk in changes["insert"]] == ["{serial}C"]
+    assert [(identifier, disk["disk_model"]) for identifier, disk in changes["update"]] == [
+        ("{serial}B", "New model"), ("{serial}X", "Model"),
+    ]
+    assert changes["update"][1][1]["disk_expiretime"] is not None
+    assert changes["delete"] == ["{serial}Y"]
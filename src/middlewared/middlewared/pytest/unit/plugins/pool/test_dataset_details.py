@@ -0,0 +1,83 @@
+from unittest.mock import Mock
+
+from middlewared.plugins.pool_.dataset_details import PoolDatasetService
+
+
+MNTINFO = {
+    1: {'mountpoint': '/mnt/tank', 'mount_source': 'tank', 'mount_opts': ['RW'], 'super_opts': ['CASESENSITIVE']},
+    2: {'mountpoint': '/mnt/tank/share', 'mount_source': 'tank/share', 'mount_opts': ['RO', 'NOATIME'],
+        'super_opts': ['CASEINSENSITIVE']},
+}
+DETAILS = {
+    'iscsi': [
+        {'extent': {'type': 'DISK', 'path': 'zvol/tank/zvol01', 'enabled': True}, 'target': {}, 'mount_info': {}},
+        {'extent': {'type': 'FILE', 'path': '/mnt/tank/share/lun', 'enabled': False}, 'target': {},
+         'mount_info': MNTINFO[2]},
+    ],
+    'nfs': [
+        {'path': '/mnt/tank/share/dir', 'enabled': True, 'mount_info': MNTINFO[2]},
+        {'path': '/mnt/tank/share', 'enabled': False, 'mount_info': MNTINFO[2]},
+        {'path': '/mnt/tank', 'enabled': True, 'mount_info': MNTINFO[1]},
+    ],
+    'smb': [{'path': '/mnt/tank/share', 'name': 'share', 'enabled': True, 'mount_info': MNTINFO[2]}],
+    'repl': [
+        {'direction': 'PUSH', 'source_datasets': ['tank', 'tank/share']},
+        {'direction': 'PUSH', 'source_datasets': ['tank/share']},
+        {'direction': 'PULL', 'source_datasets': ['tank/share']},
+    ],
+    'snap': [{'dataset': 'tank/share'}, {'dataset': 'tank'}, {'dataset': 'tank/share'}],
+    'cloud': [
+        {'path': '/mnt/tank', 'direction': 'PUSH'},
+        {'path': '/mnt/tank/share/', 'direction': 'PUSH'},
+        {'path': '/mnt/tank/sha', 'direction': 'PUSH'},
+        {'path': '/mnt/tank/share', 'direction': 'PULL'},
+    ],
+    'rsync': [],
+    'app': [{'name': 'app', 'path': '/mnt/tank/share/config', 'mount_info': MNTINFO[2]}],
+    'virt_instance': [
+        {'instance': 'vm', 'source': '/dev/zvol/tank/zvol01', 'zvol': 'tank/zvol01'},
+        {'instance': 'vm', 'source': '/mnt/tank/share', 'mount_info': MNTINFO[2]},
+    ],
+}
+
+
+def test_dataset_details_index():
+    svc = PoolDatasetService(Mock())
+    info = svc.build_details_index(DETAILS, MNTINFO)
+    datasets = [
+        {'id': 'tank', 'type': 'FILESYSTEM', 'mountpoint': '/mnt/tank', 'locked': False,
+         'reservation': {'value': None}, 'refreservation': {'value': None}, 'children': [
+             {'id': 'tank/share', 'type': 'FILESYSTEM', 'mountpoint': '/mnt/tank/share', 'locked': False,
+              'reservation': {'value': None}, 'refreservation': {'value': '1G'}},
+             {'id': 'tank/zvol01', 'type': 'VOLUME', 'mountpoint': None, 'locked': False,
+              'reservation': {'value': None}, 'refreservation': {'value': None}},
+         ]},
+    ]
+    for dataset in datasets:
+        svc.collapse_datasets(dataset, info)
+
+    tank, share, zvol = datasets[0], *datasets[0]['children']
+    assert (tank['atime'], tank['casesensitive'], tank['readonly']) == (True, True, False)
+    assert (share['atime'], share['casesensitive'], share['readonly']) == (False, False, True)
+    assert (zvol['atime'], zvol['casesensitive'], zvol['readonly']) == (True, True, False)
+    assert share['thick_provisioned'] is True
+
+    assert tank['nfs_shares'] == [{'enabled': True, 'path': '/mnt/tank'}]
+    assert share['nfs_shares'] == [
+        {'enabled': True, 'path': '/mnt/tank/share/dir'}, {'enabled': False, 'path': '/mnt/tank/share'},
+    ]
+    assert share['smb_shares'] == [{'enabled': True, 'path': '/mnt/tank/share', 'share_name': 'share'}]
+    assert tank['smb_shares'] == []
+
+    assert share['iscsi_shares'] == [{'enabled': False, 'type': 'FILE', 'path': '/mnt/tank/share/lun'}]
+    assert zvol['iscsi_shares'] == [{'enabled': True, 'type': 'DISK', 'path': '/dev/zvol/tank/zvol01'}]
+    assert tank['iscsi_shares'] == []
+
+    assert share['apps'] == [{'name': 'app', 'path': '/mnt/tank/share/config'}]
+    assert share['virt_instances'] == [{'name': 'vm', 'path': '/mnt/tank/share'}]
+    assert zvol['virt_instances'] == [{'name': 'vm', 'path': '/dev/zvol/tank/zvol01'}]
+
+    assert [tank['replication_tasks_count'], share['replication_tasks_count']] == [1, 2]
+    assert [tank['snapshot_tasks_count'], share['snapshot_tasks_count']] == [1, 2]
+    assert [tank['cloudsync_tasks_count'], share['cloudsync_tasks_count'], zvol['cloudsync_tasks_count']] == [1, 2, 0]
+    assert share['rsync_tasks_count'] == 0
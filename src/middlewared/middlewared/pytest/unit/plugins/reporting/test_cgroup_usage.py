@@ -0,0 +1,20 @@
+from middlewared.plugins.reporting.realtime_reporting.cgroup import read_cgroup_usage
+
+
+def test_read_cgroup_usage(tmp_path):
+    (tmp_path / 'cpu.stat').write_text('usage_usec 1500\nuser_usec 1000\nsystem_usec 500\n')
+    (tmp_path / 'memory.current').write_text('4096\n')
+    (tmp_path / 'io.stat').write_text(
+        '8:0 rbytes=100 wbytes=200 rios=1 wios=2 dbytes=0 dios=0\n'
+        '8:16 rbytes=10 wbytes=20 rios=1 wios=2 dbytes=0 dios=0\n'
+    )
+
+    assert read_cgroup_usage(str(tmp_path)) == {
+        'cpu_usage': 1500000,
+        'memory': 4096,
+        'blkio': {'read': 110, 'write': 220},
+    }
+
+
+def test_read_cgroup_usage_missing(tmp_path):
+    assert read_cgroup_usage(str(tmp_path / 'missing')) is None
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from unittest.mock import patch
+
+from middlewared.plugins.reporting.netdata.connector import Netdata
+from middlewared.plugins.reporting.netdata.exceptions import ClientConnectError
+
+
+@pytest.fixture(autouse=True)
+def reset_all_metrics():
+    Netdata._all_metrics = None
+    Netdata._all_metrics_request = None
+    yield
+    Netdata._all_metrics = None
+    Netdata._all_metrics_request = None
+
+
+@pytest.mark.asyncio
+async def test_all_metrics_concurrent_callers_share_request():
+    calls = []
+
+    async def api_call(resource, *args, **kwargs):
+        calls.append(resource)
+        await asyncio.sleep(0.01)
+        return {'system.cpu': {}}
+
+    with patch.object(Netdata, 'api_call', side_effect=api_call):
+        results = await asyncio.gather(*[Netdata.get_all_metrics() for _ in range(5)])
+        assert await Netdata.get_all_metrics() == {'system.cpu': {}}
+
+    assert results == [{'system.cpu': {}}] * 5
+    assert calls == ['allmetrics?format=json']
+
+
+@pytest.mark.asyncio
+async def test_all_metrics_failure_is_not_cached():
+    async def api_call(resource, *args, **kwargs):
+        raise ClientConnectError('netdata is down')
+
+    with patch.object(Netdata, 'api_call', side_effect=api_call):
+        with pytest.raises(ClientConnectError):
+            await Netdata.get_all_metrics()
+
+    assert Netdata._all_metrics is None
+    assert Netdata._all_metrics_request is None
+
+
+@pytest.mark.asyncio
+async def test_all_metrics_expired():
+    calls = []
+
+    async def api_call(resource, *args, **kwargs):
+        calls.append(resource)
+        return {'call': len(calls)}
+
+    with patch.object(Netdata, 'api_call', side_effect=api_call):
+        assert await Netdata.cached_api_call('allmetrics?format=json', 0) == {'call': 1}
+        assert await Netdata.cached_api_call('allmetrics?format=json', 0) == {'call': 2}
@@ -744,39 +744,19 @@ def test_cpu_stats():
 
 
 def test_disk_stats():
-    disks = ['sda', 'sdb', 'sdc', 'sdd']
-    disk_mapping = {
-        'sda': '{devicename}sda', 'sdb': '{devicename}sdb', 'sdc': '{devicename}sdc', 'sdd': '{devicename}sdd'
+    disk_rates = {
+        '{devicename}sda': {'read_ops': 10, 'read_bytes': 4096, 'write_ops': 5, 'write_bytes': 2048, 'busy': 100},
+        '{devicename}sdb': {'read_ops': 2, 'read_bytes': 1024, 'write_ops': 1, 'write_bytes': 512, 'busy': 300},
     }
-    disk_stats = get_disk_stats(NETDATA_ALL_METRICS, disks, disk_mapping)
-    read_ops = read_bytes = write_ops = write_bytes = busy = 0
-    for disk in disks:
-        mapped_key = disk_mapping.get(disk)
-        read_ops += safely_retrieve_dimension(
-            NETDATA_ALL_METRICS, f'truenas_disk_stats.ops.{mapped_key}', f'{mapped_key}.read_ops', 0
-        )
-        read_bytes += normalize_value(
-            safely_retrieve_dimension(
-                NETDATA_ALL_METRICS, f'truenas_disk_stats.io.{mapped_key}', f'{mapped_key}.reads', 0
-            ), multiplier=1024,
-        )
-        write_ops += normalize_value(safely_retrieve_dimension(
-            NETDATA_ALL_METRICS, f'truenas_disk_stats.ops.{mapped_key}', f'{mapped_key}.write_ops', 0
-        ))
-        write_bytes += normalize_value(
-            safely_retrieve_dimension(
-                NETDATA_ALL_METRICS, f'truenas_disk_stats.io.{mapped_key}', f'{mapped_key}.writes', 0
-            ), multiplier=1024,
-        )
-        busy += safely_retrieve_dimension(
-            NETDATA_ALL_METRICS, f'truenas_disk_stats.busy.{mapped_key}', f'{mapped_key}.busy', 0
-        )
-
-    assert disk_stats['read_ops'] == read_ops
-    assert disk_stats['read_bytes'] == read_bytes
-    assert disk_stats['write_ops'] == write_ops
-    assert disk_stats['write_bytes'] == write_bytes
-    assert disk_stats['busy'] == busy
+    disk_stats = get_disk_stats(disk_rates)
+    assert disk_stats == {
+        'read_ops': 12,
+        'read_bytes': 5120,
+        'write_ops': 6,
+        'write_bytes': 2560,
+        'busy': 200,
+    }
+    assert get_disk_stats({})['busy'] == 0
 
 
 def test_network_stats():
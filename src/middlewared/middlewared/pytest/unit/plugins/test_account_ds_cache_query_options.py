@@ -0,0 +1,17 @@
+import pytest
+
+from middlewared.plugins.account import ds_cache_query_options
+
+
+@pytest.mark.parametrize('filters,options,expected', [
+    ([], {}, {}),
+    ([], {'limit': 10}, {'limit': 10}),
+    ([], {'limit': 10, 'offset': 5}, {'limit': 15}),
+    ([], {'get': True}, {'limit': 1}),
+    ([], {'limit': 10, 'order_by': ['uid']}, {}),
+    ([], {'count': True}, {}),
+    ([['username', '=', 'user']], {'get': True}, {}),
+    ([['local', '=', False]], {'limit': 10}, {}),
+])
+def test_ds_cache_query_options(filters, options, expected):
+    assert ds_cache_query_options(filters, options) == expected
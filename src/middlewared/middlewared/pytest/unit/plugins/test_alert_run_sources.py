@@ -0,0 +1,132 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+import errno
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from middlewared.alert.base import Alert, AlertClass, AlertCategory, AlertLevel, AlertSource
+from middlewared.plugins.alert import AlertFailoverInfo, AlertService, AlertStore
+from middlewared.pytest.unit.middleware import Middleware
+from middlewared.service_exception import CallError
+
+
+class RunSourcesTestAlertClass(AlertClass):
+    category = AlertCategory.SYSTEM
+    level = AlertLevel.WARNING
+    title = "Test"
+    text = "%(source)s"
+
+
+def alert_source(name, delay, timeout=30):
+    class SleepingAlertSource(AlertSource):
+        async def check(self):
+            await asyncio.sleep(self.delay)
+            return Alert(RunSourcesTestAlertClass, {"source": name})
+
+    SleepingAlertSource.__name__ = f"{name}AlertSource"
+    SleepingAlertSource.timeout = timeout
+    source = SleepingAlertSource(None)
+    source.delay = delay
+    return source
+
+
+def alert_service(sources):
+    m = Middleware()
+    m["alert.product_type"] = AsyncMock(return_value="COMMUNITY_EDITION")
+
+    service = AlertService(m)
+    service.alerts = AlertStore()
+    service.alert_source_last_run = defaultdict(lambda: datetime.min)
+    return service, patch("middlewared.plugins.alert.ALERT_SOURCES", {source.name: source for source in sources})
+
+
+@pytest.mark.asyncio
+async def test_run_alerts_concurrently():
+    sources = [alert_source(f"Sleep{i}", 0.2) for i in range(4)]
+    service, sources_patch = alert_service(sources)
+    with sources_patch:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await service._AlertService__run_alerts()
+        assert loop.time() - start < 0.6
+
+    assert [alert.args["source"] for alert in service.alerts] == [source.name for source in sources]
+
+
+@pytest.mark.asyncio
+async def test_run_alerts_timeout():
+    sources = [alert_source("Slow", 0.5, timeout=0.1), alert_source("Fast", 0)]
+    service, sources_patch = alert_service(sources)
+    with sources_patch:
+        await service._AlertService__run_alerts()
+        assert [alert.source for alert in service.alerts] == ["Fast"]
+
+        with pytest.raises(CallError):
+            await service.run_source("Slow")
+
+        # The run that timed out is still awaited instead of starting a new one
+        await asyncio.sleep(0.4)
+        assert [alert["source"] for alert in await service.run_source("Slow")] == ["Slow"]
+
+    stats = await service.sources_stats()
+    assert stats["Slow"]["timeouts"] == 2
+    assert stats["Slow"]["total_count"] == 1
+    assert stats["Fast"]["timeouts"] == 0
+
+
+@pytest.mark.asyncio
+async def test_run_alerts_timeout_keeps_previous_alerts():
+    source = alert_source("Slow", 0, timeout=0.1)
+    service, sources_patch = alert_service([source])
+    with sources_patch:
+        await service._AlertService__run_alerts()
+        previous = list(service.alerts)
+        assert [alert.source for alert in previous] == ["Slow"]
+
+        source.delay = 0.5
+        service.alert_source_last_run.clear()
+        await service._AlertService__run_alerts()
+        assert list(service.alerts) == previous
+        assert [alert.uuid for alert in service.alerts] == [alert.uuid for alert in previous]
+
+
+@pytest.mark.asyncio
+async def test_run_alerts_other_node_timeout_keeps_previous_alerts():
+    source = alert_source("Slow", 0)
+    source.run_on_backup_node = True
+    service, sources_patch = alert_service([source])
+    service._AlertService__get_failover_info = AsyncMock(return_value=AlertFailoverInfo(
+        this_node="A", other_node="B", run_on_backup_node=True, run_failover_related=True,
+    ))
+    with sources_patch:
+        remote_alerts = await service.run_source("Slow")
+        service.middleware["failover.call_remote"] = AsyncMock(side_effect=[
+            remote_alerts,
+            CallError("This alert checker did not finish in time", errno.EINPROGRESS),
+        ])
+        await service._AlertService__run_alerts()
+        previous = [(alert.node, alert.uuid) for alert in service.alerts]
+        assert [node for node, _ in previous] == ["A", "B"]
+
+        service.alert_source_last_run.clear()
+        await service._AlertService__run_alerts()
+        assert [(alert.node, alert.uuid) for alert in service.alerts] == previous
+
+
+@pytest.mark.asyncio
+async def test_sources_stats_percentiles():
+    service, _ = alert_service([])
+    stat = service.sources_run_times["Source"]
+    for i in range(1, 101):
+        stat["samples"].append(i)
+        stat["total_count"] += 1
+        stat["total_time"] += i
+
+    stats = (await service.sources_stats())["Source"]
+    assert stats["p50"] == 50
+    assert stats["p95"] == 95
+    assert stats["avg"] == 50.5
+    assert "samples" not in stats
+
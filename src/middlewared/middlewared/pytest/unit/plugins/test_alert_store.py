@@ -0,0 +1,88 @@
+from datetime import datetime
+from unittest.mock import AsyncMock, call
+
+import pytest
+
+from middlewared.alert.base import Alert, AlertClass, AlertCategory, AlertLevel
+from middlewared.plugins.alert import AlertService, AlertStore
+from middlewared.pytest.unit.middleware import Middleware
+
+
+class StoreTestAlertClass(AlertClass):
+    category = AlertCategory.SYSTEM
+    level = AlertLevel.WARNING
+    title = "Test"
+    text = "%(name)s"
+
+
+def alert(name, source="Source", node="A", uuid=None):
+    return Alert(StoreTestAlertClass, {"name": name}, node=node, datetime=datetime(2024, 1, 1),
+                 _uuid=uuid or f"{node}-{source}-{name}", _source=source)
+
+
+def test_add_replaces_same_key():
+    store = AlertStore([alert("a"), alert("b")])
+    replacement = alert("a", uuid="new")
+    store.add(replacement)
+
+    assert list(store) == [alert("b"), replacement]
+    assert store.get("A", "Source", StoreTestAlertClass, replacement.key) is replacement
+    assert store.get_by_uuid("A-Source-a") is None
+    assert store.get_by_uuid("new") is replacement
+
+
+def test_replace_source():
+    store = AlertStore([alert("a", "Source1"), alert("b", "Source2"), alert("c", "Source1", node="B")])
+    store.replace_source("Source1", [alert("d", "Source1")])
+
+    assert [a.args["name"] for a in store] == ["b", "d"]
+    assert [a.args["name"] for a in store.get_by_source("Source1")] == ["d"]
+    assert store.get_by_uuid("B-Source1-c") is None
+
+
+def test_remove():
+    store = AlertStore([alert("a"), alert("b")])
+    assert store.remove(alert("a"))
+    assert not store.remove(alert("a"))
+    assert not store.remove(alert("c"))
+
+    store.remove_if(lambda a: a.args["name"] == "b")
+    assert len(store) == 0
+    assert store.get_by_source("Source") == []
+
+
+@pytest.mark.asyncio
+async def test_flush_alerts_differential():
+    m = Middleware()
+    m["datastore.delete"] = AsyncMock()
+    m["datastore.insert"] = AsyncMock()
+    m["datastore.update"] = AsyncMock()
+
+    service = AlertService(m)
+    service.alerts = AlertStore([alert("a"), alert("b")])
+    await service.flush_alerts()
+    assert m["datastore.delete"].call_args_list == [call("system.alert", [])]
+    assert m["datastore.insert"].call_count == 2
+
+    for method in ("datastore.delete", "datastore.insert", "datastore.update"):
+        m[method].reset_mock()
+
+    service.alerts.get_by_uuid("A-Source-a").dismissed = True
+    service.alerts.remove(alert("b"))
+    service.alerts.add(alert("c"))
+    await service.flush_alerts()
+
+    assert m["datastore.delete"].call_args_list == [call("system.alert", [["uuid", "in", ["A-Source-b"]]])]
+    assert [c.args[1]["uuid"] for c in m["datastore.insert"].call_args_list] == ["A-Source-c"]
+    assert m["datastore.update"].call_args_list == [
+        call("system.alert", [["uuid", "=", "A-Source-a"]], m["datastore.update"].call_args.args[2]),
+    ]
+    assert m["datastore.update"].call_args.args[2]["dismissed"] is True
+
+    for method in ("datastore.delete", "datastore.insert", "datastore.update"):
+        m[method].reset_mock()
+
+    await service.flush_alerts()
+    assert not m["datastore.delete"].called
+    assert not m["datastore.insert"].called
+    assert not m["datastore.update"].called
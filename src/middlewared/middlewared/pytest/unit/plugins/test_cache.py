@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from middlewared.plugins.cache import CacheService
+
+
+@pytest.fixture
+def cache():
+    return CacheService(Mock())
+
+
+def test_get_put_pop(cache):
+    cache.put('key', 'value')
+    assert cache.has_key('key')
+    assert cache.get('key') == 'value'
+    assert not cache.has_key('key', 'other')
+    with pytest.raises(KeyError):
+        cache.get('key', 'other')
+
+    assert cache.pop('key') == 'value'
+    assert cache.pop('key') is None
+    assert not cache.has_key('key')
+
+
+def test_expired(cache):
+    with patch('middlewared.plugins.cache.monotonic', Mock(return_value=100)):
+        cache.put('key', 'value', 10)
+        cache.put('other', 'value', 30)
+        assert cache.get('key') == 'value'
+
+    with patch('middlewared.plugins.cache.monotonic', Mock(return_value=110)):
+        assert not cache.has_key('key')
+        with pytest.raises(KeyError):
+            cache.get('key')
+
+        cache.sweep()
+        assert cache.stats()['default']['entries'] == 1
+
+    with patch('middlewared.plugins.cache.monotonic', Mock(return_value=130)):
+        cache.sweep()
+
+    assert cache.stats()['default'] | {'memory': None} == {
+        'entries': 0, 'hits': 1, 'misses': 1, 'evictions': 0, 'expirations': 2, 'memory': None,
+    }
+
+
+def test_lru_eviction_spares_entries_without_timeout(cache):
+    with patch('middlewared.plugins.cache.NAMESPACE_MAX_ENTRIES', 3):
+        cache.put('state', 'value')
+        for i in range(3):
+            cache.put(f'key{i}', i, 60)
+
+        # `key0` is now the most recently used one
+        assert cache.get('key0') == 0
+        cache.put('key3', 3, 60)
+        cache.put('key4', 4, 60)
+
+    assert [cache.has_key(f'key{i}') for i in range(5)] == [True, False, False, True, True]
+    assert cache.get('state') == 'value'
+    assert cache.stats()['default']['evictions'] == 2
+
+
+def test_get_or_put_single_flight(cache):
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def method():
+        calls.append(None)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_put('key', 60, method)))]
+    threads[0].start()
+    started.wait(5)
+    threads += [threading.Thread(target=lambda: results.append(cache.get_or_put('key', 60, method))) for _ in range(4)]
+    for thread in threads[1:]:
+        thread.start()
+
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ['value'] * 5
+    assert len(calls) == 1
+    assert cache.get_or_put('key', 60, method) == 'value'
+    assert len(calls) == 1
+
+
+def test_get_or_put_exception_is_not_cached(cache):
+    def method():
+        raise ValueError('failed')
+
+    with pytest.raises(ValueError):
+        cache.get_or_put('key', 60, method)
+
+    assert cache.get_or_put('key', 60, lambda: 'value') == 'value'
+
+
+def test_get_or_put_coroutine_function(cache):
+    async def method():
+        return 'value'
+
+    cache.middleware.run_coroutine = asyncio.run
+    assert cache.get_or_put('key', 60, method) == 'value'
+
+
+def test_stats_memory(cache):
+    cache.put('small', 'x', namespace='ns')
+    small = cache.stats()['ns']['memory']
+    cache.put('large', ['x' * 1000] * 10, namespace='ns')
+    assert cache.stats()['ns']['memory'] > small + 1000
@@ -1,5 +1,9 @@
+import asyncio
 from contextlib import asynccontextmanager
 import datetime
+import shutil
+import sqlite3
+import time
 from unittest.mock import ANY, patch
 
 import pytest
@@ -8,6 +12,7 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
+from middlewared.service_exception import CallError
 from middlewared.sqlalchemy import EncryptedText, JSON, Time
 
 import middlewared.plugins.datastore  # noqa
@@ -24,9 +29,9 @@ Model = declarative_base()
 
 
 @asynccontextmanager
-async def datastore_test():
+async def datastore_test(database=":memory:"):
     m = Middleware()
-    with patch("middlewared.plugins.datastore.connection.FREENAS_DATABASE", ":memory:"):
+    with patch("middlewared.plugins.datastore.connection.FREENAS_DATABASE", database):
         with patch("middlewared.plugins.datastore.schema.Model", Model):
             with patch("middlewared.plugins.datastore.util.Model", Model):
                 ds = DatastoreService(m)
@@ -41,7 +46,9 @@ async def datastore_test():
 
                 m["datastore.execute"] = ds.execute
                 m["datastore.execute_write"] = ds.execute_write
+                m["datastore.execute_write_batch"] = ds.execute_write_batch
                 m["datastore.fetchall"] = ds.fetchall
+                m["datastore.fetchall_read"] = ds.fetchall_read
 
                 m["datastore.query"] = ds.query
                 m["datastore.send_insert_events"] = ds.send_insert_events
@@ -51,6 +58,7 @@ async def datastore_test():
                 m["datastore.insert"] = ds.insert
                 m["datastore.update"] = ds.update
                 m["datastore.delete"] = ds.delete
+                m["datastore.write_batch"] = ds.write_batch
 
                 yield ds
 
@@ -409,7 +417,7 @@ async def test__json_load(id_, json_dict, json_list, json_dict_result, json_list
 async def test__json_save():
     async with datastore_test() as ds:
         await ds.insert("test.json", {"json_dict": {"key": "value"}, "json_list": [1, 2]})
-        row = ds.fetchall("SELECT * FROM test_json")[0]
+        row = (await ds.fetchall_read("SELECT * FROM test_json"))[0]
         assert row["json_dict"] == '{"key": "value"}' and row["json_list"] == '[1, 2]'
 
 
@@ -468,7 +476,7 @@ async def test__encrypted_json_save():
         with patch("middlewared.sqlalchemy.encrypt", encrypt):
             await ds.insert("test.encryptedjson", {"json_dict": {"key": "value"}, "json_list": [1, 2]})
 
-        row = ds.fetchall("SELECT * FROM test_encryptedjson")[0]
+        row = (await ds.fetchall_read("SELECT * FROM test_encryptedjson"))[0]
         assert row["json_dict"] == '!{"key": "value"}' and row["json_list"] == '![1, 2]'
 
         ds.middleware.call_hook_inline.assert_called_once_with(
@@ -498,7 +506,7 @@ async def test__encrypted_text_save():
         with patch("middlewared.sqlalchemy.encrypt", encrypt):
             await ds.insert("test.encryptedtext", {"object": 'Text'})
 
-        assert (ds.fetchall("SELECT * FROM test_encryptedtext"))[0]["object"] == '!Text'
+        assert (await ds.fetchall_read("SELECT * FROM test_encryptedtext"))[0]["object"] == '!Text'
 
         ds.middleware.call_hook_inline.assert_called_once_with(
             "datastore.post_execute_write",
@@ -523,7 +531,7 @@ async def test__encrypted_text_save_null():
         with patch("middlewared.sqlalchemy.encrypt", encrypt):
             await ds.insert("test.encryptedtext", {"object": None})
 
-        assert (ds.fetchall("SELECT * FROM test_encryptedtext"))[0]["object"] is None
+        assert (await ds.fetchall_read("SELECT * FROM test_encryptedtext"))[0]["object"] is None
 
         ds.middleware.call_hook_inline.assert_called_once_with(
             "datastore.post_execute_write",
@@ -805,3 +813,227 @@ async def test__null_order_by(order_by, result):
         await ds.insert("test.null", {"value": 1})
 
         assert [row["id"] for row in await ds.query("test.null", [], {"order_by": order_by})] == result
+
+
+class CachedConfigModel(Model):
+    __tablename__ = 'test_cachedconfig'
+    __datastore_cache__ = True
+
+    id = sa.Column(sa.Integer(), primary_key=True)
+    value = sa.Column(sa.Integer(), nullable=False)
+    group_id = sa.Column(sa.ForeignKey('account_bsdgroups.id', ondelete='SET NULL'), nullable=True)
+    disks = relationship('DiskModel', secondary=lambda: CachedConfigDiskModel.__table__)
+
+
+class CachedConfigDiskModel(Model):
+    __tablename__ = 'test_cachedconfig_disks'
+
+    id = sa.Column(sa.Integer(), primary_key=True)
+    cachedconfig_id = sa.Column(sa.Integer(), sa.ForeignKey('test_cachedconfig.id'))
+    disk_id = sa.Column(sa.Integer(), sa.ForeignKey('storage_disk.id'))
+
+
+@pytest.mark.asyncio
+async def test__row_cache():
+    async with datastore_test() as ds:
+        await ds.insert("test.cachedconfig", {"value": 1})
+
+        assert (await ds.config("test.cachedconfig"))["value"] == 1
+        hits = ds.cache_stats()["rows"]["test_cachedconfig"]["hits"]
+        config = await ds.config("test.cachedconfig")
+        assert config["value"] == 1
+        assert ds.cache_stats()["rows"]["test_cachedconfig"]["hits"] == hits + 1
+
+        # Cached results are not shared with callers
+        config["value"] = 3
+        assert (await ds.config("test.cachedconfig"))["value"] == 1
+
+        await ds.update("test.cachedconfig", config["id"], {"value": 2})
+        assert (await ds.config("test.cachedconfig"))["value"] == 2
+
+
+@pytest.mark.asyncio
+async def test__row_cache_fk_invalidation():
+    async with datastore_test() as ds:
+        group_id = await ds.insert("account.bsdgroups", {"bsdgrp_gid": 1010})
+        await ds.insert("test.cachedconfig", {"value": 1, "group": group_id})
+        assert (await ds.config("test.cachedconfig"))["group"]["bsdgrp_gid"] == 1010
+
+        await ds.update("account.bsdgroups", group_id, {"bsdgrp_gid": 2020})
+        assert (await ds.config("test.cachedconfig"))["group"]["bsdgrp_gid"] == 2020
+
+        # ON DELETE SET NULL changes cached table rows
+        await ds.delete("account.bsdgroups", group_id)
+        assert (await ds.config("test.cachedconfig"))["group"] is None
+
+
+@pytest.mark.asyncio
+async def test__row_cache_mtm_invalidation():
+    async with datastore_test() as ds:
+        ds.execute("INSERT INTO storage_disk VALUES (10)")
+        ds.execute("INSERT INTO storage_disk VALUES (20)")
+        id_ = await ds.insert("test.cachedconfig", {"value": 1, "disks": [10]})
+        assert (await ds.config("test.cachedconfig"))["disks"] == [{"id": 10}]
+
+        await ds.update("test.cachedconfig", id_, {"disks": [20]})
+        assert (await ds.config("test.cachedconfig"))["disks"] == [{"id": 20}]
+
+
+@pytest.mark.asyncio
+async def test__row_cache_unrelated_write():
+    async with datastore_test() as ds:
+        await ds.insert("test.cachedconfig", {"value": 1})
+        await ds.config("test.cachedconfig")
+        hits = ds.cache_stats()["rows"]["test_cachedconfig"]["hits"]
+
+        await ds.insert("test.null", {"value": 1})
+        await ds.config("test.cachedconfig")
+
+        assert ds.cache_stats()["rows"]["test_cachedconfig"]["hits"] == hits + 1
+
+
+@pytest.mark.asyncio
+async def test__statement_cache():
+    async with datastore_test() as ds:
+        for value in (3, None, 1):
+            await ds.insert("test.null", {"value": value})
+
+        stats = ds.cache_stats()["statements"]
+        for filters, ids in [
+            ([["value", "=", 3]], [1]),
+            ([["value", "=", 1]], [3]),
+            ([["value", "=", None]], [2]),
+            ([["value", "in", [1, 3]]], [1, 3]),
+            ([["value", "in", [1, None]]], [2, 3]),
+            ([["value", "in", [3, None]]], [1, 2]),
+        ]:
+            assert [row["id"] for row in await ds.query("test.null", filters, {"order_by": ["id"]})] == ids
+
+        assert ds.cache_stats()["statements"]["hits"] == stats["hits"] + 2
+
+        assert [row["id"] for row in await ds.query("test.null", [], {"order_by": ["id"], "offset": 1})] == [2, 3]
+        assert [row["id"] for row in await ds.query("test.null", [], {"order_by": ["id"], "limit": 1})] == [1]
+
+
+@pytest.mark.asyncio
+async def test__wal_read_connections(tmp_path):
+    database = tmp_path / "freenas-v1.db"
+    async with datastore_test(str(database)) as ds:
+        assert (await ds.fetchall_read("PRAGMA journal_mode"))[0][0] == "wal"
+
+        await ds.insert("test.null", {"value": 1})
+        # Writes are visible to read connections right away
+        assert [row["value"] for row in await ds.query("test.null")] == [1]
+        # and are moved to the database file by full checkpoint
+        ds.checkpoint(True)
+        assert (tmp_path / "freenas-v1.db-wal").stat().st_size == 0
+
+        with pytest.raises(Exception):
+            await ds.fetchall_read("DELETE FROM test_null")
+
+        ds.setup()
+        assert [row["value"] for row in await ds.query("test.null")] == [1]
+
+
+@pytest.mark.asyncio
+async def test__wal_checkpoint_with_running_read(tmp_path):
+    database = tmp_path / "freenas-v1.db"
+    async with datastore_test(str(database)) as ds:
+        await ds.insert("test.null", {"value": 1})
+
+        reader = sqlite3.connect(database)
+        try:
+            reader.execute("BEGIN")
+            reader.execute("SELECT * FROM test_null").fetchall()
+
+            # Writes do not wait for running reads
+            start = time.monotonic()
+            await ds.insert("test.null", {"value": 2})
+            assert time.monotonic() - start < 1
+
+            # Full checkpoint fails instead of leaving the database file incomplete
+            ds.execute("PRAGMA busy_timeout=100")
+            with patch("middlewared.plugins.datastore.connection.FULL_CHECKPOINT_ATTEMPTS", 1):
+                with pytest.raises(CallError):
+                    ds.checkpoint(True)
+        finally:
+            reader.close()
+
+        ds.checkpoint(True)
+        assert (tmp_path / "freenas-v1.db-wal").stat().st_size == 0
+
+
+@pytest.mark.asyncio
+async def test__wal_read_connections_closed(tmp_path):
+    database = tmp_path / "freenas-v1.db"
+    async with datastore_test(str(database)) as ds:
+        await ds.insert("test.null", {"value": 1})
+
+        # i.e. while the database file is being replaced, queries are run in the datastore thread instead
+        next(part for part in ds.parts if hasattr(part, "read_pool")).read_pool.close()
+        assert [row["value"] for row in await ds.query("test.null")] == [1]
+        # where the database can be read synchronously
+        assert await asyncio.get_running_loop().run_in_executor(
+            middlewared.plugins.datastore.connection.thread_pool, ds.fetchall, "SELECT value FROM test_null",
+        ) == [(1,)]
+
+
+@pytest.mark.asyncio
+async def test__wal_replace(tmp_path):
+    database = tmp_path / "freenas-v1.db"
+    replacement = tmp_path / "replacement.db"
+    async with datastore_test(str(database)) as ds:
+        await ds.insert("test.null", {"value": 1})
+        ds.checkpoint(True)
+        shutil.copy(database, replacement)
+
+        # A running read keeps the write in the write-ahead log
+        reader = sqlite3.connect(database)
+        try:
+            reader.execute("BEGIN")
+            reader.execute("SELECT * FROM test_null").fetchall()
+            await ds.insert("test.null", {"value": 2})
+
+            ds.replace(str(replacement))
+        finally:
+            reader.close()
+
+        assert not replacement.exists()
+        assert [row["value"] for row in await ds.query("test.null")] == [1]
+
+
+@pytest.mark.asyncio
+async def test__write_batch():
+    async with datastore_test() as ds:
+        ds.execute("INSERT INTO test_custompk VALUES ('ID1', 'Test 1')")
+        ds.execute("INSERT INTO test_custompk VALUES ('ID2', 'Test 2')")
+        ds.middleware.call_hook_inline.reset_mock()
+
+        await ds.write_batch("test.custompk", {
+            "insert": [{"identifier": "ID3", "name": "Test 3"}],
+            "update": [["ID1", {"name": "Updated"}]],
+            "delete": ["ID2"],
+        }, {"prefix": "custom_", "send_events": False})
+
+        assert await ds.query("test.custompk", [], {"prefix": "custom_", "order_by": ["identifier"]}) == [
+            {"identifier": "ID1", "name": "Updated"},
+            {"identifier": "ID3", "name": "Test 3"},
+        ]
+        assert ds.middleware.call_hook_inline.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test__write_batch_is_atomic():
+    async with datastore_test() as ds:
+        ds.execute("INSERT INTO test_custompk VALUES ('ID1', 'Test 1')")
+        ds.middleware.call_hook_inline.reset_mock()
+
+        with pytest.raises(IntegrityError):
+            await ds.write_batch("test.custompk", {
+                "insert": [{"identifier": "ID1", "name": "Duplicate"}],
+                "update": [["ID1", {"name": "Updated"}]],
+                "delete": [],
+            }, {"prefix": "custom_", "send_events": False})
+
+        assert await ds.query("test.custompk", [], {"prefix": "custom_"}) == [{"identifier": "ID1", "name": "Test 1"}]
+        assert not ds.middleware.call_hook_inline.called
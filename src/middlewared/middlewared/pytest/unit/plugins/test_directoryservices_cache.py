@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from middlewared.plugins.directoryservices_.util_cache import DSCacheView
+from middlewared.plugins.idmap_.idmap_constants import BASE_SYNTHETIC_DATASTORE_ID, IDType
+from middlewared.utils import filter_list
+
+
+def user(uid, username):
+    return {'id': BASE_SYNTHETIC_DATASTORE_ID + uid, 'uid': uid, 'username': username, 'smb': bool(uid % 2)}
+
+
+USERS = [user(100000 + i, f'{"Bob" if i % 3 else "alice"}{i:03}') for i in range(300)]
+
+
+@pytest.fixture(scope='module')
+def view():
+    entries = USERS.copy()
+    random.Random(0).shuffle(entries)
+    return DSCacheView(None, IDType.USER, entries)
+
+
+@pytest.mark.parametrize('filters', [
+    [],
+    [['username', '=', 'Bob010']],
+    [['username', '=', 'missing']],
+    [['username', '^', 'Bob01']],
+    [['username', 'C^', 'BOB01']],
+    [['username', 'C=', 'ALICE003']],
+    [['username', '^', 'Bob'], ['smb', '=', True]],
+    [['uid', '>', 100250]],
+    [['uid', '<=', 100010], ['username', '^', 'alice']],
+    [['uid', '=', 100005]],
+    [['id', '>=', BASE_SYNTHETIC_DATASTORE_ID + 100290]],
+    [['uid', 'in', [100001, 100002]]],
+    [['OR', [['username', '=', 'Bob001'], ['uid', '=', 100002]]]],
+])
+@pytest.mark.parametrize('offset,limit', [(0, 0), (0, 5), (3, 2), (290, 50)])
+def test_cache_view_query(view, filters, offset, limit):
+    expected = filter_list(USERS, filters)[offset:offset + limit if limit else None]
+    assert view.query(filters, offset, limit) == expected
+
+
+def test_cache_view_returns_copies(view):
+    entry = view.query([['username', '=', 'Bob001']])[0]
+    entry['smb'] = 'changed'
+    assert view.query([['username', '=', 'Bob001']])[0]['smb'] is True
+
+
+def test_cache_view_add():
+    view = DSCacheView(None, IDType.USER, USERS[10:20])
+    view.add(user(100005, 'carol'))
+    view.add(user(100100, 'dave'))
+    view.add(user(100015, 'Bob015-renamed'))
+
+    assert [u['uid'] for u in view.query([])] == [100005, *range(100010, 100020), 100100]
+    assert view.query([['username', '^', 'Bob015']]) == [user(100015, 'Bob015-renamed')]
+    assert view.query([['uid', '>', 100018]]) == [USERS[19], user(100100, 'dave')]
+    assert view.query([['username', 'C=', 'CAROL']]) == [user(100005, 'carol')]
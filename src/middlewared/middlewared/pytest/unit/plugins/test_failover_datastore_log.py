@@ -0,0 +1,108 @@
+import pytest
+
+from middlewared.plugins.failover_.datastore_log import ReplicaState, ReplicationLog
+
+
+def log_with(count, **kwargs):
+    log = ReplicationLog(**kwargs)
+    for i in range(count):
+        assert log.append(f'UPDATE t SET v = {i}', [i])
+
+    return log
+
+
+def test_batch_starts_with_oldest_unacknowledged():
+    log = log_with(5)
+    epoch, batch = log.batch(max_entries=2)
+    assert epoch == log.epoch
+    assert [entry[0] for entry in batch] == [1, 2]
+
+    assert log.acknowledge(epoch, 2)
+    assert [entry[0] for entry in log.batch(max_entries=10)[1]] == [3, 4, 5]
+
+
+def test_batch_max_bytes():
+    log = ReplicationLog()
+    for i in range(3):
+        log.append('x' * 100, [])
+
+    assert len(log.batch(max_bytes=250)[1]) == 2
+    # A single entry larger than the limit is still sent
+    assert len(log.batch(max_bytes=10)[1]) == 1
+
+
+def test_batch_timeout():
+    assert log_with(0).batch(timeout=0)[1] == []
+
+
+def test_log_full():
+    log = log_with(2, max_entries=2)
+    assert not log.append('UPDATE t SET v = 3', [])
+
+    log.acknowledge(log.epoch, 1)
+    assert log.append('UPDATE t SET v = 3', [])
+    assert [entry[0] for entry in log.batch()[1]] == [2, 3]
+
+
+def test_acknowledge_after_reset():
+    log = log_with(3)
+    epoch = log.epoch
+    new_epoch = log.reset()
+    assert new_epoch != epoch
+
+    log.append('UPDATE t SET v = 1', [])
+    # Late acknowledgement for the previous epoch
+    assert log.acknowledge(epoch, 3)
+    assert log.batch() == (new_epoch, [[1, 'UPDATE t SET v = 1', []]])
+
+
+def test_acknowledge_missing_entries():
+    log = log_with(5)
+    assert log.acknowledge(log.epoch, 3)
+    # Remote node lost statements that were already acknowledged
+    assert not log.acknowledge(log.epoch, 1)
+
+
+@pytest.mark.parametrize('seqs,applied,pending', [
+    ([1, 2, 3], 0, [1, 2, 3]),
+    ([1, 2, 3], 2, [3]),
+    ([3, 4], 1, []),
+    ([2, 3, 5, 6], 1, [2, 3]),
+])
+def test_replica_pending(seqs, applied, pending):
+    replica = ReplicaState()
+    replica.start('epoch')
+    replica.seq = applied
+    assert [entry[0] for entry in replica.pending('epoch', [[seq, 'SQL', []] for seq in seqs])] == pending
+
+
+def test_replica_unknown_epoch():
+    replica = ReplicaState()
+    assert replica.pending('epoch', [[1, 'SQL', []]]) is None
+
+    replica.start('epoch')
+    assert replica.pending('other', [[1, 'SQL', []]]) is None
+
+
+def test_replay_after_lost_batch():
+    log = log_with(6)
+    replica = ReplicaState()
+    replica.start(log.epoch)
+    applied = []
+
+    def deliver(batch):
+        for seq, sql, params in replica.pending(log.epoch, batch):
+            applied.append(seq)
+            replica.seq = seq
+
+        return replica.seq
+
+    epoch, batch = log.batch(max_entries=2)
+    log.acknowledge(epoch, deliver(batch))
+    # Next batch is lost, the one after it is only partially delivered
+    log.batch(max_entries=2)
+    log.acknowledge(epoch, deliver(log.batch(max_entries=6)[1][2:]))
+    log.acknowledge(epoch, deliver(log.batch(max_entries=6)[1]))
+
+    assert applied == [1, 2, 3, 4, 5, 6]
+    assert log.batch(timeout=0)[1] == []
@@ -0,0 +1,49 @@
+from middlewared.plugins.zettarepl_.definition_changes import (
+    apply_definition_tasks_changes, definition_tasks_changes, definition_tasks_subset,
+)
+
+
+def definition(periodic_snapshot_tasks, replication_tasks):
+    return {
+        "max-parallel-replication-tasks": None,
+        "timezone": "UTC",
+        "use-removal-dates": True,
+        "periodic-snapshot-tasks": periodic_snapshot_tasks,
+        "replication-tasks": replication_tasks,
+    }
+
+
+def test_definition_tasks_changes():
+    old = definition(
+        {"task_1": {"dataset": "tank/a"}, "task_2": {"dataset": "tank/b"}},
+        {"task_1": {"periodic-snapshot-tasks": ["task_1"]}},
+    )
+    new = definition(
+        {"task_1": {"dataset": "tank/a"}, "task_2": {"dataset": "tank/c"}, "task_3": {"dataset": "tank/d"}},
+        {},
+    )
+
+    changes = definition_tasks_changes(old, new)
+    assert changes == {
+        "periodic-snapshot-tasks": {
+            "updated": {"task_2": {"dataset": "tank/c"}, "task_3": {"dataset": "tank/d"}},
+            "removed": [],
+        },
+        "replication-tasks": {"updated": {}, "removed": ["task_1"]},
+    }
+    assert apply_definition_tasks_changes(old, changes) == new
+    assert old["periodic-snapshot-tasks"]["task_2"] == {"dataset": "tank/b"}
+
+    assert definition_tasks_changes(new, new) == {}
+
+
+def test_definition_tasks_subset():
+    data = definition(
+        {"task_1": {"dataset": "tank/a"}, "task_2": {"dataset": "tank/b"}, "task_3": {"dataset": "tank/c"}},
+        {"task_1": {"periodic-snapshot-tasks": ["task_1"]}, "task_2": {"periodic-snapshot-tasks": ["task_4"]}},
+    )
+
+    assert definition_tasks_subset(data, {"task_3"}, {"task_1"}) == definition(
+        {"task_1": {"dataset": "tank/a"}, "task_3": {"dataset": "tank/c"}},
+        {"task_1": {"periodic-snapshot-tasks": ["task_1"]}},
+    )
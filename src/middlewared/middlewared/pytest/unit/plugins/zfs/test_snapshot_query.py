@@ -0,0 +1,92 @@
+import pytest
+
+from middlewared.plugins.zfs_.snapshot_utils import filter_snapshots, snapshot_query_pushdown
+from middlewared.service_exception import MatchNotFound
+from middlewared.utils import filter_list
+
+
+SNAPSHOTS = [
+    {
+        'id': f'{dataset}@snap-{txg}',
+        'name': f'{dataset}@snap-{txg}',
+        'dataset': dataset,
+        'pool': dataset.split('/')[0],
+        'createtxg': str(txg),
+    }
+    for dataset, txgs in (('tank', (5, 120)), ('tank/ds', (9, 80, 100, 1000)), ('data/ds', (7, 99)))
+    for txg in txgs
+]
+
+
+@pytest.mark.parametrize('filters,min_txg,max_txg,expected', [
+    ([], 0, 0, ({'min_txg': 0, 'max_txg': 0}, [])),
+    ([['id', '=', 'tank@a']], 0, 0, ({'datasets': ['tank@a'], 'min_txg': 0, 'max_txg': 0}, [['id', '=', 'tank@a']])),
+    (
+        [['name', '^', 'tank/ds@auto-']], 0, 0,
+        ({'datasets': ['tank/ds'], 'recursive': False, 'min_txg': 0, 'max_txg': 0}, [['name', '^', 'tank/ds@auto-']]),
+    ),
+    ([['name', '^', 'tank/d']], 0, 0, ({'min_txg': 0, 'max_txg': 0}, [['name', '^', 'tank/d']])),
+    (
+        [['dataset', 'in', ['tank', 'data']]], 0, 0,
+        ({'datasets': ['tank', 'data'], 'recursive': False, 'min_txg': 0, 'max_txg': 0},
+         [['dataset', 'in', ['tank', 'data']]]),
+    ),
+    (
+        [['pool', '=', 'tank']], 0, 0,
+        ({'datasets': ['tank'], 'recursive': True, 'min_txg': 0, 'max_txg': 0}, [['pool', '=', 'tank']]),
+    ),
+    ([['createtxg', '>', '10'], ['createtxg', '<=', 100]], 0, 0, ({'min_txg': 11, 'max_txg': 100}, [])),
+    ([['createtxg', '=', '10']], 0, 0, ({'min_txg': 10, 'max_txg': 10}, [])),
+    ([['createtxg', '>=', '10']], 20, 50, ({'min_txg': 20, 'max_txg': 50}, [])),
+    ([['createtxg', '<', '30']], 20, 50, ({'min_txg': 20, 'max_txg': 29}, [])),
+    ([['createtxg', '!=', '10']], 0, 0, ({'min_txg': 0, 'max_txg': 0}, [['createtxg', '!=', '10']])),
+    ([['createtxg', '<', '1']], 0, 0, None),
+    ([['createtxg', '>', '50']], 0, 50, None),
+    ([['dataset', 'in', []]], 0, 0, None),
+])
+def test_snapshot_query_pushdown(filters, min_txg, max_txg, expected):
+    assert snapshot_query_pushdown(filters, min_txg, max_txg) == expected
+
+
+@pytest.mark.parametrize('filters', [
+    [],
+    [['pool', '=', 'tank']],
+    [['createtxg', '!=', '80']],
+])
+@pytest.mark.parametrize('options', [
+    {'order_by': ['createtxg']},
+    {'order_by': ['-createtxg']},
+    {'order_by': ['createtxg'], 'limit': 2},
+    {'order_by': ['-createtxg'], 'limit': 3, 'offset': 2},
+    {'order_by': ['createtxg'], 'offset': 3},
+])
+def test_filter_snapshots_createtxg_numeric_order(filters, options):
+    expected = sorted(
+        filter_list(SNAPSHOTS, filters), key=lambda s: int(s['createtxg']), reverse=options['order_by'][0][0] == '-',
+    )
+    offset = options.get('offset', 0)
+    expected = expected[offset:offset + options['limit']] if options.get('limit') else expected[offset:]
+
+    assert filter_snapshots(SNAPSHOTS, filters, options) == expected
+
+
+def test_filter_snapshots_get():
+    assert filter_snapshots(SNAPSHOTS, [['dataset', '=', 'tank/ds']], {'order_by': ['-createtxg'], 'get': True}) == {
+        'id': 'tank/ds@snap-1000',
+        'name': 'tank/ds@snap-1000',
+        'dataset': 'tank/ds',
+        'pool': 'tank',
+        'createtxg': '1000',
+    }
+
+    with pytest.raises(MatchNotFound):
+        filter_snapshots(SNAPSHOTS, [['dataset', '=', 'bogus']], {'order_by': ['createtxg'], 'get': True})
+
+
+@pytest.mark.parametrize('filters,options', [
+    ([['pool', '=', 'data']], {}),
+    ([], {'order_by': ['name'], 'limit': 2}),
+    ([['pool', '=', 'tank']], {'order_by': ['createtxg'], 'count': True}),
+])
+def test_filter_snapshots_falls_back_to_filter_list(filters, options):
+    assert filter_snapshots(SNAPSHOTS, filters, options) == filter_list(SNAPSHOTS, filters, options)
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from middlewared.job import Job, State
+
+
+def new_job(method, abortable):
+    middleware = Mock()
+    middleware.loop = asyncio.get_running_loop()
+    middleware.run_in_thread = asyncio.to_thread
+    options = {
+        'lock': None,
+        'lock_queue_size': None,
+        'logs': False,
+        'process': False,
+        'pipes': [],
+        'check_pipes': False,
+        'transient': False,
+        'description': None,
+        'abortable': abortable,
+        'read_roles': [],
+    }
+    return Job(middleware, 'test.job', None, method, [], options, None, None, None, None)
+
+
+@pytest.mark.asyncio
+async def test_abort_thread_job_waits_for_method():
+    started = threading.Event()
+    release = threading.Event()
+
+    def method(job):
+        started.set()
+        release.wait()
+        job.set_progress(50, 'Aborted')
+
+    job = new_job(method, abortable=True)
+    queue = Mock()
+    run = asyncio.create_task(job.run(queue))
+    await asyncio.to_thread(started.wait)
+
+    try:
+        job.abort()
+        await asyncio.sleep(0.1)
+        # The method is still running so the job must not be finished
+        assert job.state == State.RUNNING
+        assert not queue.finish.called
+    finally:
+        release.set()
+
+    await run
+    assert job.state == State.ABORTED
+    assert job.progress['description'] == 'Aborted'
+    queue.finish.assert_called_once_with(job)
+
+
+@pytest.mark.asyncio
+async def test_abort_async_job_cancels_method():
+    async def method(job):
+        await asyncio.sleep(10)
+
+    job = new_job(method, abortable=True)
+    queue = Mock()
+    run = asyncio.create_task(job.run(queue))
+    await asyncio.sleep(0.1)
+
+    job.abort()
+    await asyncio.wait_for(run, 1)
+    assert job.state == State.ABORTED
+    queue.finish.assert_called_once_with(job)
@@ -0,0 +1,110 @@
+import asyncio
+import errno
+from unittest.mock import Mock
+
+import pytest
+
+from middlewared.job import Job, JobsQueue, State
+from middlewared.service_exception import CallError
+
+
+def job_options(**kwargs):
+    return {
+        'lock': None,
+        'lock_queue_size': None,
+        'logs': False,
+        'process': False,
+        'pipes': [],
+        'check_pipes': False,
+        'transient': False,
+        'description': None,
+        'abortable': False,
+        'read_roles': [],
+        **kwargs,
+    }
+
+
+def new_job(lock=None, lock_queue_size=None):
+    return Job(Mock(), 'test.job', None, None, [], job_options(lock=lock, lock_queue_size=lock_queue_size), None, None,
+               None, None)
+
+
+async def finish(queue, job):
+    job.set_state('RUNNING')
+    job.set_state('SUCCESS')
+    queue.finish(job)
+
+
+@pytest.fixture
+def queue():
+    return JobsQueue(Mock())
+
+
+@pytest.mark.asyncio
+async def test__jobs_queue__lockless_jobs_fifo(queue):
+    jobs = [queue.add(new_job()) for i in range(3)]
+    assert [await queue.next() for i in range(3)] == jobs
+    assert not queue.queue_event.is_set()
+
+
+@pytest.mark.asyncio
+async def test__jobs_queue__lock_blocks_until_released(queue):
+    first = queue.add(new_job('lock'))
+    second = queue.add(new_job('lock'))
+    other = queue.add(new_job('other'))
+
+    assert await queue.next() is first
+    assert await queue.next() is other
+    assert queue.lock_stats() == {
+        'lock': {'queued': 1, 'running': 1},
+        'other': {'queued': 0, 'running': 1},
+    }
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(queue.next(), 0.1)
+
+    await finish(queue, first)
+    assert await queue.next() is second
+    assert queue.lock_stats()['lock'] == {'queued': 0, 'running': 1}
+
+    await finish(queue, second)
+    await finish(queue, other)
+    assert queue.job_locks == {}
+
+
+@pytest.mark.asyncio
+async def test__jobs_queue__lock_queue_size(queue):
+    running = queue.add(new_job('lock', 1))
+    assert await queue.next() is running
+
+    queued = queue.add(new_job('lock', 1))
+    assert queue.add(new_job('lock', 1)) is queued
+    assert len(queue.job_locks['lock'].get_jobs()) == 2
+
+
+@pytest.mark.asyncio
+async def test__jobs_queue__lock_queue_size_zero(queue):
+    running = queue.add(new_job('lock', 0))
+    assert await queue.next() is running
+
+    with pytest.raises(CallError) as ve:
+        queue.add(new_job('lock', 0))
+
+    assert ve.value.errno == errno.EBUSY
+    assert len(queue.job_locks['lock'].get_jobs()) == 1
+
+
+@pytest.mark.asyncio
+async def test__jobs_deque__evicts_finished_jobs(queue):
+    queue.deque.maxlen = 3
+    jobs = [queue.add(new_job()) for i in range(4)]
+    for job in jobs:
+        await queue.next()
+
+    await finish(queue, jobs[2])
+    await finish(queue, jobs[1])
+
+    queue.add(new_job())
+    assert jobs[2].id not in queue.all()
+    assert jobs[1].id in queue.all()
+    assert jobs[0].state == State.WAITING
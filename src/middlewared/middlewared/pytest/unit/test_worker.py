@@ -0,0 +1,80 @@
+import errno
+from unittest.mock import Mock, patch
+
+import pytest
+
+from truenas_api_client import ClientException
+
+from middlewared import worker
+from middlewared.service_exception import CallError
+
+
+@pytest.fixture
+def client_class():
+    with patch("middlewared.worker.Client", Mock(side_effect=lambda *args, **kwargs: Mock())) as client_class:
+        yield client_class
+
+
+@pytest.fixture
+def middleware(client_class):
+    # Worker processes do not run an event loop
+    with patch("asyncio.get_event_loop", Mock()):
+        return worker.FakeMiddleware()
+
+
+def test_client_is_reused(client_class, middleware):
+    middleware.call_sync("test.method", 1)
+    middleware.call_sync("test.method", 2)
+
+    assert client_class.call_count == 1
+    middleware.client.call.assert_called_with("test.method", 2, timeout=None)
+
+
+@pytest.mark.parametrize("error", [
+    ConnectionResetError(),
+    BrokenPipeError(),
+    ClientException("WebSocket connection closed", errno.ECONNABORTED),
+])
+def test_client_reconnects_after_connection_error(middleware, error):
+    client = middleware.client
+    client.call.side_effect = error
+    with pytest.raises(type(error)):
+        middleware.call_sync("test.method")
+
+    assert middleware.client is not client
+    assert client.close.called
+    assert middleware.stats["connects"] == 2
+
+
+@pytest.mark.parametrize("error", [
+    CallError("Method failed"),
+    ClientException("Method failed", errno.EINVAL),
+    ValueError(),
+])
+def test_client_is_kept_after_method_error(middleware, error):
+    client = middleware.client
+    client.call.side_effect = error
+    with pytest.raises(type(error)):
+        middleware.call_sync("test.method")
+
+    assert middleware.client is client
+    assert not client.close.called
+    assert middleware.stats["connects"] == 1
+
+
+def test_stats(middleware):
+    middleware.call_sync("test.method")
+    middleware.client.call.side_effect = ConnectionResetError()
+    with pytest.raises(ConnectionResetError):
+        middleware.call_sync("test.method")
+    middleware.call_sync("test.method")
+    middleware._call("test.method", None, Mock(), [])
+
+    with patch("middlewared.worker.MIDDLEWARE", middleware):
+        stats = worker.worker_stats()
+
+    assert stats["calls"] == 1
+    assert stats["connects"] == 2
+    assert stats["round_trips"] == 3
+    assert stats["round_trip_time"] >= 0
+    assert stats is not middleware.stats
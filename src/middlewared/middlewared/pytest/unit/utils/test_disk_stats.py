@@ -0,0 +1,78 @@
+from unittest.mock import mock_open, patch
+
+import pytest
+
+from middlewared.utils.disk_stats import DiskStatsSampler
+
+
+def diskstats(*disks):
+    return '\n'.join(
+        f'   8       0 {name} {read_ops} 0 {read_sectors} 0 {write_ops} 0 {write_sectors} 0 0 {busy} 0 0 0 0 0 0'
+        for name, read_ops, read_sectors, write_ops, write_sectors, busy in disks
+    ) + '\n   8       1 sda1 1 0 1 0 1 0 1 0 0 1 0 0 0 0 0 0\n'
+
+
+@pytest.fixture
+def sampler():
+    with patch('middlewared.utils.disk_stats.get_disk_names', return_value=['sdb', 'sda']) as get_disk_names:
+        with patch('middlewared.utils.disk_stats.get_disks_with_identifiers', return_value={
+            'sda': '{serial}A', 'sdb': '{serial}B', 'sdc': '{serial}C',
+        }):
+            with patch('middlewared.utils.disk_stats.get_sector_size', side_effect=lambda name: {'sdb': 4096}.get(
+                name, 512
+            )):
+                yield DiskStatsSampler(), get_disk_names
+
+
+def sample(sampler, data, now, method='rates'):
+    with patch('builtins.open', mock_open(read_data=data)):
+        with patch('middlewared.utils.disk_stats.time.monotonic', return_value=now):
+            return getattr(sampler, method)()
+
+
+def test_stats(sampler):
+    sampler, _ = sampler
+    assert sample(sampler, diskstats(('sda', 1, 2, 3, 4, 5), ('sdb', 6, 7, 8, 9, 10)), 0, 'stats') == {
+        '{serial}A': {'reads': 1, 'writes': 2, 'read_ops': 1, 'write_ops': 3, 'busy': 5},
+        '{serial}B': {'reads': 28, 'writes': 36, 'read_ops': 6, 'write_ops': 8, 'busy': 10},
+    }
+
+
+def test_rates(sampler):
+    sampler, get_disk_names = sampler
+    first = sample(sampler, diskstats(('sda', 10, 20, 30, 40, 50), ('sdb', 0, 0, 0, 0, 0)), 100)
+    assert first['{serial}A'] == {'read_ops': 0, 'read_bytes': 0, 'write_ops': 0, 'write_bytes': 0, 'busy': 0}
+
+    rates = sample(sampler, diskstats(('sda', 30, 60, 30, 40, 1050), ('sdb', 2, 2, 2, 2, 0)), 102)
+    assert rates == {
+        '{serial}A': {'read_ops': 10, 'read_bytes': 10240, 'write_ops': 0, 'write_bytes': 0, 'busy': 500},
+        '{serial}B': {'read_ops': 1, 'read_bytes': 4096, 'write_ops': 1, 'write_bytes': 4096, 'busy': 0},
+    }
+    # Too soon after the previous sample
+    assert sample(sampler, diskstats(('sda', 0, 0, 0, 0, 0), ('sdb', 0, 0, 0, 0, 0)), 102.5) is rates
+    # Disk names are only looked up once
+    assert get_disk_names.call_count == 1
+
+
+def test_counters_reset(sampler):
+    sampler, _ = sampler
+    sample(sampler, diskstats(('sda', 10, 10, 10, 10, 10), ('sdb', 0, 0, 0, 0, 0)), 0)
+    rates = sample(sampler, diskstats(('sda', 0, 0, 0, 0, 0), ('sdb', 0, 0, 0, 0, 0)), 1)
+    assert rates['{serial}A']['read_ops'] == 0
+
+
+def test_topology_change(sampler):
+    sampler, get_disk_names = sampler
+    sample(sampler, diskstats(('sda', 0, 0, 0, 0, 0), ('sdb', 0, 0, 0, 0, 0)), 0)
+
+    get_disk_names.return_value = ['sda', 'sdb', 'sdc']
+    # New disk is noticed in `/proc/diskstats`
+    sample(sampler, diskstats(('sda', 0, 0, 0, 0, 0), ('sdb', 0, 0, 0, 0, 0), ('sdc', 0, 0, 0, 0, 0)), 1)
+    assert set(sample(sampler, diskstats(
+        ('sda', 0, 0, 0, 0, 0), ('sdb', 0, 0, 0, 0, 0), ('sdc', 0, 0, 0, 0, 0),
+    ), 2)) == {'{serial}A', '{serial}B', '{serial}C'}
+
+    get_disk_names.return_value = ['sda']
+    sampler.invalidate()
+    assert set(sample(sampler, diskstats(('sda', 0, 0, 0, 0, 0)), 3)) == {'{serial}A'}
+    assert get_disk_names.call_count == 3
@@ -1,6 +1,6 @@
 import pytest
 import datetime
-from middlewared.utils import filter_list
+from middlewared.utils import filter_list, filters
 
 
 DATA = [
@@ -595,3 +595,96 @@ def test__filter_list_invalid_key():
 
 def test__filter_list_regex_null():
     assert len(filter_list(DATA_WITH_NULL, [['foo', '~', '(?i)Foo1']])) == 1
+
+
+@pytest.mark.parametrize('data,flt', [
+    (DATA, [['number', '=', 1]]),
+    (DATA, [['foo', 'C^', 'FOO']]),
+    (DATA, [['number', 'in', [1, 3]]]),
+    (DATA, [['number', 'nin', {1, 3}]]),
+    (DATA_WITH_NULL, [['foo', 'nin', ['foo1']]]),
+    (DATA, [['list', 'in', [[1], [3]]]]),
+    (DATA, [['list', 'rin', 2]]),
+    (DATA, [['OR', [[['number', '=', 1], ['foo', '=', 'foo1']], ['number', '>', 2]]]]),
+    (DATA_WITH_NULL, [['foo', '!=', None], ['number', '<=', 3]]),
+    (COMPLEX_DATA, [['Authentication.status', 'C=', 'nt_status_ok']]),
+    (DATA_WITH_LISTODICTS, [['list.*.number', '=', 3]]),
+    (DATA_WITH_DEEP_LISTS, [['list.*.list2.*.number', '=', 2]]),
+    (SAMPLE_AUDIT, [['timestamp.$date', '>', '2023-12-18T16:15:35+00:00']]),
+])
+def test__filter_list_compiled_matches_interpreted(data, flt):
+    f = filters()
+    value_maps = {}
+    f.validate_filters(flt, value_maps=value_maps)
+    getter = f.getter_fn(data[0])
+    expected = [i for i in data if all(f.eval_filter(i, x, getter, value_maps) for x in flt)]
+
+    predicate = f.compile_filters(flt, getter)
+    assert [i for i in data if predicate(i)] == expected
+
+
+def test__filter_list_compiled_cache():
+    f = filters()
+    assert f.compile_filters([['number', '=', 1]]) is f.compile_filters([['number', '=', 1]])
+    assert f.compile_filters([['number', '=', 1]]) is not f.compile_filters([['number', '=', True]])
+    assert f.compile_filters([['list', '=', [1]]]) is not f.compile_filters([['list', '=', (1,)]])
+
+
+def test__filter_list_compiled_uncacheable():
+    assert len(filter_list(DATA, [['list', 'in', [[1], {'a': 1}]]])) == 1
+
+
+def order_by_each_key(data, order_by):
+    # Reference ordering: a stable sort per `order_by` entry, nulls are never ordered among themselves
+    for order in order_by:
+        nulls = None
+        for prefix in ('nulls_first:', 'nulls_last:'):
+            if order.startswith(prefix):
+                nulls, order = prefix, order[len(prefix):]
+
+        reverse = order.startswith('-')
+        order = order.lstrip('-')
+        null_entries = [i for i in data if nulls and i.get(order) is None]
+        data = sorted(
+            [i for i in data if not nulls or i.get(order) is not None], key=lambda i: i[order], reverse=reverse
+        )
+        data = null_entries + data if nulls == 'nulls_first:' else data + null_entries
+
+    return data
+
+
+ORDER_DATA = [
+    {'id': i, 'a': i % 3, 'b': None if i % 4 == 0 else i % 5, 'c': f'name{i % 7}'}
+    for i in range(200)
+]
+
+
+@pytest.mark.parametrize('order_by', [
+    ['a'],
+    ['-a'],
+    ['a', 'c'],
+    ['-a', '-c'],
+    ['-a', 'c'],
+    ['c', '-a'],
+    ['nulls_first:b'],
+    ['nulls_last:b'],
+    ['nulls_first:-b'],
+    ['nulls_last:-b', '-a'],
+    ['-c', 'nulls_first:-b'],
+    ['a', 'nulls_last:b', '-c'],
+])
+@pytest.mark.parametrize('options', [{}, {'limit': 5}, {'limit': 10, 'offset': 7}, {'limit': 150}])
+def test__filter_list_order_by_composite(order_by, options):
+    expected = order_by_each_key(ORDER_DATA, order_by)
+    if options.get('offset'):
+        expected = expected[options['offset']:]
+
+    if options.get('limit'):
+        expected = expected[:options['limit']]
+
+    assert filter_list(ORDER_DATA, [], {'order_by': order_by, **options}) == expected
+
+
+def test__filter_list_order_by_get_top():
+    assert filter_list(ORDER_DATA, [], {'order_by': ['nulls_last:-b', 'a'], 'get': True}) == \
+        order_by_each_key(ORDER_DATA, ['nulls_last:-b', 'a'])[0]
@@ -0,0 +1,99 @@
+import os
+import stat
+
+import pytest
+
+from middlewared.utils.filesystem.recursive_perm import InheritedAcl, RecursivePermissionChange
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for i in range(4):
+        subdir = tmp_path / f'dir{i}'
+        (subdir / 'nested').mkdir(parents=True)
+        for j in range(5):
+            (subdir / f'file{j}').write_text('data')
+            (subdir / 'nested' / f'file{j}').write_text('data')
+
+    (tmp_path / 'file').write_text('data')
+    os.symlink('/etc/passwd', tmp_path / 'link')
+    return tmp_path
+
+
+def walk(path):
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            yield os.path.join(root, name)
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_chown(tree, workers):
+    passwd_st = os.stat('/etc/passwd')
+    assert RecursivePermissionChange(str(tree), uid=1000, gid=1001, workers=workers).run() == 50
+
+    for path in walk(tree):
+        st = os.lstat(path)
+        assert (st.st_uid, st.st_gid) == (1000, 1001), path
+
+    # symlink target is not changed
+    assert os.stat('/etc/passwd').st_uid == passwd_st.st_uid
+    # path itself is the responsibility of the caller
+    assert os.stat(tree).st_uid != 1000
+
+
+def test_chmod(tree):
+    os.mkfifo(tree / 'fifo')
+    RecursivePermissionChange(str(tree), gid=1001, mode=0o750).run()
+
+    for path in walk(tree):
+        st = os.lstat(path)
+        if stat.S_ISLNK(st.st_mode):
+            continue
+
+        assert stat.S_IMODE(st.st_mode) == 0o750, path
+        assert st.st_gid == 1001
+
+
+def test_strip_acl_without_acl(tree):
+    os.setxattr(tree / 'file', 'user.test', b'1')
+    RecursivePermissionChange(str(tree), acl=InheritedAcl.strip(['user.test']), mode=0o700).run()
+    assert 'user.test' not in os.listxattr(tree / 'file')
+
+
+def test_inherited_acl_templates(tree):
+    acl = InheritedAcl(frozenset(['user.test']), {'user.test': b'child_file'}, {'user.test': b'child_dir'}, {
+        'user.test': b'file',
+    }, {'user.test': b'dir'})
+    RecursivePermissionChange(str(tree), acl=acl).run()
+
+    assert os.getxattr(tree / 'file', 'user.test') == b'child_file'
+    assert os.getxattr(tree / 'dir0', 'user.test') == b'child_dir'
+    assert os.getxattr(tree / 'dir0' / 'file0', 'user.test') == b'file'
+    assert os.getxattr(tree / 'dir0' / 'nested', 'user.test') == b'dir'
+    assert os.getxattr(tree / 'dir0' / 'nested' / 'file0', 'user.test') == b'file'
+
+
+def test_abort(tree):
+    change = RecursivePermissionChange(str(tree), uid=1000, workers=2)
+    change.abort()
+    assert change.run() == 0
+    assert change.aborted
+    assert os.stat(tree / 'file').st_uid != 1000
+
+
+def test_error(tree):
+    # xattr namespace not supported by the filesystem
+    acl = InheritedAcl(frozenset(['invalid.test']), *[{'invalid.test': b'1'}] * 4)
+    change = RecursivePermissionChange(str(tree), acl=acl)
+    with pytest.raises(OSError) as ve:
+        change.run()
+
+    assert ve.value.filename.startswith(str(tree))
+    assert not change.aborted
+
+
+def test_should_abort(tree):
+    change = RecursivePermissionChange(str(tree), uid=1000, should_abort=lambda: True, workers=2)
+    assert change.run() == 0
+    assert change.aborted
+    assert os.stat(tree / 'file').st_uid != 1000
@@ -36,6 +36,7 @@ from middlewared.service_exception import CallError, ValidationErrors
 from middlewared.utils import BOOTREADY, filter_list, MIDDLEWARE_STARTED_SENTINEL_PATH
 from middlewared.utils.debug import get_frame_details, get_threads_stacks
 from middlewared.validators import IpAddress, Range
+from middlewared.worker import worker_stats
 
 from .compound_service import CompoundService
 from .config_service import ConfigService
@@ -714,6 +715,19 @@ class CoreService(Service):
     def threads_stacks(self):
         return get_threads_stacks()
 
+    @private
+    async def workers_stats(self):
+        """
+        Counters of the process pool workers (see `middlewared.worker.worker_stats`) ordered by worker pid.
+
+        A call can't be sent to a specific worker, so as many calls as there are workers are run concurrently and
+        a worker that did not pick up any of them is missing from the result.
+        """
+        stats = await asyncio.gather(*[
+            self.middleware.run_in_proc(worker_stats) for _ in range(middlewared.main.PROCESS_POOL_WORKERS)
+        ])
+        return sorted({worker['pid']: worker for worker in stats}.values(), key=lambda worker: worker['pid'])
+
     @private
     def get_pid(self):
         return os.getpid()
@@ -169,8 +169,9 @@ def job(
         defaults).
 
     :param abortable: If `True` then the job can be aborted in the task manager UI. When the job is aborted,
-        `asyncio.CancelledError` is raised inside the job method (meaning that only asynchronous job methods can be
-        aborted). By default, jobs are not abortable.
+        `asyncio.CancelledError` is raised inside an asynchronous job method. Synchronous job methods have to check
+        `job.aborted` themselves and return, the job is marked as aborted (and its lock is released) only then. By
+        default, jobs are not abortable.
 
     :param read_roles: A list of roles that will allow a non-full-admin user to see this job in `core.get_jobs`
         and download its logs even if the job was launched by another user or by the system.
@@ -1,6 +1,7 @@
 import asyncio
 import errno
 import functools
+import heapq
 import logging
 import operator
 import re
@@ -10,6 +11,7 @@ import json
 from collections import namedtuple
 from dataclasses import dataclass
 from datetime import datetime
+from threading import Lock
 
 from middlewared.service_exception import MatchNotFound
 from .lang import undefined
@@ -44,6 +46,10 @@ NULLS_LAST = 'nulls_last:'
 REVERSE_CHAR = '-'
 MAX_FILTERS_DEPTH = 3
 TIMESTAMP_DESIGNATOR = '.$date'
+COMPILED_FILTERS_CACHE_SIZE = 512
+# Select top entries with a heap rather than sorting everything if less than
+# 1/TOP_K_RATIO of the entries is requested
+TOP_K_RATIO = 8
 
 logger = logging.getLogger(__name__)
 
@@ -192,7 +198,36 @@ def casefold(obj):
     raise ValueError(f'{type(obj)}: support for casefolding object type not implemented.')
 
 
+class UncacheableFilters(Exception):
+    pass
+
+
+def filters_cache_key(obj):
+    """
+    Convert `query-filters` into a hashable structure that can be used to look
+    up previously compiled predicates. Type of every element is part of the key
+    so that e.g. `1` and `True` or `[1]` and `(1,)` do not share a predicate.
+
+    Raises UncacheableFilters if filters contain unhashable values.
+    """
+    if isinstance(obj, (list, tuple)):
+        return (obj.__class__, tuple(filters_cache_key(i) for i in obj))
+
+    if isinstance(obj, (set, frozenset)):
+        return (obj.__class__, frozenset(obj))
+
+    try:
+        hash(obj)
+    except TypeError:
+        raise UncacheableFilters() from None
+
+    return (obj.__class__, obj)
+
+
 class filters(object):
+    compiled_cache = {}
+    compiled_cache_lock = Lock()
+
     def op_in(x, y):
         return operator.contains(y, x)
 
@@ -406,6 +441,176 @@ class filters(object):
 
         return False
 
+    def compile_filterop(self, f, getter, value_maps):
+        """
+        Compile a single [<a>, <opcode>, <b>] condition into a predicate. Operator
+        lookup and casefolding of the filter value happen once here rather than
+        for every entry that is being filtered.
+        """
+        name, op, value = f
+        if value_maps and isinstance(value, str) and value in value_maps:
+            value = value_maps[value]
+
+        if op[0] == 'C':
+            op = op[1:]
+            fold = casefold
+            value = casefold(value)
+        else:
+            fold = None
+
+        fn = self.opmap[op]
+        if op in ('in', 'nin') and isinstance(value, (list, tuple)):
+            try:
+                lookup = frozenset(value)
+            except TypeError:
+                pass
+            else:
+                fn = self.compile_membership(lookup, value, op == 'in')
+
+        # Paths containing a wildcard are resolved relative to each array member and
+        # so result in a different (but for the given path always the same) remainder.
+        nested = {}
+
+        def nested_predicate(key):
+            if (predicate := nested.get(key)) is None:
+                predicate = nested[key] = self.compile_filterop([key, f[1], f[2]], getter, value_maps)
+
+            return predicate
+
+        def predicate(i):
+            data = getter(i, name)
+            if data.result is undefined:
+                return False
+
+            if not data.done:
+                entry_predicate = nested_predicate(data.key)
+                for entry in data.result:
+                    if entry_predicate(entry):
+                        return True
+
+                return False
+
+            source = data.result
+            if fold is not None:
+                source = fold(source)
+
+            return bool(fn(source, value))
+
+        if getter is not get_impl or '*' in name or '\\' in name:
+            return predicate
+
+        # Fast path for dictionaries where path can be split once here instead of
+        # being partitioned again for every entry. Resolution mirrors `get_impl`.
+        path = [(key, int(key) if key.isdigit() else None) for key in name.split('.')]
+
+        def dict_predicate(i):
+            if not isinstance(i, dict):
+                return predicate(i)
+
+            source = i
+            for key, index in path:
+                if isinstance(source, dict):
+                    source = source.get(key, undefined)
+                elif isinstance(source, (list, tuple)):
+                    if index is None:
+                        raise ValueError(f'{key}: must be array index or wildcard character')
+
+                    source = source[index] if index < len(source) else None
+
+            if source is undefined:
+                return False
+
+            if fold is not None:
+                source = fold(source)
+
+            return bool(fn(source, value))
+
+        return dict_predicate
+
+    def compile_membership(self, lookup, value, contains):
+        """
+        `in` / `nin` against a set of hashable values. Falls back to a linear scan
+        of original value if source itself is not hashable.
+        """
+        def fn(x, y):
+            if x is None and not contains:
+                return False
+
+            try:
+                return (x in lookup) is contains
+            except TypeError:
+                return self.opmap['in' if contains else 'nin'](x, value)
+
+        return fn
+
+    def compile_conjunction(self, predicates):
+        if len(predicates) == 1:
+            return predicates[0]
+
+        def predicate(i):
+            for p in predicates:
+                if not p(i):
+                    return False
+
+            return True
+
+        return predicate
+
+    def compile_filter(self, the_filter, getter, value_maps):
+        """
+        Compiled counterpart of `eval_filter`.
+        """
+        if len(the_filter) != 2:
+            return self.compile_filterop(the_filter, getter, value_maps)
+
+        branches = []
+        for branch in the_filter[1]:
+            if isinstance(branch[0], list):
+                branches.append(self.compile_conjunction([
+                    self.compile_filter(i, getter, value_maps) for i in branch
+                ]))
+            else:
+                branches.append(self.compile_filter(branch, getter, value_maps))
+
+        def predicate(i):
+            for p in branches:
+                if p(i):
+                    return True
+
+            return False
+
+        return predicate
+
+    def compile_filters(self, filters, getter=get_impl):
+        """
+        Validate `filters` and compile them into a single predicate which takes an
+        entry and returns whether it matches all of the filters.
+
+        Compiled predicates are cached keyed by filters structure so that repeated
+        queries with the same filters skip both validation and compilation.
+        """
+        try:
+            key = (filters_cache_key(filters), getter)
+        except UncacheableFilters:
+            key = None
+        else:
+            if (predicate := self.compiled_cache.get(key)) is not None:
+                return predicate
+
+        value_maps = {}
+        self.validate_filters(filters, value_maps=value_maps)
+        predicate = self.compile_conjunction([self.compile_filter(f, getter, value_maps) for f in filters])
+
+        if key is not None:
+            with self.compiled_cache_lock:
+                if len(self.compiled_cache) >= COMPILED_FILTERS_CACHE_SIZE:
+                    # Dictionaries preserve insertion order so the first key is the oldest one
+                    self.compiled_cache.pop(next(iter(self.compiled_cache)), None)
+
+                self.compiled_cache[key] = predicate
+
+        return predicate
+
     def getter_fn(self, entry):
         """
         Evaluate the type of objects returned by iterable and return an
@@ -472,7 +677,7 @@ class filters(object):
 
         return self.filterop(list_item, (operand_1, the_filter[1], operand_2), getter)
 
-    def do_filters(self, _list, filters, select, shortcircuit, value_maps):
+    def do_filters(self, _list, filters, select, shortcircuit, predicate=None):
         rv = []
 
         # we may be filtering output from a generator and so delay
@@ -481,14 +686,11 @@ class filters(object):
 
         for i in _list:
             if getter is None:
-                getter = self.getter_fn(i)
-            valid = True
-            for f in filters:
-                if not self.eval_filter(i, f, getter, value_maps):
-                    valid = False
-                    break
-
-            if not valid:
+                getter = self.getter_fn(i) or get_impl
+                if predicate is None or getter is not get_impl:
+                    predicate = self.compile_filters(filters, getter)
+
+            if not predicate(i):
                 continue
 
             if select:
@@ -535,43 +737,81 @@ class filters(object):
     def do_count(self, rv):
         return len(rv)
 
-    def order_nulls(self, _list, order):
+    def parse_order(self, order):
+        """
+        Split an `order_by` entry into (<attribute>, <descending>, <nulls>) where
+        nulls is one of None, NULLS_FIRST or NULLS_LAST.
+        """
+        nulls = None
+        for prefix in (NULLS_FIRST, NULLS_LAST):
+            if order.startswith(prefix):
+                nulls = prefix
+                order = order[len(prefix):]
+                break
+
         if order.startswith(REVERSE_CHAR):
-            order = order[1:]
-            reverse = True
-        else:
-            reverse = False
+            return order[1:], True, nulls
 
-        nulls = []
-        non_nulls = []
-        for entry in _list:
-            if entry.get(order) is None:
-                nulls.append(entry)
-            else:
-                non_nulls.append(entry)
+        return order, False, nulls
 
-        non_nulls = sorted(non_nulls, key=lambda x: get(x, order), reverse=reverse)
-        return (nulls, non_nulls)
+    def order_key_fn(self, order, descending, nulls):
+        """
+        Key function for a single `order_by` entry.
 
-    def order_no_null(self, _list, order):
-        if order.startswith(REVERSE_CHAR):
-            order = order[1:]
-            reverse = True
+        Entries for which the attribute is null are kept together at the start or the end
+        and are not ordered among themselves.
+        """
+        if '.' in order or '\\' in order:
+            value_fn = functools.partial(get, path=order)
         else:
-            reverse = False
-
-        return sorted(_list, key=lambda x: get(x, order), reverse=reverse)
-
-    def do_order(self, rv, order_by):
-        for o in order_by:
-            if o.startswith(NULLS_FIRST):
-                nulls, non_nulls = self.order_nulls(rv, o[len(NULLS_FIRST):])
-                rv = nulls + non_nulls
-            elif o.startswith(NULLS_LAST):
-                nulls, non_nulls = self.order_nulls(rv, o[len(NULLS_LAST):])
-                rv = non_nulls + nulls
+            # Top-level attribute does not need path resolution
+            value_fn = operator.methodcaller('get', order)
+
+        if nulls is None:
+            return value_fn
+
+        # Null flag is the leading part of the key, so it has to be inverted for reversed sort
+        null_flag, non_null_flag = (0, 1) if (nulls == NULLS_FIRST) != descending else (1, 0)
+
+        def key_fn(x):
+            if x.get(order) is None:
+                return null_flag, None
+
+            return non_null_flag, value_fn(x)
+
+        return key_fn
+
+    def do_order(self, rv, order_by, count=0):
+        """
+        Order `rv` according to `order_by`. Last entry of `order_by` is the primary one, ties
+        are broken by preceding entries and then by the original order.
+
+        If only first `count` entries are needed and they are a small part of `rv`, candidates
+        are selected with a heap by the primary key (including all entries tied with the last
+        one) and only those are ordered.
+        """
+        if not order_by:
+            return rv
+
+        orders = [self.parse_order(o) for o in order_by]
+        if count and count * TOP_K_RATIO < len(rv):
+            descending = orders[-1][1]
+            key = self.order_key_fn(*orders[-1])
+            # `heapq.nsmallest` and `heapq.nlargest` are stable and equivalent to slicing sorted output
+            top = (heapq.nlargest if descending else heapq.nsmallest)(count, rv, key=key)
+            if len(orders) > 1 and top:
+                boundary = key(top[-1])
+                if descending:
+                    rv = [x for x in rv if key(x) >= boundary]
+                else:
+                    rv = [x for x in rv if key(x) <= boundary]
             else:
-                rv = self.order_no_null(rv, o)
+                return top
+
+        # A stable sort per key with plain values compares faster than a single sort
+        # with composite keys built in python.
+        for order, descending, nulls in orders:
+            rv = sorted(rv, key=self.order_key_fn(order, descending, nulls), reverse=descending)
 
         return rv
 
@@ -587,9 +827,10 @@ class filters(object):
         do_shortcircuit = options.get('get') and not order_by
 
         if filters:
-            maps = {}
-            self.validate_filters(filters, value_maps=maps)
-            rv = self.do_filters(_list, filters, select, do_shortcircuit, value_maps=maps)
+            # Compile (and validate) filters before iterating so that invalid filters
+            # are reported even if there is nothing to filter.
+            predicate = self.compile_filters(filters)
+            rv = self.do_filters(_list, filters, select, do_shortcircuit, predicate)
             if do_shortcircuit:
                 return self.do_get(rv)
 
@@ -603,7 +844,14 @@ class filters(object):
         if options.get('count') is True:
             return self.do_count(rv)
 
-        rv = self.do_order(rv, order_by)
+        if options.get('get') is True:
+            count = 1
+        elif options.get('limit'):
+            count = (options.get('offset') or 0) + options['limit']
+        else:
+            count = 0
+
+        rv = self.do_order(rv, order_by, count)
 
         if options.get('get') is True:
             return self.do_get(rv)
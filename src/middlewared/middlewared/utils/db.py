@@ -1,9 +1,22 @@
+import contextlib
+import os
 import sqlite3
 
 FREENAS_DATABASE = '/data/freenas-v1.db'
 FREENAS_DATABASE_MODE = 0o600
 
 
+def remove_database_wal(database_path=None):
+    """
+    Remove write-ahead log files of the database. This must be done before the database file is replaced (with no
+    connections to it open), SQLite would apply the log of the previous database to the new one otherwise.
+    """
+    database_path = database_path or FREENAS_DATABASE
+    for suffix in ('-wal', '-shm'):
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(f'{database_path}{suffix}')
+
+
 def dict_factory(cursor, row):
     d = {}
     for idx, col in enumerate(cursor.description):
@@ -1,49 +1,165 @@
+from array import array
 import contextlib
 import logging
 import os
+import threading
+import time
 
-from .disks import get_disk_names, get_disks_with_identifiers
+from .disks import get_disk_names, get_disks_with_identifiers, VALID_WHOLE_DISK
 
 
 logger = logging.getLogger(__name__)
 
+# read ops, read sectors, write ops, write sectors and busy time (ms) columns of `/proc/diskstats`
+DISKSTATS_COLUMNS = (3, 5, 7, 9, 12)
+DISKSTATS_COUNTERS = len(DISKSTATS_COLUMNS)
+# Rates requested sooner than this after the previous sample are served from the previous sample so that consumers
+# sharing one sampler do not get rates computed over tiny intervals
+MIN_RATES_INTERVAL = 1
+DEFAULT_SECTOR_SIZE = 512  # default sector size if we are not able to find it keeping in line with netdata
 
-def get_disk_stats(disk_identifier_mapping: dict | None = None) -> dict[str, dict]:
-    disk_identifier_mapping = disk_identifier_mapping or get_disks_with_identifiers()
-    available_disks = get_disk_names()
-    stats = {}
-    with contextlib.suppress(IOError):
-        with open('/proc/diskstats', 'r') as disk_stats_fd:
-            for entry in disk_stats_fd:
-                parts = entry.strip().split()
-                if len(parts) < 14:
-                    continue  # skip lines that don't have all the fields
-
-                disk_name = parts[2]
-                if disk_name not in available_disks:
-                    continue
-
-                sector_size = 512  # default sector size if we are not able to find it keeping in line with netdata
-                with contextlib.suppress(FileNotFoundError, ValueError):
-                    with open(os.path.join('/sys/block', disk_name, 'queue/hw_sector_size'), 'r') as f:
-                        sector_size = int(f.read().strip())
-
-                try:
-                    read_ops = int(parts[3])
-                    read_sectors = int(parts[5])
-                    write_ops = int(parts[7])
-                    write_sectors = int(parts[9])
-                    busy_time = int(parts[12])
-                except (IndexError, ValueError) as e:
-                    logger.error('Failed to parse disk stats for %r: %r', disk_name, e)
-                    continue
-
-                stats[disk_identifier_mapping.get(disk_name, disk_name)] = {
-                    'reads': (read_sectors * sector_size) / 1024,  # convert to kb
-                    'writes': (write_sectors * sector_size) / 1024,  # convert to kb
+
+def get_sector_size(disk_name: str) -> int:
+    with contextlib.suppress(FileNotFoundError, ValueError):
+        with open(os.path.join('/sys/block', disk_name, 'queue/hw_sector_size'), 'r') as f:
+            return int(f.read().strip())
+
+    return DEFAULT_SECTOR_SIZE
+
+
+class DiskStatsSampler:
+    """
+    Samples `/proc/diskstats` counters of whole disks.
+
+    Disk names, identifiers and sector sizes are looked up once and kept until `invalidate` is called (on udev disk
+    add/remove events) or until a disk appears in (or disappears from) `/proc/diskstats`. Counters are kept in a flat
+    array with `DISKSTATS_COUNTERS` entries per disk.
+    """
+
+    def __init__(self, disk_identifier_mapping: dict[str, str] | None = None):
+        self.lock = threading.Lock()
+        self.disk_identifier_mapping = disk_identifier_mapping
+        self.stale = True
+        self.names = {}
+        self.identifiers = []
+        self.sector_sizes = []
+        self.previous = None
+        self.rates_cache = None
+
+    def invalidate(self):
+        self.stale = True
+
+    def __refresh(self):
+        names = sorted(get_disk_names())
+        mapping = self.disk_identifier_mapping or get_disks_with_identifiers(names)
+        self.names = {name: i for i, name in enumerate(names)}
+        self.identifiers = [mapping.get(name, name) for name in names]
+        self.sector_sizes = [get_sector_size(name) for name in names]
+        self.previous = None
+        self.rates_cache = None
+        self.stale = False
+
+    def __read(self) -> array:
+        counters = array('Q', bytes(8 * DISKSTATS_COUNTERS * len(self.names)))
+        seen = 0
+        try:
+            with open('/proc/diskstats', 'r') as f:
+                lines = f.read().splitlines()
+        except IOError:
+            return counters
+
+        for line in lines:
+            parts = line.split()
+            if len(parts) < 14:
+                continue  # skip lines that don't have all the fields
+
+            if (index := self.names.get(parts[2])) is None:
+                if VALID_WHOLE_DISK.match(parts[2]):
+                    # A disk was added
+                    self.stale = True
+
+                continue
+
+            try:
+                counters[index * DISKSTATS_COUNTERS:(index + 1) * DISKSTATS_COUNTERS] = array(
+                    'Q', [int(parts[column]) for column in DISKSTATS_COLUMNS]
+                )
+            except ValueError as e:
+                logger.error('Failed to parse disk stats for %r: %r', parts[2], e)
+                continue
+
+            seen += 1
+
+        if seen != len(self.names):
+            # A disk was removed
+            self.stale = True
+
+        return counters
+
+    def stats(self) -> dict[str, dict]:
+        """
+        Cumulative counters per disk identifier.
+        """
+        with self.lock:
+            if self.stale:
+                self.__refresh()
+
+            counters = self.__read()
+            return {
+                identifier: {
+                    'reads': (counters[base + 1] * sector_size) / 1024,  # convert to kb
+                    'writes': (counters[base + 3] * sector_size) / 1024,  # convert to kb
+                    'read_ops': counters[base],
+                    'write_ops': counters[base + 2],
+                    'busy': counters[base + 4],
+                }
+                for identifier, sector_size, base in zip(
+                    self.identifiers, self.sector_sizes, range(0, len(counters), DISKSTATS_COUNTERS),
+                )
+            }
+
+    def rates(self) -> dict[str, dict]:
+        """
+        Per second rates per disk identifier since the previous call (zeros on the first call or after the disks
+        have changed).
+        """
+        with self.lock:
+            if self.stale:
+                self.__refresh()
+
+            now = time.monotonic()
+            if self.rates_cache is not None and now - self.previous[0] < MIN_RATES_INTERVAL:
+                return self.rates_cache
+
+            counters = self.__read()
+            previous, self.previous = self.previous, (now, counters)
+
+            if previous is None or len(previous[1]) != len(counters):
+                deltas = None
+            else:
+                elapsed = now - previous[0]
+                deltas = [max(0, current - last) / elapsed for current, last in zip(counters, previous[1])]
+
+            rates = {}
+            for i, (identifier, sector_size) in enumerate(zip(self.identifiers, self.sector_sizes)):
+                if deltas is None:
+                    read_ops = read_sectors = write_ops = write_sectors = busy = 0
+                else:
+                    read_ops, read_sectors, write_ops, write_sectors, busy = deltas[
+                        i * DISKSTATS_COUNTERS:(i + 1) * DISKSTATS_COUNTERS
+                    ]
+
+                rates[identifier] = {
                     'read_ops': read_ops,
+                    'read_bytes': read_sectors * sector_size,
                     'write_ops': write_ops,
-                    'busy': busy_time,
+                    'write_bytes': write_sectors * sector_size,
+                    'busy': busy,
                 }
 
-    return stats
+            self.rates_cache = rates
+            return rates
+
+
+def get_disk_stats(disk_identifier_mapping: dict | None = None) -> dict[str, dict]:
+    return DiskStatsSampler(disk_identifier_mapping).stats()
@@ -0,0 +1,302 @@
+# In-process engine for recursive ownership / mode / ACL changes that are
+# performed by filesystem.chown, filesystem.setperm, and filesystem.setacl.
+#
+# Directories are distributed between a pool of worker threads. All changes
+# are made relative to an open file descriptor of the parent directory so
+# that concurrent renames within the tree do not redirect the operation
+# outside of it.
+#
+# NOTE: tests for these utils are in src/middlewared/middlewared/pytest/unit/utils/test_recursive_perm.py
+
+import collections
+import errno
+import os
+import threading
+import time
+
+from typing import Callable, NamedTuple
+
+from .constants import FileType, ZFSCTL
+from .directory import DirectoryFd, DirectoryIterator
+from .stat_x import statx, ATFlags
+
+RECURSIVE_PERM_WORKERS = min(16, 2 * (os.cpu_count() or 1))
+
+
+class InheritedAcl(NamedTuple):
+    """
+    Raw ACL extended attributes to write to files and directories below the
+    root of a recursive operation.
+
+    `xattrs` - names of all ACL extended attributes of the ACL type. Any of
+    them that is missing from a template is removed from the file.
+
+    `child_file`, `child_dir` - templates for direct children of the root.
+
+    `file`, `dir` - templates for everything deeper. These only differ
+    from the `child_*` ones for NFSv4 entries with NO_PROPAGATE_INHERIT.
+    """
+    xattrs: frozenset
+    child_file: dict
+    child_dir: dict
+    file: dict
+    dir: dict
+
+    @classmethod
+    def strip(cls, xattrs):
+        return cls(frozenset(xattrs), {}, {}, {}, {})
+
+    def template(self, is_dir, depth):
+        if depth == 1:
+            return self.child_dir if is_dir else self.child_file
+
+        return self.dir if is_dir else self.file
+
+
+class WorkItem(NamedTuple):
+    parent: DirectoryFd  # the directory itself if `name` is None
+    name: str | None
+    path: str
+    depth: int
+    ino: int
+    mnt_id: int
+
+
+class RecursivePermissionChange:
+    """
+    Recursively change owner, mode and / or ACL of everything below `path`
+    (the caller is responsible for `path` itself).
+
+    `uid`, `gid` - new owner, -1 to leave unchanged.
+
+    `mode` - new mode for files and directories, None to leave unchanged.
+
+    `acl` - InheritedAcl to apply, None to leave ACLs unchanged.
+
+    `traverse` - descend into other filesystems (ZFS datasets) mounted
+    below `path`. The ZFS ctldir (.zfs) is never entered.
+
+    `should_abort` - called by the worker threads before each file, the
+    change is aborted once it returns True (i.e. `lambda: job.aborted`).
+
+    Symbolic links only have their owner changed.
+    """
+
+    def __init__(self, path, *, uid=-1, gid=-1, mode=None, acl=None, traverse=False, should_abort=None,
+                 workers=RECURSIVE_PERM_WORKERS):
+        self.path = path
+        self.uid = uid
+        self.gid = gid
+        self.mode = mode
+        self.acl = acl
+        self.traverse = traverse
+        self.should_abort = should_abort
+        self.workers = workers
+
+        self.__cv = threading.Condition()
+        self.__queue = collections.deque()
+        self.__pending = 0
+        self.__counts = [0] * workers
+        self.__error = None
+        self.__aborted = False
+        self.__started = None
+
+    @property
+    def processed(self) -> int:
+        return sum(self.__counts)
+
+    @property
+    def aborted(self) -> bool:
+        return self.__aborted and self.__error is None
+
+    @property
+    def elapsed(self) -> float:
+        return 0 if self.__started is None else time.monotonic() - self.__started
+
+    def abort(self) -> None:
+        with self.__cv:
+            self.__aborted = True
+            self.__cv.notify_all()
+
+    def run(self, progress_cb: Callable[[int, float], None] | None = None, interval: float = 1) -> int:
+        """
+        Perform the change. `progress_cb` is called with the count of files processed so far and the current rate
+        (files per second) every `interval` seconds from the calling thread.
+
+        Returns the count of processed files. First error encountered stops all workers and is raised as an OSError
+        with the path of the failed file in `filename`.
+        """
+        self.__started = time.monotonic()
+        root = DirectoryFd(self.path)
+        st = statx('', dir_fd=root.fileno, flags=ATFlags.EMPTY_PATH.value)
+        self.__push(WorkItem(root, None, self.path, 0, st.stx_ino, st.stx_mnt_id))
+
+        threads = [
+            threading.Thread(target=self.__worker, args=(i,), name=f'recursive_perm_{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        last_time, last_processed = self.__started, 0
+        try:
+            with self.__cv:
+                while self.__pending and not self.__aborted and self.__error is None:
+                    self.__cv.wait(interval)
+                    if progress_cb is None or not self.__pending:
+                        continue
+
+                    now, processed = time.monotonic(), self.processed
+                    rate = (processed - last_processed) / (now - last_time) if now > last_time else 0
+                    last_time, last_processed = now, processed
+
+                    self.__cv.release()
+                    try:
+                        progress_cb(processed, rate)
+                    finally:
+                        self.__cv.acquire()
+        finally:
+            if self.__pending:
+                # error, abort or exception in `progress_cb`
+                self.abort()
+
+            for thread in threads:
+                thread.join()
+
+        if self.__error is not None:
+            raise self.__error
+
+        return self.processed
+
+    def __push(self, item):
+        with self.__cv:
+            self.__queue.append(item)
+            self.__pending += 1
+            self.__cv.notify()
+
+    def __worker(self, idx):
+        while True:
+            with self.__cv:
+                while not self.__queue and self.__pending and not self.__aborted:
+                    self.__cv.wait()
+
+                if self.__aborted or not self.__queue:
+                    self.__cv.notify_all()
+                    return
+
+                # LIFO keeps the walk mostly depth-first which bounds the count of directories held open
+                item = self.__queue.pop()
+
+            try:
+                self.__process_directory(idx, item)
+            except Exception as e:
+                with self.__cv:
+                    if self.__error is None:
+                        self.__error = e
+
+                    self.__aborted = True
+            finally:
+                with self.__cv:
+                    self.__pending -= 1
+                    self.__cv.notify_all()
+
+    def __process_directory(self, idx, item):
+        if item.name is None:
+            dir_fd = item.parent
+        else:
+            try:
+                dir_fd = DirectoryFd(item.name, item.parent.fileno)
+            except (FileNotFoundError, NotADirectoryError):
+                return
+            except OSError as e:
+                raise OSError(e.errno, e.strerror, item.path) from None
+
+            if os.fstat(dir_fd.fileno).st_ino != item.ino:
+                # directory was replaced after it was listed
+                return
+
+            self.__apply(dir_fd.fileno, True, item.depth, item.path)
+            self.__counts[idx] += 1
+
+        with DirectoryIterator('.', request_mask=0, as_dict=False, dir_fd=dir_fd.fileno) as d_iter:
+            for entry in d_iter:
+                if self.__should_stop():
+                    return
+
+                path = os.path.join(item.path, entry.name)
+                if entry.etype == FileType.DIRECTORY.name:
+                    if entry.name == '.zfs' and entry.stat.stx_ino == ZFSCTL.INO_ROOT:
+                        continue
+
+                    if entry.stat.stx_mnt_id != item.mnt_id and not self.traverse:
+                        continue
+
+                    self.__push(WorkItem(
+                        dir_fd, entry.name, path, item.depth + 1, entry.stat.stx_ino, entry.stat.stx_mnt_id
+                    ))
+                    continue
+
+                self.__process_file(dir_fd.fileno, entry, item.depth + 1, path)
+                self.__counts[idx] += 1
+
+    def __should_stop(self):
+        if not self.__aborted and self.should_abort is not None and self.should_abort():
+            self.abort()
+
+        return self.__aborted
+
+    def __process_file(self, dir_fd, entry, depth, path):
+        try:
+            if entry.etype == FileType.SYMLINK.name:
+                if self.uid != -1 or self.gid != -1:
+                    os.chown(entry.name, self.uid, self.gid, dir_fd=dir_fd, follow_symlinks=False)
+
+                return
+
+            if self.mode is None and self.acl is None:
+                os.chown(entry.name, self.uid, self.gid, dir_fd=dir_fd, follow_symlinks=False)
+                return
+
+            if entry.etype == FileType.FILE.name:
+                fd = os.open(entry.name, os.O_RDONLY | os.O_NOFOLLOW | os.O_NONBLOCK | os.O_NOCTTY, dir_fd=dir_fd)
+                target = fd
+            else:
+                # don't open devices, sockets and fifos for reading
+                fd = os.open(entry.name, os.O_PATH | os.O_NOFOLLOW, dir_fd=dir_fd)
+                target = f'/proc/self/fd/{fd}'
+        except OSError as e:
+            if e.errno in (errno.ENOENT, errno.ELOOP):
+                # file was removed or replaced by a symlink after it was listed
+                return
+
+            raise OSError(e.errno, e.strerror, path) from None
+
+        try:
+            self.__apply(target, False, depth, path)
+        finally:
+            os.close(fd)
+
+    def __apply(self, target, is_dir, depth, path):
+        try:
+            if self.acl is not None:
+                template = self.acl.template(is_dir, depth)
+                for xat in self.acl.xattrs:
+                    if (value := template.get(xat)) is not None:
+                        os.setxattr(target, xat, value)
+                        continue
+
+                    try:
+                        os.removexattr(target, xat)
+                    except OSError as e:
+                        if e.errno not in (errno.ENODATA, errno.EOPNOTSUPP):
+                            raise
+
+            if self.mode is not None:
+                os.chmod(target, self.mode)
+
+            if self.uid != -1 or self.gid != -1:
+                os.chown(target, self.uid, self.gid)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            raise OSError(e.errno, e.strerror, path) from None
@@ -1,9 +1,13 @@
 import asyncio
+import errno
 import inspect
 import os
 import setproctitle
+import threading
+import time
 
-from truenas_api_client import Client
+from truenas_api_client import Client, ClientException
+from websocket import WebSocketConnectionClosedException
 
 import middlewared.api
 from . import logger
@@ -24,23 +28,67 @@ class FakeMiddleware(LoadPluginsMixin, ServiceCallMixin):
 
     def __init__(self):
         super().__init__()
-        self.client = None
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.stats = {
+            'pid': os.getpid(),
+            'calls': 0,
+            'connects': 0,
+            'round_trips': 0,
+            'round_trip_time': 0.0,
+        }
         _logger = logger.Logger('worker')
         self.logger = _logger.getLogger()
         _logger.configure_logging('console')
         self.loop = asyncio.get_event_loop()
 
-    def _call(self, name, serviceobj, methodobj, params=None, app=None, pipes=None, job=None):
+    @property
+    def client(self):
+        """
+        Connection to the main middleware process. It is created when it is first needed and is then kept for the
+        whole lifetime of the worker. A new connection is made after a call has failed because the previous one was
+        closed or broken.
+        """
+        with self._client_lock:
+            if self._client is None:
+                self._client = Client(f'ws+unix://{MIDDLEWARE_RUN_DIR}/middlewared-internal.sock', py_exceptions=True)
+                self.stats['connects'] += 1
+
+            return self._client
+
+    def _close_client(self):
+        try:
+            self._client.close()
+        except Exception:
+            pass
+
+        self._client = None
+
+    def _client_call(self, method, *params, **kwargs):
+        client = self.client
+        start = time.monotonic()
         try:
-            with Client(f'ws+unix://{MIDDLEWARE_RUN_DIR}/middlewared-internal.sock', py_exceptions=True) as c:
-                self.client = c
-                job_options = getattr(methodobj, '_job', None)
-                if job and job_options:
-                    params = list(params) if params else []
-                    params.insert(0, FakeJob(job['id'], self.client))
-                return methodobj(*params)
+            return client.call(method, *params, **kwargs)
+        except Exception as e:
+            # Exceptions raised by the called method are re-raised here as they are, so only drop the connection
+            # if it is actually unusable.
+            if is_connection_error(e):
+                with self._client_lock:
+                    if self._client is client:
+                        self._close_client()
+
+            raise
         finally:
-            self.client = None
+            self.stats['round_trips'] += 1
+            self.stats['round_trip_time'] += time.monotonic() - start
+
+    def _call(self, name, serviceobj, methodobj, params=None, app=None, pipes=None, job=None):
+        self.stats['calls'] += 1
+        job_options = getattr(methodobj, '_job', None)
+        if job and job_options:
+            params = list(params) if params else []
+            params.insert(0, FakeJob(job['id'], self))
+        return methodobj(*params)
 
     def _run(self, name, args, job):
         serviceobj, methodobj = self.get_method(name)
@@ -77,7 +125,7 @@ class FakeMiddleware(LoadPluginsMixin, ServiceCallMixin):
                     self.logger.trace('Calling %r in current process', method)
                     return sync_methodobj(*params)
 
-        return self.client.call(method, *params, timeout=timeout, **kwargs)
+        return self._client_call(method, *params, timeout=timeout, **kwargs)
 
     def event_register(self, *args, **kwargs):
         pass
@@ -86,15 +134,25 @@ class FakeMiddleware(LoadPluginsMixin, ServiceCallMixin):
         return []
 
     def send_event(self, name, event_type, **kwargs):
-        with Client(py_exceptions=True) as c:
-            return c.call('core.event_send', name, event_type, kwargs)
+        return self._client_call('core.event_send', name, event_type, kwargs)
+
+
+def is_connection_error(e):
+    """
+    Whether `e` raised by a client call means that the connection to the main middleware process is unusable.
+    """
+    if isinstance(e, ClientException):
+        # Raised for pending calls when the connection is closed
+        return e.errno == errno.ECONNABORTED
+
+    return isinstance(e, (ConnectionError, WebSocketConnectionClosedException))
 
 
 class FakeJob(object):
 
-    def __init__(self, id_, client):
+    def __init__(self, id_, middleware):
         self.id = id_
-        self.client = client
+        self.middleware = middleware
         self.progress = {
             'percent': None,
             'description': None,
@@ -107,7 +165,7 @@ class FakeJob(object):
             self.progress['description'] = description
         if extra:
             self.progress['extra'] = extra
-        self.client.call('core.job_update', self.id, {'progress': self.progress})
+        self.middleware._client_call('core.job_update', self.id, {'progress': self.progress})
 
 
 def main_worker(*call_args):
@@ -124,6 +182,15 @@ def main_worker(*call_args):
     return res
 
 
+def worker_stats():
+    """
+    Counters of the process pool worker this is executed in (i.e. `middleware.run_in_proc(worker_stats)`): number of
+    calls executed, number of connections made to the main middleware process and number of calls made over that
+    connection together with the total time spent waiting for them.
+    """
+    return dict(MIDDLEWARE.stats)
+
+
 def receive_events():
     c = Client(f'ws+unix://{MIDDLEWARE_RUN_DIR}/middlewared-internal.sock', py_exceptions=True)
     c.subscribe('core.environ', lambda *args, **kwargs: environ_update(kwargs['fields']))
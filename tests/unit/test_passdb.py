@@ -253,6 +253,51 @@ def test__validate_pass_last_set():
         util_passdb.delete_passdb_entry(entry.username, entry.user_rid)
 
 
+def test__sync_passdb_entries(passdb_dir, pdb_times):
+    """ Only entries that changed are rewritten and stale / renamed entries are removed """
+    entries = [
+        util_passdb.PDBEntry(**PDB_DICT_DEFAULTS | {
+            'username': f'user{i}', 'full_name': f'user{i}', 'user_rid': 20080 + i, 'times': pdb_times,
+            'nt_pw': generate_nt_hash(f'password{i}'),
+        })
+        for i in range(4)
+    ]
+
+    try:
+        result = util_passdb.sync_passdb_entries(entries)
+        assert result == util_passdb.PassdbSyncResult(unchanged=0, updated=4, removed=0)
+
+        assert util_passdb.sync_passdb_entries(entries) == util_passdb.PassdbSyncResult(
+            unchanged=4, updated=0, removed=0
+        )
+
+        # user0 unchanged, user1 renamed, user2 locked, user3 kept as-is and user4 new
+        new_entries = [
+            entries[0],
+            util_passdb.PDBEntry(**asdict(entries[1]) | {'username': 'renamed1', 'times': pdb_times}),
+            util_passdb.PDBEntry(**asdict(entries[2]) | {'acct_ctrl': LOCKED_ACCOUNT, 'times': pdb_times}),
+            util_passdb.PDBEntry(**PDB_DICT_DEFAULTS | {
+                'username': 'user4', 'full_name': 'user4', 'user_rid': 20084, 'times': pdb_times,
+                'nt_pw': generate_nt_hash('password4'),
+            }),
+        ]
+        result = util_passdb.sync_passdb_entries(new_entries, keep_rids=[entries[3].user_rid])
+        assert result == util_passdb.PassdbSyncResult(unchanged=1, updated=3, removed=0)
+
+        contents = {entry['username']: entry for entry in util_passdb.query_passdb_entries([], {})}
+        assert set(contents) == {'user0', 'renamed1', 'user2', 'user3', 'user4'}
+        assert contents['user2']['acct_ctrl'] == LOCKED_ACCOUNT
+        check_pdbedit(list(contents))
+
+        result = util_passdb.sync_passdb_entries(new_entries[:2])
+        assert result == util_passdb.PassdbSyncResult(unchanged=2, updated=0, removed=3)
+        check_pdbedit(['user0', 'renamed1'])
+    finally:
+        util_passdb.sync_passdb_entries([])
+
+    assert util_passdb.query_passdb_entries([], {}) == []
+
+
 @pytest.mark.parametrize('policy_item', SMBAccountPolicy)
 def test__validate_account_policy(policy_item):
     full_policy = DEFAULT_ACCOUNT_POLICY.copy() | {policy_item.name.lower(): 10}